@@ -24,17 +24,21 @@ import pyrogue as pr
 import surf.AxiVersion
 import surf
 import functools
+import contextlib
 import threading
 import time
+import yaml
 from collections import defaultdict
 import numpy
 import pprint
 
 import rogue.interfaces.stream
 
-class CoulterRoot(pr.Root):
+import ePixFpga as fpga
+
+class CoulterRoot(fpga.ConfigDiffRoot):
     def __init__(self, pgp=None, srp=None, trig=None, dataWriter=None, cmd=None, **kwargs):
-        super(self.__class__, self).__init__("CoulterDaq", "Coulter Data Acquisition", **kwargs)
+        super().__init__(name="CoulterDaq", description="Coulter Data Acquisition", **kwargs)
 
         self.trig = trig
         self.cmd = cmd
@@ -62,6 +66,118 @@ class CoulterRoot(pr.Root):
         def SendOpCode(code):
             self.trig.sendOpCode(code)
 
+    # readConfigDiff() does a single ASIC shift for each ASIC that has changed fields
+    def _beginConfigDiff(self):
+        self._configAsics = self._asicConfigs(self)
+        for asic in self._configAsics:
+            asic.beginConfig()
+
+    def _commitConfigDiff(self, changes):
+        for asic in self._configAsics:
+            if any(path.startswith(asic.path + '.') for path in changes):
+                asic.commitConfig()
+            else:
+                asic.abortConfig()
+
+    def _abortConfigDiff(self):
+        for asic in self._configAsics:
+            asic.abortConfig()
+
+    def optimizeAdcTiming(self, parser, board=0, windowRange=(0, 1023), clkRange=None,
+                          windowStep=32, clkStep=None, triggers=4, channels=None,
+                          timeout=1.0, apply=True, filename=None):
+        """Finds the AdcWindowDelay/AdcClkDelay of Coulter[board] with the best
+        adcTimingScore(). A coarse grid (windowStep x clkStep) is measured first,
+        then the steps are halved around the best point down to 1. Every point
+        sends triggers Trigger commands, each one waiting for its frame in
+        parser (the CoulterFrameParser of the board). The run control must be
+        stopped. clkRange defaults to one ADC clock period.
+        Returns a dict with the best settings and the measured 2-D score map
+        (optionally saved to filename with numpy.savez)."""
+        acq = self.Coulter[board].AcquisitionControl
+        if clkRange is None:
+            clkRange = (0, acq._count([acq.AdcClkPosWidth, acq.AdcClkNegWidth]) - 1)
+        if clkStep is None:
+            clkStep = max(1, (clkRange[1] - clkRange[0] + 1) // 4)
+        initial = (acq.AdcWindowDelay.get(read=False), acq.AdcClkDelay.get(read=False))
+        points = {}
+
+        def measure(window, clk):
+            if (window, clk) in points:
+                return
+            acq.AdcWindowDelay.set(window, True)
+            acq.AdcClkDelay.set(clk, True)
+            first = parser.frameCount()
+            for n in range(triggers):
+                self.Trigger()
+                if not parser.waitFrameCount(first+n+1, timeout):
+                    print('optimizeAdcTiming: no frame at window {} clk {}'.format(window, clk))
+                    points[(window, clk)] = (-numpy.inf, numpy.nan, numpy.nan)
+                    return
+            points[(window, clk)] = adcTimingScore(parser.d[first:first+triggers], channels)
+
+        def grid(lo, hi, center, step):
+            if center is None:
+                return range(lo, hi+1, step)
+            return [v for v in (center-step, center, center+step) if lo <= v <= hi]
+
+        best = (None, None)
+        while True:
+            for window in grid(windowRange[0], windowRange[1], best[0], windowStep):
+                for clk in grid(clkRange[0], clkRange[1], best[1], clkStep):
+                    measure(window, clk)
+            best = max(points, key=lambda k: points[k][0])
+            if windowStep == 1 and clkStep == 1:
+                break
+            windowStep = max(1, windowStep // 2)
+            clkStep = max(1, clkStep // 2)
+
+        # 2-D map of all the measured points, nan where not measured
+        windows = numpy.array(sorted({k[0] for k in points}))
+        clks = numpy.array(sorted({k[1] for k in points}))
+        scoreMap = numpy.full((3, len(windows), len(clks)), numpy.nan)
+        for (window, clk), values in points.items():
+            scoreMap[:, numpy.searchsorted(windows, window), numpy.searchsorted(clks, clk)] = values
+        if filename is not None:
+            numpy.savez(filename, AdcWindowDelay=windows, AdcClkDelay=clks,
+                        score=scoreMap[0], signal=scoreMap[1], noise=scoreMap[2])
+
+        final = best if apply else initial
+        acq.AdcWindowDelay.set(final[0], True)
+        acq.AdcClkDelay.set(final[1], True)
+        print('optimizeAdcTiming: AdcWindowDelay {} AdcClkDelay {} score {:.3f} ({} points)'.format(
+            best[0], best[1], points[best][0], len(points)))
+        return {'AdcWindowDelay': best[0], 'AdcClkDelay': best[1], 'score': points[best][0],
+                'windows': windows, 'clks': clks, 'score_map': scoreMap[0],
+                'signal_map': scoreMap[1], 'noise_map': scoreMap[2]}
+
+    def _asicConfigs(self, node):
+        asics = []
+        for child in node.nodes.values():
+            if isinstance(child, ELine100Config):
+                asics.append(child)
+            elif isinstance(child, pr.Device):
+                asics.extend(self._asicConfigs(child))
+        return asics
+
+
+def adcTimingScore(frames, channels=None):
+    """Scores the ADC sampling of repeated (frames, slots, adc channels, mck)
+    acquisitions. signal is the mean odd - even slot (signal - baseline)
+    difference, noise the std of every sample over the frames, both in ADC
+    counts and averaged over the pixels. Returns (signal / (noise + 1), signal, noise)"""
+    d = numpy.asarray(frames, dtype=numpy.int32)
+    if channels is not None:
+        d = d[:, :, channels, :]
+    # 14 bit two's complement samples
+    d = (d ^ 0x2000) - 0x2000
+    pairs = (d.shape[1] - 2) // 2
+    even = d[:, 2:2+2*pairs:2]
+    odd = d[:, 3:3+2*pairs:2]
+    signal = float(numpy.abs((odd - even).mean(axis=(0, 1))).mean())
+    noise = float(d.std(axis=0).mean()) if len(d) > 1 else 0.0
+    return (signal / (noise + 1.0), signal, noise)
+
 
 # Custom run control
 class CoulterRunControl(pr.RunControl):
@@ -87,17 +203,32 @@ class CoulterRunControl(pr.RunControl):
       self._runCount = 0
       self._last = int(time.time())
 
+      # The Coulter firmware has no auto trigger generator. Triggers are paced
+      # on absolute deadlines so the rate does not drift, and the run count
+      # is taken from the frames received by the data writer when available.
+      channel = self.root.dataWriter.getChannel(0) if hasattr(self.root, 'dataWriter') else None
+      startFrames = channel.getFrameCount() if channel is not None else 0
+      triggers = 0
+      nextTrigger = time.time()
+
       while (self._runState == 'Running'):
-          self.root.Trigger()          
+          self.root.Trigger()
+          triggers += 1
           if self._runRate == "Auto":
-              self.root.dataWriter.getChannel(0).waitFrameCount(self._runCount+1)
+              channel.waitFrameCount(startFrames+triggers)
           else:
-              delay = 1.0 / (self._revRunRateEnum[self._runRate])
-              time.sleep(delay)
-              # Add command here
-
-
-          self._runCount += 1
+              nextTrigger += 1.0 / (self._revRunRateEnum[self._runRate])
+              delay = nextTrigger - time.time()
+              if delay > 0:
+                  time.sleep(delay)
+              else:
+                  # running late, restart the schedule instead of bursting
+                  nextTrigger = time.time()
+
+          if channel is not None:
+              self._runCount = channel.getFrameCount() - startFrames
+          else:
+              self._runCount = triggers
           if self._last != int(time.time()):
               self._last = int(time.time())
               self.runCount._updated()
@@ -201,10 +332,70 @@ class ELine100Config(pr.Device):
                             offset = 0x44, bitSize = 1, bitOffset = 0, hidden = False,
                             function = cmd))
 
-        for n,v in self.variables.items():
-            if n != "EnaAnalogMonitor":
-                v.beforeReadCmd = self.ReadAsic
-                v.afterWriteCmd = self.WriteAsic
+        # ASIC fields, shifted in and out of the ASIC by WriteAsic/ReadAsic
+        self._asicVariables = [v for n,v in self.variables.items() if n != "EnaAnalogMonitor"]
+        self._configDepth = 0
+        self.setInteractive(True)
+
+    def setInteractive(self, interactive):
+        """In interactive mode every field write is followed by a WriteAsic and every
+        read preceded by a ReadAsic. Otherwise writes only update the FPGA shadow
+        registers until commitConfig() shifts them into the ASIC."""
+        for v in self._asicVariables:
+            v.beforeReadCmd = self.ReadAsic if interactive else None
+            v.afterWriteCmd = self.WriteAsic if interactive else None
+        self._interactive = interactive
+
+    def beginConfig(self):
+        """Starts staging field writes, calls can be nested"""
+        self._configDepth += 1
+        if self._interactive:
+            self.setInteractive(False)
+
+    def commitConfig(self, verify=False):
+        """Ends a beginConfig(). The outermost commit writes the staged shadow
+        registers, shifts them into the ASIC with a single WriteAsic and, with
+        verify, reads them back with a single ReadAsic. Returns the fields that
+        did not read back as written."""
+        self._configDepth = max(0, self._configDepth - 1)
+        if self._configDepth > 0:
+            return []
+
+        mismatches = []
+        try:
+            self.writeBlocks(force=False, recurse=False)
+            self.checkBlocks(recurse=False)
+            self.WriteAsic()
+            if verify:
+                staged = [(v, v.get(read=False)) for v in self._asicVariables]
+                self.ReadAsic()
+                self.readBlocks(recurse=False)
+                self.checkBlocks(recurse=False)
+                mismatches = [v.name for v,value in staged if v.get(read=False) != value]
+                if mismatches:
+                    print('{}: ASIC readback mismatch {}'.format(self.name, mismatches))
+        finally:
+            self.setInteractive(True)
+        return mismatches
+
+    def abortConfig(self):
+        """Ends a beginConfig() without shifting the ASIC, the staged values stay
+        in the shadow registers until the next WriteAsic"""
+        self._configDepth = max(0, self._configDepth - 1)
+        if self._configDepth == 0:
+            self.setInteractive(True)
+
+    @contextlib.contextmanager
+    def configTransaction(self, verify=False):
+        """with asic.configTransaction(): stages all the field writes of the block
+        and commits them with one ASIC shift when it exits"""
+        self.beginConfig()
+        try:
+            yield self
+        except:
+            self.abortConfig()
+            raise
+        self.commitConfig(verify=verify)
 
                 
 class AdcStreamFilter(pr.Device):
@@ -342,11 +533,42 @@ class AcquisitionControl(pr.Device):
 
 class CoulterFrameParser(rogue.interfaces.stream.Slave):
 
+    # every frame is stored as (slot, adc channel, mck) 14 bit samples
+    FRAME_SHAPE = (256, 12, 16)
+
     def __init__(self):
         rogue.interfaces.stream.Slave.__init__(self)
-        nesteddict = lambda:defaultdict(nesteddict)
-        self.d = []#nesteddict()
-
+        # frames are stacked in one array that doubles when full
+        self._frames = numpy.zeros(shape=(0,)+self.FRAME_SHAPE, dtype=numpy.uint16)
+        self._count = 0
+        self._frameCond = threading.Condition()
+
+    @property
+    def d(self):
+        """(frames, slots, adc channels, mck) view of the received frames"""
+        return self._frames[:self._count]
+
+    def clear(self):
+        with self._frameCond:
+            self._count = 0
+
+    def frameCount(self):
+        return self._count
+
+    def waitFrameCount(self, count, timeout=1.0):
+        """Waits until count frames were received, returns False on timeout"""
+        with self._frameCond:
+            return self._frameCond.wait_for(lambda: self._count >= count, timeout)
+
+    def _newFrame(self):
+        # the frame is only counted once decoded, see _acceptFrame
+        if self._count == len(self._frames):
+            grown = numpy.zeros(shape=(max(16, 2*len(self._frames)),)+self.FRAME_SHAPE, dtype=numpy.uint16)
+            grown[:self._count] = self._frames[:self._count]
+            self._frames = grown
+        frame = self._frames[self._count]
+        frame[...] = 0
+        return frame
 
     @staticmethod
     def conv(i, highBit, lowBit):
@@ -369,34 +591,31 @@ class CoulterFrameParser(rogue.interfaces.stream.Slave):
             print('CH = {}'.format(chNum))
             print(p.decode('utf-8'))
             return
-        
 
-        self.d.append(numpy.zeros(shape=(256, 12, 16), dtype=numpy.uint16))
-
-        lastByte = len(p)-16
-        frame = len(self.d)-1
-        byte = 16
-        meta =0
-        last = 0
-        channel = 0
-        slot = 0
-        low = 0
-        mid = 0
-        high = 0
-        print('Frame {}'.format(frame+1))
-        while byte < lastByte:
-            meta = int.from_bytes(p[byte:byte+2], 'little')
-            last = (meta >> 4) & 1
-            channel = (meta &0xf) 
-            slot = (meta >> 5) & 0x7ff
-
-            low = int.from_bytes(p[byte+2:byte+9], 'little')
-            high = int.from_bytes(p[byte+9:byte+16], 'little')
-
-            self.d[frame][slot, channel, last*8:last*8+4] = numpy.fromiter(((low >> (i*14))&0x3FFF for i in range(4)), numpy.uint16)
-            self.d[frame][slot, channel, last*8+4:last*8+8] = numpy.fromiter(((high >> (i*14))&0x3FFF for i in range(4)), numpy.uint16)
-            
-            byte = byte + 16
+        d = self._newFrame()
+        print('Frame {}'.format(self._count+1))
+
+        # 16 byte words after the 16 byte header, the last 16 bytes are not data:
+        # meta (16 bits) followed by two groups of four 14 bit samples (56 bits each)
+        words = len(range(16, len(p)-16, 16))
+        w = numpy.frombuffer(p, dtype=numpy.uint8, count=words*16, offset=16).reshape(words, 16)
+        meta = w[:, 0].astype(numpy.uint16) | (w[:, 1].astype(numpy.uint16) << 8)
+        last = (meta >> 4) & 1
+        channel = meta & 0xf
+        slot = (meta >> 5) & 0x7ff
+
+        groups = numpy.zeros(shape=(words, 2, 8), dtype=numpy.uint8)
+        groups[:, 0, :7] = w[:, 2:9]
+        groups[:, 1, :7] = w[:, 9:16]
+        groups = groups.view('<u8')
+        samples = (groups >> (14 * numpy.arange(4, dtype=numpy.uint64))) & 0x3FFF
+
+        # a word rewritten later in the frame overrides the earlier one
+        d[slot[:, None], channel[:, None], last[:, None]*8 + numpy.arange(8)] = samples.reshape(words, 8)
+
+        with self._frameCond:
+            self._count += 1
+            self._frameCond.notify_all()
 
 
     @staticmethod
@@ -409,16 +628,15 @@ class CoulterFrameParser(rogue.interfaces.stream.Slave):
         return (CoulterFrameParser.sign_extend(adc)/(2**14)) + 1.0
 
     def noise(self, filename=None):
-        d = numpy.array(self.d)
+        d = self.d
         even = d[10:, 2::2, :, :]
         odd =  d[10:, 3::2, :, :]
         print('{} samples'.format(len(d)))
         print("Pixels Noise")
 
-        noise = [((i,j),
-                  numpy.rint(numpy.std(even[:,:,i,j])),
-                  numpy.rint(numpy.std(odd[:,:,i,j])))                  
-            for i in range(12) for j in range(16)]
+        evenStd = numpy.rint(numpy.std(even, axis=(0,1)))
+        oddStd = numpy.rint(numpy.std(odd, axis=(0,1)))
+        noise = [((i,j), evenStd[i,j], oddStd[i,j]) for i in range(12) for j in range(16)]
 
         print("Pixel, std, mean, min, max")        
         pprint.pprint(sorted(noise, key=lambda x:x[0]))
@@ -432,12 +650,15 @@ class CoulterFrameParser(rogue.interfaces.stream.Slave):
         if filename is not None:
             numpy.save(filename, d)
 
-
+    def lastFrame(self):
+        """(slots, adc channels, mck) samples of the last frame"""
+        return self.d[-1]
 
     def pixelData(self, pixel):
+        """(frames, slots) view of the samples of pixel = (adc channel, mck)"""
         adc,mck = pixel
-        return [frame[:][adc][mck] for slot in range(256) for frame in self.d]
+        return self.d[:, :, adc, mck]
 
     def adcData(self, adcCh):
-        return [frame[:][adcCh][:] for slot in range(256) for frame in self.d for mck in range(16)]
-
+        """(frames, slots, mck) view of the samples of an adc channel"""
+        return self.d[:, :, adcCh, :]
@@ -31,6 +31,7 @@ import signal
 import atexit
 import yaml
 import time
+import numpy
 import sys
 import PyQt4.QtGui
 import PyQt4.QtCore
@@ -96,7 +97,13 @@ coulterDaq = coulter.CoulterRoot(pollEn=False, pgp=vcReg, srp=srp, trig=vcTrigge
 #    exit()
 
 
+# ASIC fields are staged and shifted once per ASIC instead of once per field
+asics = [coulterDaq.Coulter[0].ASIC[0], coulterDaq.Coulter[0].ASIC[1]]
+for asic in asics:
+    asic.beginConfig()
 coulterDaq.readConfig('/afs/slac/u/re/bareese/projects/epix-git/software/Coulter/cfg/config5.yml')
+for asic in asics:
+    asic.commitConfig()
 
 #for phase in range(0, 65536, 32):
 #print('Phase: {}'.format(phase))
@@ -106,29 +113,34 @@ coulterDaq.readConfig('/afs/slac/u/re/bareese/projects/epix-git/software/Coulter
 
 
 delay = 210
+clkDelay = 5
 
 while True:
-    tmp = input("Delay: ({})".format(delay))
-    if tmp != '':
+    tmp = input("Delay (or auto): ({})".format(delay))
+    if tmp == 'auto':
+        # sweeps both delays and keeps the best ones, the score map is saved for inspection
+        best = coulterDaq.optimizeAdcTiming(parsers[0], board=0, filename='adcTiming.npz')
+        delay = best['AdcWindowDelay']
+        clkDelay = best['AdcClkDelay']
+    elif tmp != '':
         delay = int(tmp)
     
     coulterDaq.Coulter[0].AcquisitionControl.AdcWindowDelay.set(delay, True)
-    coulterDaq.Coulter[0].AcquisitionControl.AdcClkDelay.set(5, True)
+    coulterDaq.Coulter[0].AcquisitionControl.AdcClkDelay.set(clkDelay, True)
 #    coulterDaq.Coulter[0].AcquisitionControl.ScCount.set(2048, True)    
-    coulterDaq.Coulter[0].ASIC[0].atest.set(0, True)
-    coulterDaq.Coulter[0].ASIC[1].atest.set(0, True)         
+    for asic in asics:
+        with asic.configTransaction():
+            asic.atest.set(0, True)
 
 
+    first = parsers[0].frameCount()
     coulterDaq.Trigger()
-
-    time.sleep(.1)
-
-    f = parsers[0].lastFrame()
-    #print(list(f.keys()), delay)
-    slot = 2
- 
-    for slot in (a for a in sorted(f.keys()) if a%2==1):
-        for channel in [0,]:
-            data = [f[slot][channel][pixel] for pixel in sorted(f[slot][channel].keys())]
-            print('Slot: {}, Channel: {}, Data: {}'.format(slot, channel, ['{:.3f}_{}'.format(voltage(d), hex(d)) for d in data]))
-
+    parsers[0].waitFrameCount(first+1)
+
+    #print(parsers[0].d.shape, delay)
+    for channel in [0,]:
+        # (slots, mck) samples of the last frame, odd slots that received data
+        data = parsers[0].adcData(channel)[-1]
+        volts = coulter.CoulterFrameParser.voltage(data.astype('int32'))
+        for slot in [a for a in numpy.flatnonzero(data.any(axis=1)) if a%2==1]:
+            print('Slot: {}, Channel: {}, Data: {}'.format(slot, channel, ['{:.3f}_{}'.format(v, hex(d)) for v,d in zip(volts[slot], data[slot])]))
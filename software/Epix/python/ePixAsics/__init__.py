@@ -8,3 +8,4 @@
 # contained in the LICENSE.txt file.
 #-----------------------------------------------------------------------------
 from ePixAsics._ePixAsics import *
+from ePixAsics._headless import *
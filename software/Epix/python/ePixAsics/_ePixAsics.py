@@ -25,17 +25,7 @@ import pyrogue as pr
 import collections
 import os
 import numpy as np
-
-usingPyQt5 = True
-
-try:
-    from PyQt5.QtWidgets import *
-    from PyQt5.QtCore    import *
-    from PyQt5.QtGui     import *
-except ImportError:
-    from PyQt4.QtCore    import *
-    from PyQt4.QtGui     import *
-    usingPyQt5 = False
+from ePixAsics._headless import getOpenFileName
 
 
 class Epix100aAsic(pr.Device):
@@ -295,15 +285,7 @@ class Epix100aAsic(pr.Device):
 
         if (self.enable.get()):
             self.reportCmd(dev,cmd,arg)
-            if not isinstance(arg, str):
-               arg = ''
-            if len(arg) > 0:
-               self.filename = arg
-            else:
-               self.filename = QFileDialog.getOpenFileName(self.root.guiTop, 'Open File', '', 'csv file (*.csv);; Any (*.*)')
-               # in PyQt5 QFileDialog returns a tuple
-               if usingPyQt5:
-                  self.filename = self.filename[0]
+            self.filename = getOpenFileName(self.root, arg)
             if os.path.splitext(self.filename)[1] == '.csv':
                 matrixCfg = np.genfromtxt(self.filename, delimiter=',')
                 if matrixCfg.shape == (354, 384):
@@ -340,15 +322,7 @@ class Epix100aAsic(pr.Device):
 
         if (self.enable.get()):
             self.reportCmd(dev,cmd,arg)
-            if not isinstance(arg, str):
-               arg = ''
-            if len(arg) > 0:
-               self.filename = arg
-            else:
-               self.filename = QFileDialog.getOpenFileName(self.root.guiTop, 'Open File', '', 'csv file (*.csv);; Any (*.*)')
-            # in PyQt5 QFileDialog returns a tuple
-            if usingPyQt5:
-               self.filename = self.filename[0]
+            self.filename = getOpenFileName(self.root, arg)
             if os.path.splitext(self.filename)[1] == '.csv':
                 readBack = np.zeros((354, 384),dtype='uint16')
                 self._rawWrite(0x00000000*addrSize,0)
@@ -638,13 +612,7 @@ class EpixSAsic(pr.Device):
 
         if (self.enable.get()):
             self.reportCmd(dev,cmd,arg)
-            if len(arg) > 0:
-                self.filename = arg
-            else:
-                self.filename = QFileDialog.getOpenFileName(self.root.guiTop, 'Open File', '', 'csv file (*.csv);; Any (*.*)')
-            # in PyQt5 QFileDialog returns a tuple
-            if usingPyQt5:
-               self.filename = self.filename[0]
+            self.filename = getOpenFileName(self.root, arg)
             if os.path.splitext(self.filename)[1] == '.csv':
                 matrixCfg = np.genfromtxt(self.filename, delimiter=',')
                 if matrixCfg.shape == (12, 10):
@@ -672,13 +640,7 @@ class EpixSAsic(pr.Device):
         if (self.enable.get()):
 
             self.reportCmd(dev,cmd,arg)
-            if len(arg) > 0:
-                self.filename = arg
-            else:
-                self.filename = QFileDialog.getOpenFileName(self.root.guiTop, 'Open File', '', 'csv file (*.csv);; Any (*.*)')
-            # in PyQt5 QFileDialog returns a tuple
-            if usingPyQt5:
-               self.filename = self.filename[0]
+            self.filename = getOpenFileName(self.root, arg)
             if os.path.splitext(self.filename)[1] == '.csv':
                 readBack = np.zeros((12, 10),dtype='uint16')
                 self._rawWrite(0x00000000*addrSize,0)
@@ -970,11 +932,6 @@ class Epix10kaAsic(pr.Device):
 #            self.checkBlocks(recurse=True, variable=None)
         @self.command(description='SetPixelBitmap command function', value='', retValue='')
         def SetPixelBitmap(arg, dev, cmd):
-            dlg = QFileDialog()
-
-            loadFile = dlg.getOpenFileNames(caption='load bitmap file', filter='Config Files(*.csv);;All Files(*.*)')
-
-
             """SetPixelBitmap command function"""
             if self._size == 0:
                 self._size = 0xfffff
@@ -983,13 +940,10 @@ class Epix10kaAsic(pr.Device):
 
             if (self.enable.get()):
                 self.reportCmd(dev, cmd, arg)
-            
-            # Detect QT5 return
-            if isinstance(loadFile,tuple):
-                loadFile = loadFile[0]
+                loadFile = getOpenFileName(self.root, arg, caption='load bitmap file', fileFilter='Config Files(*.csv);;All Files(*.*)')
 
-                if '.csv' in loadFile[0]:
-                    matrixCfg = np.genfromtxt(loadFile[0], delimiter=',')
+                if '.csv' in loadFile:
+                    matrixCfg = np.genfromtxt(loadFile, delimiter=',')
                     if matrixCfg.shape == (178, 192):
                         self._rawWrite(0x00000000 * addrSize, 0)
                         self._rawWrite(0x00008000 * addrSize, 0)
@@ -1013,7 +967,7 @@ class Epix10kaAsic(pr.Device):
                     else:
                         print('csv file must be 192x178 pixels')
                 else:
-                    print("Not csv file : ", loadFile[0])
+                    print("Not csv file : ", loadFile)
             else:
                 print("Warning: ASIC enable is set to False!")
 
@@ -1291,13 +1245,7 @@ class TixelAsic(pr.Device):
 
         if (self.enable.get()):
             self.reportCmd(dev,cmd,arg)
-            if len(arg) > 0:
-               self.filename = arg
-            else:
-               self.filename = QFileDialog.getOpenFileName(self.root.guiTop, 'Open File', '', 'csv file (*.csv);; Any (*.*)')
-            # in PyQt5 QFileDialog returns a tuple
-            if usingPyQt5:
-               self.filename = self.filename[0]
+            self.filename = getOpenFileName(self.root, arg)
             if os.path.splitext(self.filename)[1] == '.csv':
                 matrixCfg = np.genfromtxt(self.filename, delimiter=',')
                 if matrixCfg.shape == (48, 48):
@@ -1324,13 +1272,7 @@ class TixelAsic(pr.Device):
         self.root.Tixel.TixelFpgaRegisters.AsicR0Mode.set(True)
 
         if (self.enable.get()):
-            if len(arg) > 0:
-               self.filename = arg
-            else:
-               self.filename = QFileDialog.getOpenFileName(self.root.guiTop, 'Open File', '', 'csv file (*.csv);; Any (*.*)')
-            # in PyQt5 QFileDialog returns a tuple
-            if usingPyQt5:
-               self.filename = self.filename[0]
+            self.filename = getOpenFileName(self.root, arg)
             if os.path.splitext(self.filename)[1] == '.csv':
                 readBack = np.zeros((48,48),dtype='uint16')
                 self._rawWrite(0x00000000*addrSize,0)
@@ -1571,15 +1513,7 @@ class Cpix2Asic(pr.Device):
 
         if (self.enable.get()):
             self.reportCmd(dev,cmd,arg)
-            if not isinstance(arg, str):
-               arg = ''
-            if len(arg) > 0:
-               self.filename = arg
-            else:
-               self.filename = QFileDialog.getOpenFileName(self.root.guiTop, 'Open File', '', 'csv file (*.csv);; Any (*.*)')
-               # in PyQt5 QFileDialog returns a tuple
-               if usingPyQt5:
-                  self.filename = self.filename[0]
+            self.filename = getOpenFileName(self.root, arg)
             if os.path.splitext(self.filename)[1] == '.csv':
                 matrixCfg = np.genfromtxt(self.filename, delimiter=',')
                 if matrixCfg.shape == (48, 48):
@@ -1606,15 +1540,7 @@ class Cpix2Asic(pr.Device):
         #self.root.Cpix2.Cpix2FpgaRegisters.AsicR0Mode.set(True)
         if (self.enable.get()):
             self.reportCmd(dev,cmd,arg)
-            if not isinstance(arg, str):
-               arg = ''
-            if len(arg) > 0:
-               self.filename = arg
-            else:
-               self.filename = QFileDialog.getOpenFileName(self.root.guiTop, 'Open File', '', 'csv file (*.csv);; Any (*.*)')
-            # in PyQt5 QFileDialog returns a tuple
-            if usingPyQt5:
-               self.filename = self.filename[0]
+            self.filename = getOpenFileName(self.root, arg)
             if os.path.splitext(self.filename)[1] == '.csv':
                 readBack = np.zeros((48,48),dtype='uint16')
                 self._rawWrite(0x00000000*addrSize,0)
@@ -1909,13 +1835,7 @@ class EpixHrAdcAsic(pr.Device):
 
         if (self.enable.get()):
             self.reportCmd(dev,cmd,arg)
-            if len(arg) > 0:
-               self.filename = arg
-            else:
-               self.filename = QFileDialog.getOpenFileName(self.root.guiTop, 'Open File', '', 'csv file (*.csv);; Any (*.*)')
-            # in PyQt5 QFileDialog returns a tuple
-            if usingPyQt5:
-               self.filename = self.filename[0]
+            self.filename = getOpenFileName(self.root, arg)
             if os.path.splitext(self.filename)[1] == '.csv':
                 matrixCfg = np.genfromtxt(self.filename, delimiter=',')
                 if matrixCfg.shape == (178, 192):
@@ -1953,13 +1873,7 @@ class EpixHrAdcAsic(pr.Device):
 
         if (self.enable.get()):
             self.reportCmd(dev,cmd,arg)
-            if len(arg) > 0:
-               self.filename = arg
-            else:
-               self.filename = QFileDialog.getOpenFileName(self.root.guiTop, 'Open File', '', 'csv file (*.csv);; Any (*.*)')
-            # in PyQt5 QFileDialog returns a tuple
-            if usingPyQt5:
-               self.filename = self.filename[0]
+            self.filename = getOpenFileName(self.root, arg)
             if os.path.splitext(self.filename)[1] == '.csv':
                 readBack = np.zeros((178, 192),dtype='uint16')
                 self._rawWrite(0x00000000*addrSize,0)
@@ -0,0 +1,48 @@
+#-----------------------------------------------------------------------------
+# Title      : file dialogs and headless mode of the device trees
+#-----------------------------------------------------------------------------
+# File       : _headless.py
+# Created    : 2026-10-19
+#-----------------------------------------------------------------------------
+# Description:
+# The pixel map and waveform commands ask for a file with a QFileDialog when
+# no file name argument is given. Qt is only imported at that point, so the
+# device trees load without Qt or an X server. In headless mode (setHeadless
+# or the EPIX_HEADLESS environment variable) the file name argument is
+# required and no dialog is ever opened.
+#-----------------------------------------------------------------------------
+# This file is part of the rogue software platform. It is subject to
+# the license terms in the LICENSE.txt file found in the top-level directory
+# of this distribution and at:
+#    https://confluence.slac.stanford.edu/display/ppareg/LICENSE.html.
+# No part of the rogue software platform, including this file, may be
+# copied, modified, propagated, or distributed except according to the terms
+# contained in the LICENSE.txt file.
+#-----------------------------------------------------------------------------
+import os
+
+_headless = os.environ.get('EPIX_HEADLESS', '0').lower() not in ['', '0', 'false', 'no']
+
+def setHeadless(headless = True):
+   """In headless mode commands need their file name argument, no QFileDialog is opened"""
+   global _headless
+   _headless = headless
+
+def isHeadless():
+   return _headless
+
+def getOpenFileName(root, arg = '', caption = 'Open File', fileFilter = 'csv file (*.csv);; Any (*.*)'):
+   """Returns arg if it is a file name, otherwise asks for one with a QFileDialog on root.guiTop"""
+   if isinstance(arg, str) and len(arg) > 0:
+      return arg
+   if _headless:
+      raise ValueError('%s: a file name argument is required in headless mode' % caption)
+   try:
+      from PyQt5.QtWidgets import QFileDialog
+   except ImportError:
+      from PyQt4.QtGui import QFileDialog
+   filename = QFileDialog.getOpenFileName(getattr(root, 'guiTop', None), caption, '', fileFilter)
+   # in PyQt5 QFileDialog returns a tuple
+   if isinstance(filename, tuple):
+      filename = filename[0]
+   return str(filename)
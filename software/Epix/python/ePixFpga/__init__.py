@@ -8,3 +8,7 @@
 # contained in the LICENSE.txt file.
 #-----------------------------------------------------------------------------
 from ePixFpga._ePixFpga import *
+from ePixFpga._runControl import *
+from ePixFpga._configDiff import *
+from ePixFpga._registerStats import *
+from ePixFpga._startupProfile import *
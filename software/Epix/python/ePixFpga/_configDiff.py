@@ -0,0 +1,119 @@
+#!/usr/bin/env python
+#-----------------------------------------------------------------------------
+# Title      : PyRogue Root with incremental yaml configuration
+#-----------------------------------------------------------------------------
+# File       : _configDiff.py
+# Created    : 2026-10-19
+#-----------------------------------------------------------------------------
+# Description:
+# Root class applying a yaml configuration incrementally. Every value of the
+# file is compared with the current shadow value of its variable and only the
+# variables that differ are written, so re-applying the same config between
+# scan points costs almost nothing.
+#-----------------------------------------------------------------------------
+# This file is part of the rogue software platform. It is subject to
+# the license terms in the LICENSE.txt file found in the top-level directory
+# of this distribution and at:
+#    https://confluence.slac.stanford.edu/display/ppareg/LICENSE.html.
+# No part of the rogue software platform, including this file, may be
+# copied, modified, propagated, or distributed except according to the terms
+# contained in the LICENSE.txt file.
+#-----------------------------------------------------------------------------
+import pyrogue as pr
+import yaml
+
+
+class ConfigDiffRoot(pr.Root):
+   """pyrogue Root adding readConfigDiff().
+
+   The values of the file are compared with the shadow value of each variable
+   (the last value set or read), so changes done by the GUI or by scripts are
+   seen. Without initRead the shadows only hold the defaults after start(), so
+   a variable is always written the first time readConfigDiff meets it and
+   only compared after that. After registers were changed behind the software
+   (hardware reset, another client) use readConfigDiff(filename, force=True).
+
+   Sub classes can stage ASIC shift registers with _beginConfigDiff,
+   _commitConfigDiff and _abortConfigDiff.
+   """
+   def __init__(self, **kwargs):
+      super().__init__(**kwargs)
+
+      self._configSynced = set()
+      self._configAllSynced = False
+
+      self.add(pr.LocalCommand(name='ReadConfigDiff', description='Write the settings of a yaml file that differ from the current values', value='', function=self.fnReadConfigDiff))
+      self.add(pr.LocalCommand(name='ReadConfigForce', description='Write all the settings of a yaml file', value='', function=self.fnReadConfigForce))
+
+   def fnReadConfigDiff(self, dev, cmd, arg):
+      self.readConfigDiff(arg)
+
+   def fnReadConfigForce(self, dev, cmd, arg):
+      self.readConfigDiff(arg, force=True)
+
+   def start(self, **kwargs):
+      # with initRead the shadows hold the hardware values, otherwise nothing is known yet
+      self._configSynced = set()
+      self._configAllSynced = kwargs.get('initRead', False)
+      super().start(**kwargs)
+
+   def readConfigDiff(self, filename, force=False):
+      """applies a yaml file, returns the number of variables written"""
+      with open(filename, 'r') as f:
+         cfg = yaml.safe_load(f)
+
+      changes = []
+      self._beginConfigDiff()
+      try:
+         if self.name in cfg:
+            self._stageConfigDiff(self, cfg[self.name], self.name, changes, force)
+
+         # Staged values leave their blocks stale, write only those and retire once
+         self.writeBlocks(force=False, recurse=True)
+         self.checkBlocks(recurse=True)
+      except:
+         self._abortConfigDiff()
+         raise
+
+      self._configSynced.update(changes)
+      self._commitConfigDiff(changes)
+      return len(changes)
+
+   def _beginConfigDiff(self):
+      pass
+
+   def _commitConfigDiff(self, changes):
+      """changes is the list of the paths of the variables written"""
+      pass
+
+   def _abortConfigDiff(self):
+      pass
+
+   def _configDiffers(self, var, path, value):
+      if not (self._configAllSynced or path in self._configSynced):
+         return True
+      if isinstance(value, str):
+         return var.getDisp(read=False) != value
+      return var.get(read=False) != value
+
+   def _stageConfigDiff(self, node, cfg, path, changes, force):
+      # the enable flags go first so the devices are on before their registers are staged
+      for key in sorted(cfg.keys(), key=lambda k: k != 'enable'):
+         value = cfg[key]
+         child = node.nodes.get(key)
+         childPath = path + '.' + key
+         if child is None:
+            print('readConfigDiff: %s not found' % (childPath))
+         elif isinstance(value, dict):
+            self._stageConfigDiff(child, value, childPath, changes, force)
+         elif isinstance(child, pr.BaseCommand) or child.mode not in ['RW', 'WO']:
+            continue
+         elif force or self._configDiffers(child, childPath, value):
+            if isinstance(value, str):
+               child.setDisp(value, write=False)
+            else:
+               child.set(value, write=False)
+            changes.append(childPath)
+            # a device that was just enabled may have skipped its registers, write them all
+            if key == 'enable':
+               force = True
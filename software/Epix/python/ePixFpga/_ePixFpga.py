@@ -32,13 +32,50 @@ import surf
 import numpy as np
 import time
 
-try:
-    from PyQt5.QtWidgets import *
-    from PyQt5.QtCore    import *
-    from PyQt5.QtGui     import *
-except ImportError:
-    from PyQt4.QtCore    import *
-    from PyQt4.QtGui     import *
+PRINT_VERBOSE = 0
+
+
+def writeBlocksPipelined(dev, asics, subDevices, force=False, recurse=True, checkEach=False):
+   """
+   Issue the stale blocks of dev and of its subdevices as one pipelined batch
+   and retire them with a single checkBlocks. The ASICs are issued after the
+   FPGA registers, in mask order, and the ones outside the AsicMask are
+   disabled. The time spent on each subdevice is stored in dev.writeTiming.
+   """
+   timing = collections.OrderedDict()
+   start = time.time()
+
+   # Process local blocks.
+   for block in dev._blocks:
+      if force or block.stale:
+         if block.bulkEn:
+            block.startTransaction(rim.Write, check=checkEach)
+
+   # The AsicMask is read only (set by the firmware from the populated ASICs), its
+   # shadow value is not valid before a read so it is read back from hardware.
+   # This is the one blocking access of the batch, it is queued after the local writes.
+   dev.asicMask = dev.EpixFpgaRegisters.AsicMask.get()
+   timing[dev.name] = time.time() - start
+
+   for sub in subDevices:
+      if sub in asics:
+         if dev.asicMask&(1<<asics.index(sub)) == 0:
+            sub.enable.set(False)
+            continue
+      t = time.time()
+      sub.writeBlocks(force=force, recurse=recurse, checkEach=checkEach)
+      timing[sub.name] = time.time() - t
+
+   # Retire all the in-flight transactions at once
+   t = time.time()
+   dev._root.checkBlocks(recurse=True)
+   timing['checkBlocks'] = time.time() - t
+   timing['total'] = time.time() - start
+
+   dev.writeTiming = timing
+   if (PRINT_VERBOSE):
+      for key, value in timing.items():
+         print('%s.writeBlocks %-24s %8.3f ms' % (dev.name, key, value*1000.0))
 
 
 ################################################################################################
@@ -704,38 +741,23 @@ class Epix100a(pr.Device):
       """
       if not self.enable.get(): return
 
-      # Process local blocks.
+      # A single variable only needs its own block
       if variable is not None:
          variable._block.startTransaction(rim.Write, check=checkEach)
-      else:
-         for block in self._blocks:
-            if force or block.stale:
-                  if block.bulkEn:
-                     block.startTransaction(rim.Write, check=checkEach)
+         return
 
-      # Retire any in-flight transactions before starting next sequence
-      self._root.checkBlocks(recurse=True)
-
-      self.asicMask = self.EpixFpgaRegisters.AsicMask.get()
+      asics = [self.Epix100aAsic[i] for i in range(4)]
 
       # Load all the registers
-      self.AxiVersion.writeBlocks            ( force=force, recurse=recurse, variable=variable)
-      self.EpixFpgaRegisters.writeBlocks     ( force=force, recurse=recurse, variable=variable)
-      self.EpixFpgaExtRegisters.writeBlocks  ( force=force, recurse=recurse, variable=variable)
-      self.Oscilloscope.writeBlocks          ( force=force, recurse=recurse, variable=variable)
-      for i in range(4):
-         if self.asicMask&(1<<i) != 0:
-            self.Epix100aAsic[i].writeBlocks    ( force=force, recurse=recurse, variable=variable)
-         else:
-            self.Epix100aAsic[i].enable.set(False)
-
-      #self.Pgp2bAxi.writeBlocks              ( force=force, recurse=recurse, variable=variable)
-      self.SlowAdcRegisters.writeBlocks      ( force=force, recurse=recurse, variable=variable)
+      subDevices = [self.AxiVersion, self.EpixFpgaRegisters, self.EpixFpgaExtRegisters, self.Oscilloscope]
+      subDevices += asics
+      #subDevices += [self.Pgp2bAxi]
+      subDevices += [self.SlowAdcRegisters]
       for i in range(3):
-         self.Ad9249RdoutAdc[i].writeBlocks     ( force=force, recurse=recurse, variable=variable)
-         self.Ad9249ConfigAdc[i].writeBlocks    ( force=force, recurse=recurse, variable=variable)
-      self.MicronN25Q.writeBlocks            ( force=force, recurse=recurse, variable=variable)
-      self.MicroblazeLog.writeBlocks         ( force=force, recurse=recurse, variable=variable)
+         subDevices += [self.Ad9249RdoutAdc[i], self.Ad9249ConfigAdc[i]]
+      subDevices += [self.MicronN25Q, self.MicroblazeLog]
+
+      writeBlocksPipelined(self, asics, subDevices, force=force, recurse=recurse, checkEach=checkEach)
 
 
 ################################################################################################
@@ -787,38 +809,23 @@ class EpixS(pr.Device):
       """
       if not self.enable.get(): return
 
-      # Process local blocks.
+      # A single variable only needs its own block
       if variable is not None:
          variable._block.startTransaction(rim.Write, check=checkEach)
-      else:
-         for block in self._blocks:
-            if force or block.stale:
-                  if block.bulkEn:
-                     block.startTransaction(rim.Write, check=checkEach)
+         return
 
-      # Retire any in-flight transactions before starting next sequence
-      self._root.checkBlocks(recurse=True)
-
-      self.asicMask = self.EpixFpgaRegisters.AsicMask.get()
+      asics = [self.EpixSAsic[i] for i in range(4)]
 
       # Load all the registers
-      self.AxiVersion.writeBlocks            ( force=force, recurse=recurse, variable=variable)
-      self.EpixFpgaRegisters.writeBlocks     ( force=force, recurse=recurse, variable=variable)
-      self.EpixFpgaExtRegisters.writeBlocks  ( force=force, recurse=recurse, variable=variable)
-      self.Oscilloscope.writeBlocks          ( force=force, recurse=recurse, variable=variable)
-      for i in range(4):
-         if self.asicMask&(1<<i) != 0:
-            self.EpixSAsic[i].writeBlocks    ( force=force, recurse=recurse, variable=variable)
-         else:
-            self.EpixSAsic[i].enable.set(False)
-
-      #self.Pgp2bAxi.writeBlocks              ( force=force, recurse=recurse, variable=variable)
-      self.SlowAdcRegisters.writeBlocks      ( force=force, recurse=recurse, variable=variable)
+      subDevices = [self.AxiVersion, self.EpixFpgaRegisters, self.EpixFpgaExtRegisters, self.Oscilloscope]
+      subDevices += asics
+      #subDevices += [self.Pgp2bAxi]
+      subDevices += [self.SlowAdcRegisters]
       for i in range(3):
-         self.Ad9249RdoutAdc[i].writeBlocks     ( force=force, recurse=recurse, variable=variable)
-         self.Ad9249ConfigAdc[i].writeBlocks    ( force=force, recurse=recurse, variable=variable)
-      self.MicronN25Q.writeBlocks            ( force=force, recurse=recurse, variable=variable)
-      self.MicroblazeLog.writeBlocks         ( force=force, recurse=recurse, variable=variable)
+         subDevices += [self.Ad9249RdoutAdc[i], self.Ad9249ConfigAdc[i]]
+      subDevices += [self.MicronN25Q, self.MicroblazeLog]
+
+      writeBlocksPipelined(self, asics, subDevices, force=force, recurse=recurse, checkEach=checkEach)
 
 
 
@@ -879,39 +886,23 @@ class Epix10ka(pr.Device):
       """
       if not self.enable.get(): return
 
-      # Process local blocks.
+      # A single variable only needs its own block
       if variable is not None:
          variable._block.startTransaction(rim.Write, check=checkEach)
-      else:
-         for block in self._blocks:
-            if force or block.stale:
-                  if block.bulkEn:
-                     block.startTransaction(rim.Write, check=checkEach)
-
-      # Retire any in-flight transactions before starting next sequence
-      self._root.checkBlocks(recurse=True)
+         return
 
-      self.asicMask = self.EpixFpgaRegisters.AsicMask.get()
+      asics = [self.Epix10kaAsic[i] for i in range(4)]
 
       # Load all the registers
-      self.AxiVersion.writeBlocks            ( force=force, recurse=recurse, variable=variable)
-      self.EpixFpgaRegisters.writeBlocks     ( force=force, recurse=recurse, variable=variable)
-      self.EpixFpgaExtRegisters.writeBlocks  ( force=force, recurse=recurse, variable=variable)
-      self.Oscilloscope.writeBlocks          ( force=force, recurse=recurse, variable=variable)
-      self.Epix10kADouts.writeBlocks         ( force=force, recurse=recurse, variable=variable)
-      for i in range(4):
-         if self.asicMask&(1<<i) != 0:
-            self.Epix10kaAsic[i].writeBlocks    ( force=force, recurse=recurse, variable=variable)
-         else:
-            self.Epix10kaAsic[i].enable.set(False)
-
-      #self.Pgp2bAxi.writeBlocks              ( force=force, recurse=recurse, variable=variable)
-      self.SlowAdcRegisters.writeBlocks      ( force=force, recurse=recurse, variable=variable)
+      subDevices = [self.AxiVersion, self.EpixFpgaRegisters, self.EpixFpgaExtRegisters, self.Oscilloscope, self.Epix10kADouts]
+      subDevices += asics
+      #subDevices += [self.Pgp2bAxi]
+      subDevices += [self.SlowAdcRegisters]
       for i in range(3):
-         self.Ad9249RdoutAdc[i].writeBlocks     ( force=force, recurse=recurse, variable=variable)
-         self.Ad9249ConfigAdc[i].writeBlocks    ( force=force, recurse=recurse, variable=variable)
-      self.MicronN25Q.writeBlocks            ( force=force, recurse=recurse, variable=variable)
-      self.MicroblazeLog.writeBlocks         ( force=force, recurse=recurse, variable=variable)
+         subDevices += [self.Ad9249RdoutAdc[i], self.Ad9249ConfigAdc[i]]
+      subDevices += [self.MicronN25Q, self.MicroblazeLog]
+
+      writeBlocksPipelined(self, asics, subDevices, force=force, recurse=recurse, checkEach=checkEach)
 
 class EpixFpgaRegisters(pr.Device):
    def __init__(self, **kwargs):
@@ -1689,10 +1680,7 @@ class AsicDeserHrRegisters(pr.Device):
 
         if (self.enable.get()):
             self.reportCmd(dev,cmd,arg)
-            if len(arg) > 0:
-                self.filename = arg
-            else:
-                self.filename = QFileDialog.getOpenFileName(self.root.guiTop, 'Open File', '', 'csv file (*.csv);; Any (*.*)')
+            self.filename = epix.getOpenFileName(self.root, arg)
             if os.path.splitext(self.filename)[1] == '.csv':
                 matrixCfg = np.genfromtxt(self.filename, delimiter=',')
                 if matrixCfg.shape == (354, 384):
@@ -1818,10 +1806,7 @@ class AsicDeserRegisters(pr.Device):
 
         if (self.enable.get()):
             self.reportCmd(dev,cmd,arg)
-            if len(arg) > 0:
-                self.filename = arg
-            else:
-                self.filename = QFileDialog.getOpenFileName(self.root.guiTop, 'Open File', '', 'csv file (*.csv);; Any (*.*)')
+            self.filename = epix.getOpenFileName(self.root, arg)
             if os.path.splitext(self.filename)[1] == '.csv':
                 matrixCfg = np.genfromtxt(self.filename, delimiter=',')
                 if matrixCfg.shape == (354, 384):
@@ -2084,7 +2069,7 @@ class WaveformMemoryDevice(pr.MemoryDevice):
 
     def fnSetWaveform(self, dev,cmd,arg):
         """SetTestBitmap command function"""
-        self.filename = QFileDialog.getOpenFileName(self.root.guiTop, 'Open File', '', 'csv file (*.csv);; Any (*.*)')
+        self.filename = epix.getOpenFileName(self.root, arg)
         if os.path.splitext(self.filename)[1] == '.csv':
             waveform = np.genfromtxt(self.filename, delimiter=',', dtype='uint16')
             if waveform.shape == (1024,):
@@ -2095,7 +2080,7 @@ class WaveformMemoryDevice(pr.MemoryDevice):
 
     def fnGetWaveform(self, dev,cmd,arg):
         """GetTestBitmap command function"""
-        self.filename = QFileDialog.getOpenFileName(self.root.guiTop, 'Open File', '', 'csv file (*.csv);; Any (*.*)')
+        self.filename = epix.getOpenFileName(self.root, arg)
         if os.path.splitext(self.filename)[1] == '.csv':
             readBack = np.zeros((1024),dtype='uint16')
             for x in range (0, 1024):
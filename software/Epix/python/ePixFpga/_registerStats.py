@@ -0,0 +1,305 @@
+#!/usr/bin/env python
+#-----------------------------------------------------------------------------
+# Title      : PyRogue register access statistics
+#-----------------------------------------------------------------------------
+# File       : _registerStats.py
+# Created    : 2026-10-19
+#-----------------------------------------------------------------------------
+# Description:
+# Opt-in instrumentation of a pyrogue device tree. While it is installed every
+# remote variable read/write, _rawRead/_rawWrite/_rawTxnChunker call, block
+# operation and command is counted per node with the bytes moved and a
+# latency histogram, so the register traffic hot spots of slow procedures
+# (ADC training, pixel maps, yaml loads) can be ranked. The wrappers are only
+# added by install() and removed again by remove(), a tree that is not
+# instrumented runs unchanged.
+#-----------------------------------------------------------------------------
+# This file is part of the rogue software platform. It is subject to
+# the license terms in the LICENSE.txt file found in the top-level directory
+# of this distribution and at:
+#    https://confluence.slac.stanford.edu/display/ppareg/LICENSE.html.
+# No part of the rogue software platform, including this file, may be
+# copied, modified, propagated, or distributed except according to the terms
+# contained in the LICENSE.txt file.
+#-----------------------------------------------------------------------------
+import pyrogue as pr
+import bisect
+import functools
+import threading
+import time
+import numpy as np
+
+# latency histogram bins, 1 us to 100 s, 2 bins per decade
+LATENCY_BIN_EDGES = list(np.logspace(-6, 2, 17))
+
+# access kinds that are single bus accesses, the others (blocks, commands) include the accesses they make
+BUS_ACCESS_KINDS = ['read', 'write', 'post', 'rawRead', 'rawWrite', 'rawTxn']
+
+_MISSING = object()
+
+
+class RegisterStats():
+   """count, bytes, total/max time and latency histogram per (node path, access kind)"""
+
+   def __init__(self):
+      self._lock = threading.Lock()
+      self.reset()
+
+   def reset(self):
+      with self._lock:
+         self.entries = {}
+         self.startTime = time.time()
+
+   def record(self, path, kind, seconds, numBytes = 0):
+      with self._lock:
+         entry = self.entries.get((path, kind))
+         if entry is None:
+            entry = self.entries[(path, kind)] = {'count' : 0, 'bytes' : 0, 'time' : 0.0, 'maxTime' : 0.0,
+                                                  'hist' : [0] * (len(LATENCY_BIN_EDGES) + 1)}
+         entry['count'] += 1
+         entry['bytes'] += numBytes
+         entry['time'] += seconds
+         entry['maxTime'] = max(entry['maxTime'], seconds)
+         entry['hist'][bisect.bisect_right(LATENCY_BIN_EDGES, seconds)] += 1
+
+   def totals(self):
+      """[accesses, bytes, seconds] of the single bus accesses"""
+      with self._lock:
+         entries = [e for (path, kind), e in self.entries.items() if kind in BUS_ACCESS_KINDS]
+      return [sum(e['count'] for e in entries), sum(e['bytes'] for e in entries), sum(e['time'] for e in entries)]
+
+   def ranked(self, key = 'time', count = None, kinds = None):
+      """list of (path, kind, entry) sorted by key (time, count, bytes or maxTime), largest first"""
+      with self._lock:
+         items = [(path, kind, dict(e)) for (path, kind), e in self.entries.items() if (kinds is None) or (kind in kinds)]
+      items.sort(key = lambda item: item[2][key], reverse = True)
+      return items[:count]
+
+   def report(self, key = 'time', count = None, kinds = None):
+      """text table of the ranked entries"""
+      [accesses, numBytes, seconds] = self.totals()
+      lines = ['Register access statistics over %.1f s: %d bus accesses, %d bytes, %.3f s waiting'
+               % (time.time() - self.startTime, accesses, numBytes, seconds),
+               '%-60s %-12s %10s %12s %12s %12s %12s' % ('Path', 'Kind', 'Count', 'Bytes', 'Total ms', 'Mean us', 'Max ms')]
+      for [path, kind, e] in self.ranked(key, count, kinds):
+         lines.append('%-60s %-12s %10d %12d %12.3f %12.1f %12.3f' % (path, kind, e['count'], e['bytes'],
+                      e['time'] * 1e3, e['time'] / e['count'] * 1e6, e['maxTime'] * 1e3))
+      return '\n'.join(lines)
+
+
+def _dataBytes(args, kwargs, dataIndex, default):
+   # bytes of the data argument of _rawWrite/_rawTxnChunker, or numWords words
+   data = args[dataIndex] if len(args) > dataIndex else kwargs.get('data', None)
+   stride = kwargs.get('stride', 4)
+   if isinstance(data, (bytes, bytearray)):
+      return len(data)
+   if data is not None and hasattr(data, '__len__'):
+      return len(data) * stride
+   if data is None:
+      return kwargs.get('numWords', default) * stride
+   return stride
+
+def _rawWriteBytes(args, kwargs):
+   return _dataBytes(args, kwargs, 1, 1)
+
+def _rawReadBytes(args, kwargs):
+   numWords = args[1] if len(args) > 1 else kwargs.get('numWords', 1)
+   return numWords * kwargs.get('stride', 4)
+
+def _rawTxnBytes(args, kwargs):
+   return _dataBytes(args, kwargs, 1, 1)
+
+def _varBytes(var):
+   bitSize = getattr(var, 'bitSize', 0)
+   if isinstance(bitSize, (list, tuple)):
+      bitSize = sum(bitSize)
+   return (int(bitSize) + 7) // 8
+
+
+class RegisterInstrumentation():
+   """installs timing wrappers on the devices, remote variables and commands below a node"""
+
+   DEVICE_METHODS = [
+      ('_rawWrite',        'rawWrite', _rawWriteBytes),
+      ('_rawRead',         'rawRead',  _rawReadBytes),
+      ('_rawTxnChunker',   'rawTxn',   _rawTxnBytes),
+      ('_waitTransaction', 'wait',     None),
+      ('writeBlocks',      'writeBlocks',  None),
+      ('readBlocks',       'readBlocks',   None),
+      ('verifyBlocks',     'verifyBlocks', None),
+      ('checkBlocks',      'checkBlocks',  None),
+   ]
+
+   def __init__(self, node, stats, exclude = None):
+      self.node = node
+      self.stats = stats
+      self.exclude = exclude
+      self._patched = []
+      self._swapped = []
+
+   @property
+   def installed(self):
+      return len(self._patched) + len(self._swapped) > 0
+
+   def install(self):
+      if not self.installed:
+         self._walk(self.node)
+
+   def remove(self):
+      """restores the original methods and classes"""
+      for [obj, name, previous] in self._patched:
+         if previous is _MISSING:
+            obj.__dict__.pop(name, None)
+         else:
+            obj.__dict__[name] = previous
+      for [cmd, cls] in self._swapped:
+         cmd.__class__ = cls
+      self._patched = []
+      self._swapped = []
+
+   def _walk(self, node):
+      if node is self.exclude:
+         return
+      if isinstance(node, pr.BaseCommand):
+         self._swapCommand(node)
+      if isinstance(node, pr.RemoteVariable):
+         self._wrapVariable(node)
+      if isinstance(node, pr.Device):
+         self._wrapDevice(node)
+         for child in list(node.nodes.values()):
+            self._walk(child)
+
+   def _patch(self, obj, name, function):
+      self._patched.append([obj, name, obj.__dict__.get(name, _MISSING)])
+      obj.__dict__[name] = function
+
+   def _timed(self, path, kind, function, numBytes = None):
+      stats = self.stats
+      @functools.wraps(function)
+      def wrapper(*args, **kwargs):
+         start = time.perf_counter()
+         try:
+            return function(*args, **kwargs)
+         finally:
+            stats.record(path, kind, time.perf_counter() - start, numBytes(args, kwargs) if numBytes else 0)
+      return wrapper
+
+   def _wrapDevice(self, dev):
+      for [name, kind, numBytes] in self.DEVICE_METHODS:
+         function = getattr(dev, name, None)
+         if function is not None:
+            self._patch(dev, name, self._timed(dev.path, kind, function, numBytes))
+
+   def _wrapVariable(self, var):
+      stats = self.stats
+      path = var.path
+      numBytes = _varBytes(var)
+      get = var.get
+      set = var.set
+      post = getattr(var, 'post', None)
+
+      # get(read=True, ...) and set(value, write=True, ...), only the bus accesses are recorded
+      @functools.wraps(get)
+      def timedGet(*args, **kwargs):
+         if not kwargs.get('read', args[0] if len(args) > 0 else True):
+            return get(*args, **kwargs)
+         start = time.perf_counter()
+         try:
+            return get(*args, **kwargs)
+         finally:
+            stats.record(path, 'read', time.perf_counter() - start, numBytes)
+
+      @functools.wraps(set)
+      def timedSet(*args, **kwargs):
+         if not kwargs.get('write', args[1] if len(args) > 1 else True):
+            return set(*args, **kwargs)
+         start = time.perf_counter()
+         try:
+            return set(*args, **kwargs)
+         finally:
+            stats.record(path, 'write', time.perf_counter() - start, numBytes)
+
+      self._patch(var, 'get', timedGet)
+      self._patch(var, 'set', timedSet)
+      if post is not None:
+         self._patch(var, 'post', self._timed(path, 'post', post, lambda args, kwargs: numBytes))
+
+   def _swapCommand(self, cmd):
+      # __call__ is looked up on the class, the command gets a subclass with the same name
+      cls = cmd.__class__
+      self._swapped.append([cmd, cls])
+      cmd.__class__ = _timedCommandClass(cls)
+      cmd._registerStats = self.stats
+
+
+@functools.lru_cache(maxsize=None)
+def _timedCommandClass(cls):
+   def __call__(self, *args, **kwargs):
+      start = time.perf_counter()
+      try:
+         return cls.__call__(self, *args, **kwargs)
+      finally:
+         self._registerStats.record(self.path, 'command', time.perf_counter() - start)
+   return type(cls.__name__, (cls,), {'__call__' : __call__, '__qualname__' : cls.__qualname__, '__module__' : cls.__module__})
+
+
+class RegisterStatsMonitor(pr.Device):
+   def __init__(self, topCount = 10, **kwargs):
+      """Create the register access statistics, the instrumentation covers the whole tree of the root"""
+      super().__init__(description='Register Access Statistics', **kwargs)
+
+      self._stats = RegisterStats()
+      self._instrumentation = None
+      self._topCount = topCount
+
+      self.add(pr.LocalVariable(name='Enabled',      description='Instrumentation installed',             mode='RO', value=False, localGet=lambda dev, var: self.enabled))
+      self.add(pr.LocalVariable(name='BusAccesses',  description='Register reads and writes',             mode='RO', value=0,   localGet=lambda dev, var: self._stats.totals()[0], pollInterval=1))
+      self.add(pr.LocalVariable(name='BusBytes',     description='Bytes moved by the register accesses',  mode='RO', value=0,   localGet=lambda dev, var: self._stats.totals()[1], pollInterval=1))
+      self.add(pr.LocalVariable(name='BusTime',      description='Time spent waiting for register accesses', mode='RO', value=0.0, units='s', disp='{:1.3f}', localGet=lambda dev, var: self._stats.totals()[2], pollInterval=1))
+      self.add(pr.LocalVariable(name='HotSpots',     description='Nodes with the longest total access time', mode='RO', value='', localGet=self._getHotSpots))
+
+      self.add(pr.LocalCommand(name='StartStats', description='Install the instrumentation on the whole tree', function=self.fnStartStats))
+      self.add(pr.LocalCommand(name='StopStats',  description='Remove the instrumentation, the statistics are kept', function=self.fnStopStats))
+      self.add(pr.LocalCommand(name='ResetStats', description='Clear the statistics', function=self.fnResetStats))
+      self.add(pr.LocalCommand(name='WriteReport', description='Write the ranked statistics to a text file', value='', function=self.fnWriteReport))
+
+   @property
+   def stats(self):
+      return self._stats
+
+   @property
+   def enabled(self):
+      return (self._instrumentation is not None) and self._instrumentation.installed
+
+   def start(self):
+      if self._instrumentation is None:
+         self._instrumentation = RegisterInstrumentation(self.root, self._stats, exclude=self)
+      self._instrumentation.install()
+
+   def stop(self):
+      if self._instrumentation is not None:
+         self._instrumentation.remove()
+
+   def report(self, filename = None, key = 'time', count = None):
+      """returns the ranked statistics, also written to filename if given"""
+      text = self._stats.report(key, count)
+      if filename:
+         with open(filename, 'w') as f:
+            f.write(text + '\n')
+      return text
+
+   def _getHotSpots(self, dev, var):
+      return '\n'.join('%s %s: %d x, %.1f ms' % (path, kind, e['count'], e['time'] * 1e3)
+                       for [path, kind, e] in self._stats.ranked('time', self._topCount, BUS_ACCESS_KINDS))
+
+   def fnStartStats(self, dev, cmd, arg):
+      self.start()
+
+   def fnStopStats(self, dev, cmd, arg):
+      self.stop()
+
+   def fnResetStats(self, dev, cmd, arg):
+      self._stats.reset()
+
+   def fnWriteReport(self, dev, cmd, arg):
+      print(self.report(arg if isinstance(arg, str) else None))
@@ -0,0 +1,146 @@
+#!/usr/bin/env python
+#-----------------------------------------------------------------------------
+# Title      : PyRogue hardware trigger run control
+#-----------------------------------------------------------------------------
+# File       : _runControl.py
+# Created    : 2026-10-19
+#-----------------------------------------------------------------------------
+# Description:
+# Run control that programs the FPGA auto trigger generator with the selected
+# rate instead of sending software triggers from a python sleep loop.
+# The run count is taken from the frames received on the data stream.
+#-----------------------------------------------------------------------------
+# This file is part of the rogue software platform. It is subject to
+# the license terms in the LICENSE.txt file found in the top-level directory
+# of this distribution and at:
+#    https://confluence.slac.stanford.edu/display/ppareg/LICENSE.html.
+# No part of the rogue software platform, including this file, may be
+# copied, modified, propagated, or distributed except according to the terms
+# contained in the LICENSE.txt file.
+#-----------------------------------------------------------------------------
+import pyrogue as pr
+import rogue.interfaces.stream
+import threading
+import time
+
+HW_TRIGGER_RATES = {1:'1 Hz', 2:'2 Hz', 4:'4 Hz', 8:'8 Hz', 10:'10 Hz', 30:'30 Hz', 60:'60 Hz', 120:'120 Hz',
+                    240:'240 Hz', 480:'480 Hz', 1000:'1 kHz', 2000:'2 kHz', 5000:'5 kHz', 10000:'10 kHz'}
+
+
+class _RunFrameCounter(rogue.interfaces.stream.Slave):
+   """counts the frames of the data stream, connect with pyrogue.streamTap"""
+
+   def __init__(self, runControl):
+      rogue.interfaces.stream.Slave.__init__(self)
+      self._runControl = runControl
+
+   def _acceptFrame(self, frame):
+      self._runControl._frameReceived()
+
+
+class HwTriggerRunControl(pr.RunControl):
+   """Run control using the FPGA auto trigger generator.
+
+   trigger   : path (relative to the root) of the EpixFpgaRegisters or
+               TriggerRegisters device providing the auto trigger
+   baseClock : trigger generator clock in Hz, read from the device if None
+   framesPerTrigger : data stream frames sent for each trigger
+   """
+   def __init__(self, name='runControl', description='Hardware Trigger Run Controller', trigger='', baseClock=None, framesPerTrigger=1, rates=HW_TRIGGER_RATES, **kwargs):
+      super().__init__(name=name, description=description, rates=rates, **kwargs)
+
+      self._trigPath         = trigger
+      self._baseClock        = baseClock
+      self._framesPerTrigger = framesPerTrigger
+      self._thread           = None
+      self._running          = False
+      self._frameCount       = 0
+      self._frameCond        = threading.Condition()
+      self._slave            = _RunFrameCounter(self)
+      self._last             = int(time.time())
+
+      self.add(pr.LocalVariable(name='RunFrames', description='Number of frames to acquire (0 runs until stopped)', mode='RW', value=0))
+
+   def _getStreamSlave(self):
+      return self._slave
+
+   def _triggerRegs(self):
+      """returns (period, run enable, daq enable, base clock) of the trigger device"""
+      dev = self.root.getNode(self.root.name + '.' + self._trigPath)
+      # register accesses of a disabled device are dropped (TriggerRegisters of HrPrototype is created disabled)
+      if not dev.enable.get():
+         print('HwTriggerRunControl: enabling %s' % dev.path)
+         dev.enable.set(True)
+      if hasattr(dev, 'AutoTrigPeriod'):
+         regs = [dev.AutoTrigPeriod, dev.AutoRunEn, dev.AutoDaqEn]
+      else:
+         regs = [dev.AutoRunPeriod, dev.AutoRunEnable, dev.AutoDaqEnable]
+      baseClk = self._baseClock
+      if baseClk is None:
+         # EpixFpgaRegisters reads the clock from firmware, TriggerRegisters gets it at construction
+         baseClk = dev.BaseClock.get() if isinstance(dev.BaseClock, pr.BaseVariable) else dev.BaseClock
+      return regs + [baseClk]
+
+   def _setRunState(self,dev,var,value,changed):
+      if changed:
+         if self.runState.get(read=False) == 'Running':
+            self._startRun()
+         else:
+            self._stopRun()
+
+   def _startRun(self):
+      [period, runEn, daqEn, baseClk] = self._triggerRegs()
+      rate = {value: key for key,value in self.runRate.enum.items()}[self._runRate]
+      if baseClk == 0:
+         print('HwTriggerRunControl: trigger base clock unknown, run not started')
+         return
+
+      with self._frameCond:
+         self._frameCount = 0
+         self._runCount   = 0
+         self._running    = True
+      self._last = int(time.time())
+      self.runCount._updated()
+
+      period.set(int(round(baseClk / rate)))
+      daqEn.set(True)
+      runEn.set(True)
+
+      # python only waits when a fixed number of frames is requested
+      if self.RunFrames.get() > 0:
+         self._thread = threading.Thread(target=self._run)
+         self._thread.start()
+
+   def _stopRun(self):
+      [period, runEn, daqEn, baseClk] = self._triggerRegs()
+      runEn.set(False)
+      daqEn.set(False)
+
+      with self._frameCond:
+         self._running = False
+         self._frameCond.notify_all()
+      if self._thread is not None and self._thread is not threading.current_thread():
+         self._thread.join()
+      self._thread = None
+      self.runCount._updated()
+
+   def _run(self):
+      frames = self.RunFrames.get() * self._framesPerTrigger
+      with self._frameCond:
+         while self._running and self._frameCount < frames:
+            self._frameCond.wait(1.0)
+         done = self._running
+      if done:
+         self.runState.set('Stopped')
+
+   def _frameReceived(self):
+      with self._frameCond:
+         if not self._running:
+            return
+         self._frameCount += 1
+         self._runCount = self._frameCount // self._framesPerTrigger
+         if self._thread is not None:
+            self._frameCond.notify_all()
+      if self._last != int(time.time()):
+         self._last = int(time.time())
+         self.runCount._updated()
@@ -0,0 +1,143 @@
+#!/usr/bin/env python
+#-----------------------------------------------------------------------------
+# Title      : PyRogue startup profiler
+#-----------------------------------------------------------------------------
+# File       : _startupProfile.py
+# Created    : 2026-10-19
+#-----------------------------------------------------------------------------
+# Description:
+# Times the construction of every pyrogue Device class while a Root is built,
+# plus named stages such as Root creation and start(). Each class gets its
+# instance count and the constructor time with and without the sub-devices
+# it creates, so the classes that dominate the startup of a large tree (ASIC
+# and ADC groups, monitoring) can be ranked.
+#
+# usage:  with fpga.StartupProfiler() as prof:
+#            with prof.stage('Root'):
+#               root = ePixQuad.Top(...)
+#            with prof.stage('start'):
+#               root.start()
+#         print(prof.report(root))
+#-----------------------------------------------------------------------------
+# This file is part of the rogue software platform. It is subject to
+# the license terms in the LICENSE.txt file found in the top-level directory
+# of this distribution and at:
+#    https://confluence.slac.stanford.edu/display/ppareg/LICENSE.html.
+# No part of the rogue software platform, including this file, may be
+# copied, modified, propagated, or distributed except according to the terms
+# contained in the LICENSE.txt file.
+#-----------------------------------------------------------------------------
+import pyrogue as pr
+import contextlib
+import functools
+import time
+
+
+def _subclasses(cls):
+   result = []
+   for sub in cls.__subclasses__():
+      result.append(sub)
+      result.extend(_subclasses(sub))
+   return result
+
+
+class StartupProfiler():
+   """Wraps the __init__ of pyrogue.Device and all its subclasses imported so far"""
+
+   def __init__(self, baseClass = pr.Device):
+      self.baseClass = baseClass
+      self.classes = {}
+      self.stages = []
+      self._patched = []
+      self._stack = []
+
+   def __enter__(self):
+      self.install()
+      return self
+
+   def __exit__(self, *args):
+      self.remove()
+
+   def install(self):
+      if len(self._patched) > 0:
+         return
+      for cls in set([self.baseClass] + _subclasses(self.baseClass)):
+         init = cls.__dict__.get('__init__')
+         if init is not None:
+            self._patched.append([cls, init])
+            setattr(cls, '__init__', self._wrap(init))
+
+   def remove(self):
+      for [cls, init] in self._patched:
+         setattr(cls, '__init__', init)
+      self._patched = []
+
+   @contextlib.contextmanager
+   def stage(self, name):
+      """times a named startup stage (Root creation, start, initial read)"""
+      start = time.perf_counter()
+      try:
+         yield
+      finally:
+         self.stages.append([name, time.perf_counter() - start])
+
+   def _wrap(self, init):
+      stack = self._stack
+      classes = self.classes
+
+      @functools.wraps(init)
+      def __init__(obj, *args, **kwargs):
+         # super().__init__ calls of the object being built are part of its own time
+         if len(stack) > 0 and stack[-1][0] is obj:
+            return init(obj, *args, **kwargs)
+         entry = [obj, 0.0]
+         stack.append(entry)
+         start = time.perf_counter()
+         try:
+            return init(obj, *args, **kwargs)
+         finally:
+            elapsed = time.perf_counter() - start
+            stack.pop()
+            if len(stack) > 0:
+               stack[-1][1] += elapsed
+            cls = type(obj)
+            key = cls.__module__ + '.' + cls.__qualname__
+            stats = classes.setdefault(key, {'instances' : 0, 'total' : 0.0, 'self' : 0.0})
+            stats['instances'] += 1
+            stats['total'] += elapsed
+            stats['self'] += elapsed - entry[1]
+      return __init__
+
+   @staticmethod
+   def nodeCounts(root):
+      """per device class [devices, variables, commands] of the tree below root"""
+      counts = {}
+      def walk(dev):
+         cls = type(dev)
+         key = cls.__module__ + '.' + cls.__qualname__
+         entry = counts.setdefault(key, [0, 0, 0])
+         entry[0] += 1
+         for node in dev.nodes.values():
+            if isinstance(node, pr.Device):
+               walk(node)
+            elif isinstance(node, pr.BaseCommand):
+               entry[2] += 1
+            elif isinstance(node, pr.BaseVariable):
+               entry[1] += 1
+      walk(root)
+      return counts
+
+   def report(self, root = None, count = None):
+      """text table of the stages and of the device classes ranked by their own construction time"""
+      lines = ['%-30s %10s' % ('Stage', 'ms')]
+      for [name, seconds] in self.stages:
+         lines.append('%-30s %10.1f' % (name, seconds * 1e3))
+      counts = self.nodeCounts(root) if root is not None else {}
+      lines.append('')
+      lines.append('%-60s %9s %9s %9s %10s %10s %10s' % ('Device class', 'instances', 'variables', 'commands', 'total ms', 'self ms', 'ms/inst'))
+      ranked = sorted(self.classes.items(), key = lambda item: item[1]['self'], reverse = True)
+      for [key, stats] in ranked[:count]:
+         [devices, variables, commands] = counts.get(key, [0, 0, 0])
+         lines.append('%-60s %9d %9d %9d %10.1f %10.1f %10.2f' % (key, stats['instances'], variables, commands,
+                      stats['total'] * 1e3, stats['self'] * 1e3, stats['self'] / stats['instances'] * 1e3))
+      return '\n'.join(lines)
@@ -20,97 +20,58 @@
 import pyrogue as pr
 import collections
 import numpy as np
+import ePixViewer.QuadFormat as conv
 
 class EpixQuadMonitor(pr.Device):
    def __init__(self, **kwargs):
       """Create the configuration device for Monitoring Core data readout"""
       super().__init__(description='Temperature Sensors Registers', **kwargs)
       
+      # conversions are shared with the image footer decoder (ePixViewer.QuadFormat)
       def getPwrCurr(var):
-         x = var.dependencies[0].value()
-         return x * 0.1024 / 4095 / 0.02
+         return conv.pwrCurr(var.dependencies[0].value())
       
       def getPwrVin(var):
-         x = var.dependencies[0].value()
-         return x * 102.4 / 4095
+         return conv.pwrVin(var.dependencies[0].value())
       
       def getPwrTemp(var):
-         x = var.dependencies[0].value()
-         a = 130.0/(0.882-1.951)
-         b = (0.882/0.0082)+100
-         return x * 2.048 / 4095 * a + b
+         return conv.pwrTemp(var.dependencies[0].value())
          
       def getShtHum(var):
-         x = var.dependencies[0].value()
-         return x / 65535.0 * 100.0
+         return conv.shtHum(var.dependencies[0].value())
       
       def getShtTemp(var):
-         x = var.dependencies[0].value()
-         return x / 65535.0 * 175.0 - 45.0
+         return conv.shtTemp(var.dependencies[0].value())
       
       def getNctTemp(var):
-         x = var.dependencies[0].value()
-         y = var.dependencies[1].value()
-         return x * 1.0 + (y >> 6) * 0.25
+         return conv.nctTemp(var.dependencies[0].value(), var.dependencies[1].value())
       
       def getNctTempLoc(var):
-         x = var.dependencies[0].value()
-         return x * 1.0 
+         return conv.nctTempLoc(var.dependencies[0].value())
       
       def getLt3086DoubleCurr(var):
-         x = var.dependencies[0].value()
-         # Imon = Iin / 1000
-         # Rload = 330 ohm
-         # ADC buffer gain x 2
-         # Two parallel LDOs current x 2
-         # returns current in A
-         return x / 16383.0 * 2.5 / 330.0 * 1000
+         return conv.lt3086DoubleCurr(var.dependencies[0].value())
       
       def getLt3086SingleCurr(var):
-         x = var.dependencies[0].value()
-         # Imon = Iin / 1000
-         # Rload = 330 ohm
-         # ADC buffer gain x 2
-         # One LDO current x 1
-         # returns current in mA
-         return x / 16383.0 * 2.5 / 330.0 * 1000000 / 2.0
+         return conv.lt3086SingleCurr(var.dependencies[0].value())
       
       def getThermistorTemp(var):
-         # resistor divider 100k and MC65F103B (Rt25=10k)
-         # Vref 2.5V
-         TthermK = 0.0
-         x = var.dependencies[0].value()
-         if x != 0:
-            Umeas = x / 16383.0 * 2.5
-            Itherm = Umeas / 100000;
-            Rtherm = (2.5 - Umeas) / Itherm;
-            if Rtherm > 0.0:
-               LnRtR25 = np.log(Rtherm/10000.0)
-               TthermK = 1.0 / (3.3538646E-03 + 2.5654090E-04 * LnRtR25 + 1.9243889E-06 * (LnRtR25**2) + 1.0969244E-07 * (LnRtR25**3))
-            TthermK -= 273.15
-         return TthermK
+         return conv.thermistorTemp(var.dependencies[0].value())
       
       def getAnaTemp(var):
-         x = var.dependencies[0].value()
-         a = 130.0/(0.882-1.951)
-         b = (0.882/0.0082)+100
-         return x * 1.65 / 65535 * a + b
+         return conv.anaTemp(var.dependencies[0].value())
       
       def getLdoTemp(var):
-         x = var.dependencies[0].value()
-         return x * 1.65 / 65535 *100
+         return conv.ldoTemp(var.dependencies[0].value())
       
       def getTrOptTemp(var):
-         x = var.dependencies[0].value()
-         return x * 1.0 / 256
+         return conv.trOptTemp(var.dependencies[0].value())
       
       def getTrOptVolt(var):
-         x = var.dependencies[0].value()
-         return x * 0.0001
+         return conv.trOptVolt(var.dependencies[0].value())
       
       def getTrOptPwr(var):
-         x = var.dependencies[0].value()
-         return x * 0.1
+         return conv.trOptPwr(var.dependencies[0].value())
       
       # Creation. memBase is either the register bus server (srp, rce mapped memory, etc) or the device which
       # contains this object. In most cases the parent and memBase are the same but they can be 
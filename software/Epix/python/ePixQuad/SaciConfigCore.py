@@ -24,14 +24,7 @@ import numpy as np
 import json
 import time as ti
 import rogue.interfaces.memory as rim
-
-try:
-    from PyQt5.QtWidgets import *
-    from PyQt5.QtCore    import *
-    from PyQt5.QtGui     import *
-except ImportError:
-    from PyQt4.QtCore    import *
-    from PyQt4.QtGui     import *
+import ePixAsics as epix
 
 class SaciConfigCore(pr.Device):
    def __init__(self, simSpeedup = False, **kwargs):
@@ -163,10 +156,7 @@ class SaciConfigCore(pr.Device):
             print('Input array dimensions {} mismatch {}'.format(np.shape(arr),shape)) 
             return
       else:
-         if len(arg) > 0:
-            self.filename = arg
-         else:
-            self.filename = QFileDialog.getOpenFileName(self.root.guiTop, 'Open File', '', 'csv file (*.csv);; Any (*.*)')[0]
+         self.filename = epix.getOpenFileName(self.root, arg)
 
          # write csv to memory
          if os.path.splitext(self.filename)[1] == '.csv':
@@ -0,0 +1,403 @@
+#!/usr/bin/env python
+#-----------------------------------------------------------------------------
+# Title      : ePix Quad pure python simulation
+#-----------------------------------------------------------------------------
+# File       : Simulation.py
+# Created    : 2026-10-19
+#-----------------------------------------------------------------------------
+# Description:
+# Hardware free stand-in for the ePix Quad board used by Top(hwType='pysim').
+# QuadSimMemory replaces the SRPv3 register bus: a sparse memory with the
+# register behaviour the software relies on (trigger control, acquisition
+# counter, SACI matrix configuration handshake, ADC lock and pattern tester).
+# QuadFrameGenerator builds scrambled Quad frames (header, pixels, footer)
+# with numpy and QuadSimulator sends them on the VC0 stream at the auto
+# trigger rate, or on every software command received on VC0.
+#-----------------------------------------------------------------------------
+# This file is part of the rogue software platform. It is subject to
+# the license terms in the LICENSE.txt file found in the top-level directory
+# of this distribution and at:
+#    https://confluence.slac.stanford.edu/display/ppareg/LICENSE.html.
+# No part of the rogue software platform, including this file, may be
+# copied, modified, propagated, or distributed except according to the terms
+# contained in the LICENSE.txt file.
+#-----------------------------------------------------------------------------
+import bisect
+import threading
+import time
+import numpy as np
+import rogue.interfaces.memory
+import rogue.interfaces.stream
+# frame layout and row order are shared with the viewer
+from ePixViewer.QuadFormat import QUAD_ROWS, QUAD_COLS, QUAD_HEADER_BYTES, QUAD_FOOTER_BYTES, QUAD_FOOTER_OFFSET, \
+                           QUAD_FRAME_BYTES, QUAD_ADC_MAX, quadRowMap, scramble, descramble
+import ePixViewer.QuadFooter as quadFooter
+
+# register addresses (Top memory map)
+SYS_REGS          = 0x00100000
+SYS_TRIG_EN       = SYS_REGS + 0x400
+SYS_AUTO_TRIG_EN  = SYS_REGS + 0x408
+SYS_AUTO_TRIG_PER = SYS_REGS + 0x40C
+SYS_TRIG_PERIOD   = SYS_REGS + 0x414
+ACQ_COUNT         = 0x01000000
+ACQ_COUNT_RESET   = 0x01000004
+SACI_CONF_WR_REQ  = 0x08800000
+SACI_CONF_RD_REQ  = 0x08800004
+SACI_CONF_DONE    = 0x0880000C
+SACI_CONF_FAIL    = 0x08800010
+ADC_READOUT       = 0x02000000
+ADC_READOUT_STEP  = 0x00100000
+ADC_TESTER        = 0x02D00000
+
+# surf Ad9249ReadoutGroup: channel delays at 0x00, frame delay at 0x20,
+# LostLockCount[15:0] and Locked[16] at 0x30. Bit 9 of the delays is the load bit
+ADC_FRAME_DELAY   = 0x20
+ADC_LOCK_STATUS   = 0x30
+ADC_LOCKED        = 0x10000
+ADC_DELAY_MASK    = 0x1FF
+
+# clock of the trigger period registers
+SYS_CLK_FREQ = 100000000.0
+
+# raw footer values (see ePixViewer.QuadFormat)
+QUAD_SIM_FOOTER = {
+   'ShtHumRaw'      : 0x4CCC,    # 30 %
+   'ShtTempRaw'     : 0x6666,    # 25 degC
+   'NctLocTempRaw'  : 30,
+   'NctRemTempHRaw' : 32,
+   'AD7949DataRaw'  : 0x0800,
+   'SensorRegRaw'   : 0x0100,
+}
+
+
+################################################################################
+#   Frame generator
+#   Everything is kept in raw (scrambled) row order, a frame is the pedestal
+#   plus one of noiseFrames precomputed noise realizations plus the pulses.
+################################################################################
+class QuadFrameGenerator():
+   """builds ePix Quad frames with pedestal, noise, pulsed pixels, random hits and footer"""
+
+   def __init__(self, pedestal = 1000, noise = 10.0, pulses = None, hitsPerFrame = 0, hitAmplitude = 500,
+                footer = None, noiseFrames = 16, seed = None):
+      """pedestal, noise : ADU values, scalars or (712, 768) image arrays
+         pulses          : list of (y, x, amplitude) pixels or (y0, y1, x0, x1, amplitude) regions
+         hitsPerFrame    : mean number of randomly placed hits of hitAmplitude ADU per frame
+         footer          : raw footer values overriding QUAD_SIM_FOOTER
+         noiseFrames     : number of precomputed noise realizations, 0 draws new noise every frame"""
+      self.rng = np.random.default_rng(seed)
+      self.rowMap = quadRowMap()
+      self.hitsPerFrame = hitsPerFrame
+      self.hitAmplitude = hitAmplitude
+      self.noiseFrames = noiseFrames
+      self._work = np.empty((QUAD_ROWS, QUAD_COLS), dtype=np.int32)
+      self.setPedestal(pedestal)
+      self.setNoise(noise)
+      self.setPulses(pulses)
+      self.setFooter(footer)
+
+   def _raw(self, value):
+      return scramble(np.broadcast_to(np.asarray(value, dtype=np.float64), (QUAD_ROWS, QUAD_COLS)))
+
+   def setPedestal(self, pedestal):
+      self._pedestal = np.rint(self._raw(pedestal)).astype(np.int32)
+
+   def setNoise(self, noise):
+      self._sigma = self._raw(noise)
+      self._noise = None
+      if self.noiseFrames > 0:
+         self._noise = np.rint(self.rng.standard_normal((self.noiseFrames, QUAD_ROWS, QUAD_COLS)) * self._sigma).astype(np.int16)
+
+   def setPulses(self, pulses):
+      index = []
+      amplitude = []
+      for pulse in (pulses or []):
+         if len(pulse) == 3:
+            [y, x, amp] = pulse
+            pulse = (y, y + 1, x, x + 1, amp)
+         [y0, y1, x0, x1, amp] = pulse
+         rows = self.rowMap[y0:y1]
+         cols = np.arange(QUAD_COLS)[x0:x1]
+         flat = (rows[:,None] * QUAD_COLS + cols[None,:]).ravel()
+         index.append(flat)
+         amplitude.append(np.full(len(flat), amp, dtype=np.int32))
+      self._pulseIndex = np.concatenate(index) if index else np.zeros(0, dtype=np.int64)
+      self._pulseAmp = np.concatenate(amplitude) if amplitude else np.zeros(0, dtype=np.int32)
+
+   def setFooter(self, footer = None):
+      self._footerView = quadFooter.footerView
+      values = dict(QUAD_SIM_FOOTER)
+      values.update(footer or {})
+      self._footer = np.zeros(1, dtype=quadFooter.QUAD_FOOTER_RAW_DTYPE)
+      for name, value in values.items():
+         self._footer[name] = value
+
+   def frame(self, acqCount, out = None):
+      """returns frame acqCount as a QUAD_FRAME_BYTES uint8 array (written to out if given)"""
+      if out is None:
+         out = np.zeros(QUAD_FRAME_BYTES, dtype=np.uint8)
+      header = out[:QUAD_HEADER_BYTES].view('<u4')
+      header[:] = 0
+      # acquisition number and sequence counter
+      header[1] = acqCount & 0xFFFFFFFF
+      header[2] = acqCount & 0xFFFFFFFF
+
+      work = self._work
+      if self._noise is not None:
+         np.add(self._pedestal, self._noise[self.rng.integers(self.noiseFrames)], out=work)
+      else:
+         np.add(self._pedestal, np.rint(self.rng.standard_normal(work.shape) * self._sigma), out=work, casting='unsafe')
+      flat = work.reshape(-1)
+      if len(self._pulseIndex) > 0:
+         np.add.at(flat, self._pulseIndex, self._pulseAmp)
+      if self.hitsPerFrame > 0:
+         hits = self.rng.integers(0, flat.size, self.rng.poisson(self.hitsPerFrame))
+         np.add.at(flat, hits, self.hitAmplitude)
+      np.clip(work, 0, QUAD_ADC_MAX, out=work)
+
+      pixels = out[QUAD_HEADER_BYTES:QUAD_FOOTER_OFFSET].view('<u2').reshape(QUAD_ROWS, QUAD_COLS)
+      pixels[...] = work
+      self._footerView(out, QUAD_FOOTER_OFFSET)[0] = self._footer[0]
+      return out
+
+   def image(self, frame):
+      """descrambled (712, 768) image of a generated frame"""
+      raw = np.frombuffer(frame, dtype='<u2', count=QUAD_ROWS*QUAD_COLS, offset=QUAD_HEADER_BYTES)
+      return descramble(raw.reshape(QUAD_ROWS, QUAD_COLS))
+
+
+################################################################################
+#   SRPv3 stand-in
+#   Sparse 4 kB pages, unwritten memory reads as zero. Read hooks refresh a
+#   register before it is returned, write hooks react to the written value.
+################################################################################
+class QuadSimMemory(rogue.interfaces.memory.Slave):
+   """register memory of the simulated board"""
+
+   PAGE_SIZE = 4096
+
+   def __init__(self):
+      rogue.interfaces.memory.Slave.__init__(self, 4, self.PAGE_SIZE)
+      self._lock = threading.RLock()
+      self._pages = {}
+      self._readHooks = {}
+      self._writeHooks = {}
+      self._hookAddr = []
+      self.readCount = 0
+      self.writeCount = 0
+
+   def addReadHook(self, address, function):
+      """function() returns the value of the 32 bit register at address"""
+      self._readHooks[address] = function
+      self._hookAddr = sorted(set(self._readHooks) | set(self._writeHooks))
+
+   def addWriteHook(self, address, function):
+      """function(value) is called after the 32 bit register at address is written"""
+      self._writeHooks[address] = function
+      self._hookAddr = sorted(set(self._readHooks) | set(self._writeHooks))
+
+   def _access(self, address, size, data = None):
+      # copies data to memory, or memory to a new bytearray if data is None
+      result = bytearray(size) if data is None else None
+      pos = 0
+      while pos < size:
+         [page, start] = divmod(address + pos, self.PAGE_SIZE)
+         length = min(size - pos, self.PAGE_SIZE - start)
+         if data is not None:
+            mem = self._pages.get(page)
+            if mem is None:
+               mem = self._pages[page] = bytearray(self.PAGE_SIZE)
+            mem[start:start+length] = data[pos:pos+length]
+         elif page in self._pages:
+            result[pos:pos+length] = self._pages[page][start:start+length]
+         pos += length
+      return result
+
+   def peek(self, address):
+      with self._lock:
+         return int.from_bytes(self._access(address, 4), 'little')
+
+   def poke(self, address, value):
+      with self._lock:
+         self._access(address, 4, (value & 0xFFFFFFFF).to_bytes(4, 'little'))
+
+   def load(self, address, data):
+      """writes a block of bytes (e.g. a string register) without calling the hooks"""
+      with self._lock:
+         self._access(address, len(data), data)
+
+   def _hooks(self, address, size):
+      first = bisect.bisect_left(self._hookAddr, address - 3)
+      last = bisect.bisect_left(self._hookAddr, address + size)
+      return self._hookAddr[first:last]
+
+   def _doTransaction(self, transaction):
+      with transaction.lock():
+         address = transaction.address()
+         size = transaction.size()
+         ttype = transaction.type()
+         with self._lock:
+            if (ttype == rogue.interfaces.memory.Write) or (ttype == rogue.interfaces.memory.Post):
+               data = bytearray(size)
+               transaction.getData(data, 0)
+               self._access(address, size, data)
+               self.writeCount += 1
+               for reg in self._hooks(address, size):
+                  if reg in self._writeHooks:
+                     self._writeHooks[reg](self.peek(reg))
+            else:
+               for reg in self._hooks(address, size):
+                  if reg in self._readHooks:
+                     self.poke(reg, self._readHooks[reg]())
+               transaction.setData(self._access(address, size), 0)
+               self.readCount += 1
+         transaction.done()
+
+
+################################################################################
+#   Stream endpoint, takes the place of one PGP virtual channel
+################################################################################
+class QuadSimStream(rogue.interfaces.stream.Master, rogue.interfaces.stream.Slave):
+   """sends simulated frames, passes the received frames (commands) to onFrame"""
+
+   def __init__(self, onFrame = None):
+      rogue.interfaces.stream.Master.__init__(self)
+      rogue.interfaces.stream.Slave.__init__(self)
+      self.onFrame = onFrame
+
+   def _acceptFrame(self, frame):
+      if self.onFrame is not None:
+         self.onFrame(frame)
+
+   def send(self, data):
+      frame = self._reqFrame(len(data), True)
+      frame.write(data, 0)
+      self._sendFrame(frame)
+
+
+################################################################################
+#   Simulated board
+################################################################################
+class QuadSimulator():
+   """register memory, four virtual channels and the frame trigger of a simulated ePix Quad"""
+
+   def __init__(self, generator = None, rate = None, adcEye = (160, 352)):
+      """generator : QuadFrameGenerator, a default one if None
+         rate      : frame rate in Hz while auto triggering, None follows AutoTrigPer
+         adcEye    : range of ADC frame/data delays (0..511) for which the ADCs lock"""
+      self.generator = generator if generator is not None else QuadFrameGenerator()
+      self.rate = rate
+      self.adcEye = adcEye
+      self.memory = QuadSimMemory()
+      self.vc = [QuadSimStream() for i in range(4)]
+      self.vc[0].onFrame = self._command
+      self.acqCount = 0
+      self.frameCount = 0
+      self.commandCount = 0
+      self._trigPeriod = 0
+      self._lastTrigger = None
+      self._frame = np.zeros(QUAD_FRAME_BYTES, dtype=np.uint8)
+      self._trigLock = threading.Lock()
+      self._wake = threading.Event()
+      self._stop = threading.Event()
+      self._setupRegisters()
+      self._thread = threading.Thread(target=self._run, name='QuadSimulator', daemon=True)
+      self._thread.start()
+
+   def _setupRegisters(self):
+      mem = self.memory
+      # AxiVersion: FpgaVersion, UserConstants[2] (ASIC type) and BuildStamp
+      mem.poke(0x000, 0xEA020000)
+      mem.poke(0x408, 2)
+      stamp = b'ePixQuad: pure python simulation'
+      mem.load(0x800, stamp)
+      start = time.time()
+      mem.addReadHook(0x008, lambda: int(time.time() - start))
+
+      for reg in [SYS_TRIG_EN, SYS_AUTO_TRIG_EN, SYS_AUTO_TRIG_PER]:
+         mem.addWriteHook(reg, lambda value: self._wake.set())
+      mem.addReadHook(SYS_TRIG_PERIOD, lambda: self._trigPeriod)
+      mem.addReadHook(ACQ_COUNT, lambda: self.acqCount)
+      mem.addWriteHook(ACQ_COUNT_RESET, self._acqCountReset)
+
+      # the ASIC configuration completes immediately
+      mem.addWriteHook(SACI_CONF_WR_REQ, self._saciRequest)
+      mem.addWriteHook(SACI_CONF_RD_REQ, self._saciRequest)
+
+      for adc in range(10):
+         base = ADC_READOUT + adc * ADC_READOUT_STEP
+         mem.addReadHook(base + ADC_LOCK_STATUS, lambda base=base: ADC_LOCKED if self._inEye(base + ADC_FRAME_DELAY) else 1)
+      mem.addWriteHook(ADC_TESTER + 0x14, self._adcTest)
+
+   def _acqCountReset(self, value):
+      if value & 1:
+         self.acqCount = 0
+
+   def _saciRequest(self, value):
+      if value & 1:
+         self.memory.poke(SACI_CONF_FAIL, 0)
+         self.memory.poke(SACI_CONF_DONE, 1)
+
+   def _inEye(self, delayReg):
+      delay = self.memory.peek(delayReg) & ADC_DELAY_MASK
+      return self.adcEye[0] <= delay <= self.adcEye[1]
+
+   def _adcTest(self, value):
+      # the pattern matches when the frame and the tested data lane are inside the eye
+      if value & 1:
+         channel = self.memory.peek(ADC_TESTER)
+         base = ADC_READOUT + (channel // 8) * ADC_READOUT_STEP
+         passed = self._inEye(base + ADC_FRAME_DELAY) and self._inEye(base + (channel % 8) * 4)
+         self.memory.poke(ADC_TESTER + 0x18, int(passed))
+         self.memory.poke(ADC_TESTER + 0x1C, int(not passed))
+
+   def _command(self, frame):
+      # opcode commands on VC0 are software triggers
+      self.commandCount += 1
+      if self.memory.peek(SYS_TRIG_EN) & 1:
+         self.trigger()
+
+   def trigger(self):
+      """generates one frame and sends it on VC0"""
+      with self._trigLock:
+         now = time.monotonic()
+         if self._lastTrigger is not None:
+            self._trigPeriod = int((now - self._lastTrigger) * SYS_CLK_FREQ) & 0xFFFFFFFF
+         self._lastTrigger = now
+         self.generator.frame(self.acqCount, out=self._frame)
+         self.acqCount = (self.acqCount + 1) & 0xFFFFFFFF
+         self.frameCount += 1
+         self.vc[0].send(self._frame)
+
+   def period(self):
+      """auto trigger period in seconds, None when auto triggering is off"""
+      mem = self.memory
+      if not ((mem.peek(SYS_TRIG_EN) & 1) and (mem.peek(SYS_AUTO_TRIG_EN) & 1)):
+         return None
+      if self.rate:
+         return 1.0 / self.rate
+      clocks = mem.peek(SYS_AUTO_TRIG_PER)
+      return clocks / SYS_CLK_FREQ if clocks > 0 else None
+
+   def _run(self):
+      nextTime = time.monotonic()
+      while not self._stop.is_set():
+         period = self.period()
+         now = time.monotonic()
+         if period is None:
+            self._wake.wait(0.1)
+            self._wake.clear()
+            nextTime = time.monotonic()
+         elif now < nextTime:
+            # settings changes wake up the thread and are applied before the next frame
+            self._wake.wait(nextTime - now)
+            self._wake.clear()
+         else:
+            self.trigger()
+            # does not try to catch up more than one period after a stall
+            nextTime = max(nextTime + period, now)
+
+   def stop(self):
+      self._stop.set()
+      self._wake.set()
+      self._thread.join()
@@ -29,6 +29,7 @@ import surf.xilinx                  as xil
 import surf.protocols.ssi           as ssi
 
 import ePixAsics as epix
+import ePixFpga as fpga
 
 import ePixQuad
 
@@ -37,7 +38,7 @@ from os import path
 
 import click
 
-class Top(pr.Root):
+class Top(fpga.ConfigDiffRoot):
    def __init__(   self,       
          name        = "Top",
          description = "Container for EpixQuad",
@@ -48,20 +49,38 @@ class Top(pr.Root):
          enVcMask    = 0xf,
          enWriter    = True,
          enPrbs      = True,
+         asicMask    = 0xFFFF,
          **kwargs):
       super().__init__(name=name, description=description, **kwargs)
       
       self._promWrEn = promWrEn
       
+      # ASICs created in the tree (pyrogue cannot add them once the Root is started).
+      # The ASICs left out have no Epix10kaSaci[n] node: yml entries for them are
+      # reported as not found and scripts indexing Epix10kaSaci[n] fail, so only
+      # reduce the mask for setups that do not use these ASICs. The default keeps
+      # all 16, the gain in startup time is not measured (see StartupProfiler).
+      self.asicList = [i for i in range(16) if asicMask & (1<<i)]
+      if len(self.asicList) < 16:
+         print('Top: ASICs %s are not created' % ([i for i in range(16) if i not in self.asicList]))
+      
       ######################################################################          
       
       # VC0: Data & cmds
       # VC1: Registers for ePix board
       # VC2: PseudoScope
       # VC3: Monitoring (Slow ADC)
+      # pysim: pure python board (ePixQuad.Simulation), no firmware or testbench needed
+      if (hwType == 'pysim'):
+         self.simulator = ePixQuad.QuadSimulator()
+      else:
+         self.simulator = None
+      
       for i in range(4):
          if enVcMask & (1<<i):
-            if (hwType == 'simulation'):
+            if (hwType == 'pysim'):
+               setattr(self,f'pgpVc{i}',self.simulator.vc[i])
+            elif (hwType == 'simulation'):
                setattr(self,f'pgpVc{i}',rogue.interfaces.stream.TcpClient('localhost',8000+i*2))
             elif (hwType == 'datadev'):
                setattr(self,f'pgpVc{i}',rogue.hardware.axi.AxiStreamDma(dev,256*lane+i,True))
@@ -88,13 +107,16 @@ class Top(pr.Root):
             pyrogue.streamConnect(self.pgpVc0,prbsRx)
          self.add(prbsRx)
       
-      memMap = rogue.protocols.srp.SrpV3()                
+      if (hwType == 'pysim'):
+         memMap = self.simulator.memory
+      else:
+         memMap = rogue.protocols.srp.SrpV3()                
       
       # Connect the SRPv3 to PGPv3.VC[0]
       if enVcMask & 1:
          cmdVc1 = rogue.protocols.srp.Cmd()
          pyrogue.streamConnect(cmdVc1, self.pgpVc0)
-      if enVcMask & 2:
+      if enVcMask & 2 and hwType != 'pysim':
          pr.streamConnectBiDir(self.pgpVc1, memMap)             
       if enVcMask & 8:
          cmdVc3 = rogue.protocols.srp.Cmd()
@@ -107,7 +129,7 @@ class Top(pr.Root):
          trigEn = self.SystemRegs.TrigEn.get()
          self.SystemRegs.TrigEn.set(False)
          # clear matrix in all enabled ASICs
-         for i in range(16):
+         for i in self.asicList:
             # iterate through enabled (preset) ASICs
             if self.Epix10kaSaci[i].enable.get() == True:
                print('Setting pulsed region in ASIC %d'%i)
@@ -133,7 +155,7 @@ class Top(pr.Root):
          trigEn = self.SystemRegs.TrigEn.get()
          self.SystemRegs.TrigEn.set(False)
          # clear matrix in all enabled ASICs
-         for i in range(16):
+         for i in self.asicList:
             if self.Epix10kaSaci[i].enable.get() == True:
                self.Epix10kaSaci[i].atest.set(False)
                self.Epix10kaSaci[i].test.set(False)
@@ -148,7 +170,7 @@ class Top(pr.Root):
          trigEn = self.SystemRegs.TrigEn.get()
          self.SystemRegs.TrigEn.set(False)
          # clear matrix in all enabled ASICs
-         for i in range(16):
+         for i in self.asicList:
             if self.Epix10kaSaci[i].enable.get() == True:
                self.Epix10kaSaci[i].atest.set(False)
                self.Epix10kaSaci[i].test.set(False)
@@ -163,7 +185,7 @@ class Top(pr.Root):
          trigEn = self.SystemRegs.TrigEn.get()
          self.SystemRegs.TrigEn.set(False)
          # clear matrix in all enabled ASICs
-         for i in range(16):
+         for i in self.asicList:
             if self.Epix10kaSaci[i].enable.get() == True:
                self.Epix10kaSaci[i].atest.set(False)
                self.Epix10kaSaci[i].test.set(False)
@@ -268,7 +290,7 @@ class Top(pr.Root):
          enabled = False,
       ))
       
-      for i in range(16):
+      for i in self.asicList:
          asicSaciAddr = [
             0x04000000, 0x04400000, 0x04800000, 0x04C00000,
             0x05000000, 0x05400000, 0x05800000, 0x05C00000,
@@ -327,7 +349,13 @@ class Top(pr.Root):
          hidden  = False,
       ))
                
-      if (hwType != 'simulation'):
+      # Register access statistics, instrumentation installed by StartStats
+      self.add(fpga.RegisterStatsMonitor(
+         name     = 'RegisterStats', 
+         expand   = False, 
+      ))
+      
+      if (hwType != 'simulation') and (hwType != 'pysim'):
       
          self.add(cypress.CypressS25Fl(
             offset   = 0x00300000, 
@@ -535,6 +563,11 @@ class Top(pr.Root):
                   , bg='green',
                )
    
+   def stop(self):
+      if self.simulator is not None:
+         self.simulator.stop()
+      super().stop()
+   
    @staticmethod
    def resetAdc(self, adc):
       
@@ -30,14 +30,9 @@ import os
 import time
 import numpy as np
 import ePixViewer.imgProcessing as imgPr
-
-try:
-    from PyQt5.QtWidgets import *
-    from PyQt5.QtCore    import *
-    from PyQt5.QtGui     import *
-except ImportError:
-    from PyQt4.QtCore    import *
-    from PyQt4.QtGui     import *
+import ePixViewer.EventBuilder as evtBld
+import ePixViewer.QuadFooter as quadFooter
+import ePixViewer.QuadFormat as quadFormat
 
 PRINT_VERBOSE = 0
 
@@ -54,6 +49,12 @@ EPIXQUAD    = 8
 EPIXQUADSIM = 9
 EPIXMSH     = 10
 
+# event builder slot of each (header dword 2 & 0xF) value of the multi-packet cameras
+NS = evtBld.NO_SLOT
+TIXEL_SLOT_LUT   = [0, 1, NS, NS, NS, NS, NS, NS, 2, 3, NS, NS, NS, NS, NS, NS]
+EPIXM32_SLOT_LUT = [0, 1, NS, NS, NS, NS, NS, NS, NS, NS, NS, NS, NS, NS, NS, NS]
+HRADC_SLOT_LUT   = [0, 1, 0, NS, NS, NS, NS, NS, 0, 1, 0, NS, NS, NS, NS, NS]
+
 
 ################################################################################
 ################################################################################
@@ -77,7 +78,7 @@ class Camera():
         'ePixQuadSim' : EPIXQUADSIM, 'ePixMsh' : EPIXMSH }
     
 
-    def __init__(self, cameraType = 'ePix100a') :
+    def __init__(self, cameraType = 'ePix100a', reorderWindow = 4, maxEventAge = None) :
         
         camID = self.availableCameras.get(cameraType, NOCAMERA)
 
@@ -111,6 +112,10 @@ class Camera():
             #self._initEpix10kaQuadSim()
             self._initEpix10kaQuad()
 
+        #multi-packet cameras build up to reorderWindow acquisitions concurrently
+        if (self.isMultiPacket()):
+            self.setReorderWindow(reorderWindow, maxEventAge = maxEventAge)
+
         #creates a image processing tool for local use
         self.imgTool = imgPr.ImageProcessing(self)
         
@@ -118,6 +123,34 @@ class Camera():
     def getAvailableCameras():
         return self.availableCameras
 
+    # True for the cameras that send one image as several packets
+    def isMultiPacket(self):
+        return hasattr(self, 'eventBuilder')
+
+    # sets the number of acquisitions that are built concurrently. Incomplete events
+    # older than maxEventAge seconds or maxAcqAge acquisitions are dropped
+    def setReorderWindow(self, reorderWindow, maxEventAge = None, maxAcqAge = None):
+        self.eventBuilder.setPoolSize(reorderWindow)
+        self.eventBuilder.timeout = maxEventAge
+        self.eventBuilder.maxAcqAge = maxAcqAge
+
+    # (rows, columns) of ASICs in the descrambled image, quads have 4 x 4 ASICs,
+    # the other multi ASIC cameras 2 rows of _NumAsicsPerSide ASICs
+    def asicGrid(self):
+        numAsicsPerSide = getattr(self, '_NumAsicsPerSide', 1)
+        if (numAsicsPerSide == 4):
+            return (4, 4)
+        return (min(2, numAsicsPerSide), numAsicsPerSide)
+
+    # number of adjacent columns read by one ADC channel (the common mode banks)
+    def bankWidth(self):
+        return getattr(self, '_NumColPerAdcCh', self.sensorWidth)
+
+    # adds one packet of a multi-packet camera, returns all the events that
+    # left the reorder window as a list of [frameComplete, rawData]
+    def buildImageFrames(self, newRawData):
+        return self.eventBuilder.addPacket(newRawData)
+
     # return the descrambled image based on the current camera settings
     def descrambleImage(self, rawData):
         camID = self.availableCameras.get(self.cameraType, NOCAMERA)
@@ -151,6 +184,40 @@ class Camera():
         if (camID == NOCAMERA):
             return Null
 
+    # source super row of each image row for the cameras descrambled by super rows,
+    # None for the others
+    def _superRowMap(self):
+        camID = self.availableCameras.get(self.cameraType, NOCAMERA)
+        rows = np.arange(self.sensorHeight)
+        if (camID == EPIX100A or camID == EPIXS or camID == EPIX10KA):
+            # same order as _descrambleEPix100aImageAsByteArray (top half then bottom half)
+            return np.concatenate((self.sensorHeight - rows[rows%2 == 1], rows[rows%2 == 0]))
+        if (camID == EPIXQUAD or camID == EPIXQUADSIM):
+            # same order as _descrambleEPixQuadImageAsByteArray, shared with the Quad simulator
+            return quadFormat.quadRowMap(self.sensorHeight)
+        return None
+
+    # return the descrambled region of interest roi = [x0, x1, y0, y1] (image coordinates,
+    # None for the full image) reduced by decimation (every n-th pixel or n x n binning).
+    # Only the super rows covering the roi are copied out of the raw data.
+    def descrambleImageRoi(self, rawData, roi = None, decimation = 1, binning = False):
+        if (not hasattr(self, '_rowMap')):
+            self._rowMap = self._superRowMap()
+        numPixels = self.sensorHeight*self.sensorWidth
+        if (self._rowMap is None) or (len(rawData) < 32 + 2*numPixels):
+            return imgPr.applyRoi(self.descrambleImage(rawData), roi, decimation, binning)
+
+        if (roi is None):
+            roi = [0, self.sensorWidth, 0, self.sensorHeight]
+        [x0, x1, y0, y1] = roi
+        # binning needs all the rows of the roi
+        rowStep = 1 if binning else decimation
+        rawImg = np.frombuffer(rawData, dtype='int16', count=numPixels, offset=32).reshape(self.sensorHeight, self.sensorWidth)
+        descImg = self.imgTool.applyBitMask(rawImg[self._rowMap[y0:y1:rowStep], x0:x1], mask = self.bitMask)
+        if (binning):
+            return imgPr.applyRoi(descImg, None, decimation, True)
+        return descImg[:, ::decimation]
+
     # return
     def buildImageFrame(self, currentRawData, newRawData):
         camID = self.availableCameras.get(self.cameraType, NOCAMERA)
@@ -237,6 +304,8 @@ class Camera():
         self.sensorHeight = 96 # The sensor size in this dimension is doubled because each pixel has two information (ToT and ToA) 
         self.pixelDepth = 16
         self.bitMask = np.uint16(0xFFFF)
+        # 4 packets of 1155 dwords, slot = asic + 2*isTOA (header dword 2 bits 2:0 asic, bit 3 isTOA)
+        self.eventBuilder = evtBld.EventBuilder(packetDW = 1155, slotLut = TIXEL_SLOT_LUT)
 
     def _initEpix10ka(self):
         self._superRowSize = int(384/2)
@@ -286,6 +355,8 @@ class Camera():
         self.sensorHeight = 96 # The sensor size in this dimension is doubled because each pixel has two information (ToT and ToA) 
         self.pixelDepth = 16
         self.bitMask = np.uint16(0x7FFF)
+        # same packet format as Tixel
+        self.eventBuilder = evtBld.EventBuilder(packetDW = 1155, slotLut = TIXEL_SLOT_LUT)
     
     def _initEpixMsh(self):
         self._NumAsicsPerSide = 1
@@ -305,6 +376,8 @@ class Camera():
         self.sensorHeight = 64 # The sensor size in this dimension is doubled because each pixel has two information (ToT and ToA) 
         self.pixelDepth = 16
         self.bitMask = np.uint16(0x3FFF)
+        # 2 packets of 1027 dwords, slot = asic (header dword 2 bits 3:0)
+        self.eventBuilder = evtBld.EventBuilder(packetDW = 1027, slotLut = EPIXM32_SLOT_LUT)
     def _initEpixHRADC32x32(self):
         #self._superRowSize = 384
         self._NumAsicsPerSide = 1
@@ -315,6 +388,8 @@ class Camera():
         self.sensorHeight = 32 # The sensor size in this dimension is doubled because each pixel has two information (ToT and ToA) 
         self.pixelDepth = 16
         self.bitMask = np.uint16(0xFFFF)
+        # 2 packets of 515 dwords, asic 0 or 2 go to slot 0, asic 1 to slot 1 (header dword 2 bits 2:0)
+        self.eventBuilder = evtBld.EventBuilder(packetDW = 515, slotLut = HRADC_SLOT_LUT)
 
     ##########################################################
     # define all camera specific build frame functions
@@ -323,464 +398,38 @@ class Camera():
         """ Performs the Tixel frame building.
             For this sensor the image takes four frames, twa with time of arrival info
             and two with time over threshold. There is no guarantee both frames will always arrive nor on their order."""
-        #init local variables
-        frameComplete = 0
-        readyForDisplay = 0
-        returnedRawData = []
-        acqNum_currentRawData  = 0
-        isTOA_currentRawData   = 0
-        asicNum_currentRawData = 0
-        acqNum_newRawData  = 0
-        isTOA_newRawData   = 0
-        asicNum_newRawData = 0
-
-        
-        ##if (PRINT_VERBOSE): print('\nlen current Raw data', len(currentRawData), 'len new raw data', len(newRawData))
-        #converts data to 32 bit 
-        newRawData_DW = np.frombuffer(newRawData,dtype='uint32')
-        ##if (PRINT_VERBOSE): print('\nlen current Raw data', len(currentRawData), 'len new raw data DW', len(newRawData_DW))
-
-        #retrieves header info
-                                                                  # header dword 0 (VC info)
-        acqNum_newRawData  =  newRawData_DW[1]                    # header dword 1
-        isTOA_newRawData   = (newRawData_DW[2] & 0x8) >> 3        # header dword 2  
-        asicNum_newRawData =  newRawData_DW[2] & 0x7              # header dword 2
-        ##if (PRINT_VERBOSE): print('\nacqNum_newRawData: ', acqNum_newRawData, '\nisTOA_newRawData:', isTOA_newRawData, '\nasicNum_newRawData:', asicNum_newRawData)
-
-
-        #interpret headers
-        #case 1: new image (which means currentRawData is empty)
-        if (len(currentRawData) == 0):
-            frameComplete = 0
-            readyForDisplay = 0
-            z = np.zeros((1156,),dtype='uint32')# 2310 for the package plus 1 (first byte for the valid flag 
-            returnedRawData = np.array([z,z,z,z])
-            #makes the current raw data info the same as new so the logic later on this function will add the new data to the memory
-            acqNum_currentRawData  = acqNum_newRawData
-            isTOA_currentRawData   = isTOA_newRawData
-            asicNum_currentRawData = asicNum_newRawData
-        #case where the currentRawData is a byte array
-        elif(len(currentRawData) == 4620):
-            frameComplete = 0
-            readyForDisplay = 0
-            z = np.zeros((1156,),dtype='uint32')# 2310 for the package plus 1 (first byte for the valid flag 
-            returnedRawData = np.array([z,z,z,z])
-            #
-            currentRawData_DW = np.frombuffer(currentRawData,dtype='uint32')
-                                                                             # header dword 0 (VC info)
-            acqNum_currentRawData  =  currentRawData_DW[1]                   # header dword 1
-            isTOA_currentRawData   = (currentRawData_DW[2] & 0x8) >> 3       # header dword 2  
-            asicNum_currentRawData =  currentRawData_DW[2] & 0x7             # header dword 2
-
-            currentRawData = self.fill_memory(returnedRawData, asicNum_currentRawData, isTOA_currentRawData, currentRawData_DW)
-            returnedRawData = currentRawData
-        
-        elif(len(currentRawData)==4):
-            #recovers currentRawData header info
-            #loop traverses the four traces to find the info
-            for j in range(0,4):
-                #print(len(currentRawData))
-                if(currentRawData[j,0]==1):
-                                                                                # extended header dword 0 (valid trace)
-                                                                                # extended header dword 1 (VC info)
-                    acqNum_currentRawData  =  currentRawData[j,2]               # extended header dword 2 (acq num)
-                    isTOA_currentRawData   = (currentRawData[j,3] & 0x8) >> 3   # extended header dword 3 
-                    asicNum_currentRawData =  currentRawData[j,3] & 0x7         # extended header dword 1 (VC info)
-            #saves current data on returned data before adding new data
-            returnedRawData = currentRawData
-        else:
-            #packet size error
-            if (PRINT_VERBOSE): print('\n packet size error, packet len: ', len(currentRawData))
-
-        ##if (PRINT_VERBOSE): print('\nacqNum_currentRawData: ', acqNum_currentRawData, '\nisTOA_currentRawData: ', isTOA_currentRawData, '\nasicNum_currentRawData: ', asicNum_currentRawData)
-        ##if (PRINT_VERBOSE): print('\nacqNum_newRawData: ',     acqNum_newRawData,     '\nisTOA_newRawData: ',     isTOA_newRawData, '\nasicNum_newRawData: ', asicNum_newRawData)
-        #case 2: acqNumber are different
-        if(acqNum_newRawData != acqNum_currentRawData):
-            frameComplete = 0
-            readyForDisplay = 1
-            return [frameComplete, readyForDisplay, currentRawData]
-
-        #fill the memory with the new data (when acqNums matches)
-        returnedRawData = self.fill_memory(returnedRawData, asicNum_newRawData, isTOA_newRawData, newRawData_DW)
-        if (PRINT_VERBOSE): print('Return data 0:', returnedRawData[0,0:10])
-        if (PRINT_VERBOSE): print('Return data 1:', returnedRawData[1,0:10])
-        if (PRINT_VERBOSE): print('Return data 2:', returnedRawData[2,0:10])
-        if (PRINT_VERBOSE): print('Return data 3:', returnedRawData[3,0:10])
-
-        #checks if the image is complete
-        isValidTrace0 =  returnedRawData[0,0]
-        if (PRINT_VERBOSE): print('\nisValidTrace0', isValidTrace0)
-        isValidTrace1 =  returnedRawData[1,0]
-        if (PRINT_VERBOSE): print('\nisValidTrace1', isValidTrace1)
-        isValidTrace2 =  returnedRawData[2,0]
-        if (PRINT_VERBOSE): print('\nisValidTrace2', isValidTrace2)
-        isValidTrace3 =  returnedRawData[3,0]
-        if (PRINT_VERBOSE): print('\nisValidTrace3', isValidTrace3)
-
-        if((isValidTrace0 == 1) and (isValidTrace1 == 1) and (isValidTrace2 == 1) and (isValidTrace3 == 1)):
-            frameComplete = 1
-            readyForDisplay = 1
-        else:
-            frameComplete = 0
-            readyForDisplay = 0
-
-        if (PRINT_VERBOSE): print('frameComplete: ', frameComplete, 'readyForDisplay: ', readyForDisplay, 'returned raw data len', len(returnedRawData))
-        #return parameters
-        return [frameComplete, readyForDisplay, returnedRawData]
+        return self._buildFrameFromPackets(newRawData)
 
     def _buildFrameCpix2Image(self, currentRawData, newRawData):
         """ Performs the Cpix2 frame building.
             For this sensor the image takes four frames, twa with time of arrival info
             and two with time over threshold. There is no guarantee both frames will always arrive nor on their order."""
-        #init local variables
-        frameComplete = 0
-        readyForDisplay = 0
-        returnedRawData = []
-        acqNum_currentRawData  = 0
-        isTOA_currentRawData   = 0
-        asicNum_currentRawData = 0
-        acqNum_newRawData  = 0
-        isTOA_newRawData   = 0
-        asicNum_newRawData = 0
-
-        
-        if (PRINT_VERBOSE): print('\n0 \nlen current Raw data', len(currentRawData), 'len new raw data', len(newRawData))
-        #converts data to 32 bit 
-        newRawData_DW = np.frombuffer(newRawData,dtype='uint32')
-        if (PRINT_VERBOSE): print('\n1 \nlen current Raw data', len(currentRawData), 'len new raw data DW', len(newRawData_DW))
-
-        #retrieves header info
-                                                                  # header dword 0 (VC info)
-        acqNum_newRawData  =  newRawData_DW[1]                    # header dword 1
-        isTOA_newRawData   = (newRawData_DW[2] & 0x8) >> 3        # header dword 2  
-        asicNum_newRawData =  newRawData_DW[2] & 0x7              # header dword 2
-        if (PRINT_VERBOSE): print('\n2 \n acqNum_newRawData: ', acqNum_newRawData, '\nisTOA_newRawData:', isTOA_newRawData, '\nasicNum_newRawData:', asicNum_newRawData)
-
-
-        #interpret headers
-        #case 1: new image (which means currentRawData is empty)
-        if (len(currentRawData) == 0):
-            frameComplete = 0
-            readyForDisplay = 0
-            z = np.zeros((1156,),dtype='uint32')# 2310 for the package plus 1 (first byte for the valid flag 
-            returnedRawData = np.array([z,z,z,z])
-            #makes the current raw data info the same as new so the logic later on this function will add the new data to the memory
-            acqNum_currentRawData  = acqNum_newRawData
-            isTOA_currentRawData   = isTOA_newRawData
-            asicNum_currentRawData = asicNum_newRawData
-        #case where the currentRawData is a byte array
-        elif((len(currentRawData) == 1155) or (len(currentRawData) == 4620)):
-            frameComplete = 0
-            readyForDisplay = 0
-            z = np.zeros((1156,),dtype='uint32')# 2310 for the package plus 1 (first byte for the valid flag 
-            returnedRawData = np.array([z,z,z,z])
-            #
-            currentRawData_DW = np.frombuffer(currentRawData,dtype='uint32')
-                                                                             # header dword 0 (VC info)
-            acqNum_currentRawData  =  currentRawData_DW[1]                   # header dword 1
-            isTOA_currentRawData   = (currentRawData_DW[2] & 0x8) >> 3       # header dword 2  
-            asicNum_currentRawData =  currentRawData_DW[2] & 0x7             # header dword 2
-
-            currentRawData = self.fill_memory(returnedRawData, asicNum_currentRawData, isTOA_currentRawData, currentRawData_DW)
-            returnedRawData = currentRawData
-
-            if (PRINT_VERBOSE): print('\n3 \n Return data 0:', returnedRawData[0,0:10])
-            if (PRINT_VERBOSE): print('\n3 \n Return data 1:', returnedRawData[1,0:10])
-            if (PRINT_VERBOSE): print('\n3 \n Return data 2:', returnedRawData[2,0:10])
-            if (PRINT_VERBOSE): print('\n3 \n Return data 3:', returnedRawData[3,0:10])
-        
-        elif(len(currentRawData)==4):
-            #recovers currentRawData header info
-            #loop traverses the four traces to find the info
-            for j in range(0,4):
-                #print(len(currentRawData))
-                if(currentRawData[j,0]==1):
-                                                                                # extended header dword 0 (valid trace)
-                                                                                # extended header dword 1 (VC info)
-                    acqNum_currentRawData  =  currentRawData[j,2]               # extended header dword 2 (acq num)
-                    isTOA_currentRawData   = (currentRawData[j,3] & 0x8) >> 3   # extended header dword 3 
-                    asicNum_currentRawData =  currentRawData[j,3] & 0x7         # extended header dword 1 (VC info)
-            #saves current data on returned data before adding new data
-            if (PRINT_VERBOSE): print('\n3B \n len 4')
-            returnedRawData = currentRawData
-        else:
-            #packet size error
-            if (PRINT_VERBOSE): print('\n4  \npacket size error, packet len: ', len(currentRawData))
-
-        if (PRINT_VERBOSE): print('\n5 \nacqNum_currentRawData: ', acqNum_currentRawData, '\nisTOA_currentRawData: ', isTOA_currentRawData, '\nasicNum_currentRawData: ', asicNum_currentRawData)
-        if (PRINT_VERBOSE): print('\n5 \nacqNum_newRawData: ',     acqNum_newRawData,     '\nisTOA_newRawData: ',     isTOA_newRawData, '\nasicNum_newRawData: ', asicNum_newRawData)
-        #case 2: acqNumber are different
-        if(acqNum_newRawData != acqNum_currentRawData):
-            frameComplete = 0
-            readyForDisplay = 1
-            return [frameComplete, readyForDisplay, currentRawData]
-
-        #fill the memory with the new data (when acqNums matches)
-        returnedRawData = self.fill_memory(returnedRawData, asicNum_newRawData, isTOA_newRawData, newRawData_DW)
-        if (PRINT_VERBOSE): print('\n6 \nReturn data 0:', returnedRawData[0,0:10])
-        if (PRINT_VERBOSE): print('\n6 \nReturn data 1:', returnedRawData[1,0:10])
-        if (PRINT_VERBOSE): print('\n6 \nReturn data 2:', returnedRawData[2,0:10])
-        if (PRINT_VERBOSE): print('\n6 \nReturn data 3:', returnedRawData[3,0:10])
-
-        #checks if the image is complete
-        isValidTrace0 =  returnedRawData[0,0]
-        if (PRINT_VERBOSE): print('\n7 \nisValidTrace0', isValidTrace0)
-        isValidTrace1 =  returnedRawData[1,0]
-        if (PRINT_VERBOSE): print('\n8 \nisValidTrace1', isValidTrace1)
-        isValidTrace2 =  returnedRawData[2,0]
-        if (PRINT_VERBOSE): print('\n9 \nisValidTrace2', isValidTrace2)
-        isValidTrace3 =  returnedRawData[3,0]
-        if (PRINT_VERBOSE): print('\n10 \nisValidTrace3', isValidTrace3)
-
-        if((isValidTrace0 == 1) and (isValidTrace1 == 1) and (isValidTrace2 == 1) and (isValidTrace3 == 1)):
-            frameComplete = 1
-            readyForDisplay = 1
-        else:
-            frameComplete = 0
-            readyForDisplay = 0
-
-        if (PRINT_VERBOSE): print('\n11 \nframeComplete: ', frameComplete, 'readyForDisplay: ', readyForDisplay, 'returned raw data len', len(returnedRawData))
-        #return parameters
-        return [frameComplete, readyForDisplay, returnedRawData]
-    
-    #fill the memory with the new data (when acqNums matches)
-    def fill_memory(self, returnedRawData, asicNum_currentRawData, isTOA_currentRawData, newRawData_DW):
-        ##if (PRINT_VERBOSE): print('New data:', newRawData_DW[0:10])
-        if (len(newRawData_DW)==1155):
-            if(asicNum_currentRawData==0 and isTOA_currentRawData==0):
-                returnedRawData[0,0]  = 1
-                returnedRawData[0,1:] = newRawData_DW
-            if(asicNum_currentRawData==1 and isTOA_currentRawData==0):
-                returnedRawData[1,0]  = 1
-                returnedRawData[1,1:] = newRawData_DW
-            if(asicNum_currentRawData==0 and isTOA_currentRawData==1):
-                returnedRawData[2,0]  = 1
-                returnedRawData[2,1:] = newRawData_DW
-            if(asicNum_currentRawData==1 and isTOA_currentRawData==1):
-                returnedRawData[3,0]  = 1
-                returnedRawData[3,1:] = newRawData_DW
-            ##if (PRINT_VERBOSE): print('Return data 0:', returnedRawData[0,0:10])
-            ##if (PRINT_VERBOSE): print('Return data 1:', returnedRawData[1,0:10])
-            ##if (PRINT_VERBOSE): print('Return data 2:', returnedRawData[2,0:10])
-            ##if (PRINT_VERBOSE): print('Return data 3:', returnedRawData[3,0:10])
-        return returnedRawData
+        return self._buildFrameFromPackets(newRawData)
 
-    
     def _buildFrameEpixM32Image(self, currentRawData, newRawData):
         """ Performs the epixM32 frame building.
             For this sensor the image takes two frames
             There is no guarantee both frames will always arrive nor on their order."""
-        #init local variables
-        frameComplete = 0
-        readyForDisplay = 0
-        returnedRawData = []
-        acqNum_currentRawData  = 0
-        asicNum_currentRawData = 0
-        acqNum_newRawData  = 0
-        asicNum_newRawData = 0
-
-        
-        #if (PRINT_VERBOSE): print('\nlen current Raw data', len(currentRawData), 'len new raw data', len(newRawData))
-        #converts data to 32 bit 
-        newRawData_DW = np.frombuffer(newRawData,dtype='uint32')
-        #if (PRINT_VERBOSE): print('\nlen current Raw data', len(currentRawData), 'len new raw data DW', len(newRawData_DW))
-
-        #retrieves header info
-                                                                  # header dword 0 (VC info)
-        acqNum_newRawData  =  newRawData_DW[1]                    # header dword 1
-        asicNum_newRawData =  newRawData_DW[2] & 0xF              # header dword 2
-        #if (PRINT_VERBOSE): print('\nacqNum_newRawData: ', acqNum_newRawData, '\nasicNum_newRawData:', asicNum_newRawData)
-        
-        #for i in range(3, 10):
-        #    print('New %x %x' %(newRawData_DW[i]&0xFFFF, newRawData_DW[i]>>16))
-        
-
-        #interpret headers
-        #case 1: new image (which means currentRawData is empty)
-        if (len(currentRawData) == 0):
-            frameComplete = 0
-            readyForDisplay = 0
-            z = np.zeros((1028,),dtype='uint32')# 2054 for the package plus 1 (first byte for the valid flag 
-            returnedRawData = np.array([z,z])
-            #makes the current raw data info the same as new so the logic later on this function will add the new data to the memory
-            acqNum_currentRawData  = acqNum_newRawData
-            asicNum_currentRawData = asicNum_newRawData
-        #case where the currentRawData is a byte array
-        elif(len(currentRawData) == 4108):
-            #for i in range(3, 10):
-            #    print('Curr %x %x' %(currentRawData[i]&0xFFFF, currentRawData[i]>>16))
-            frameComplete = 0
-            readyForDisplay = 0
-            z = np.zeros((1028,),dtype='uint32')# 2054 for the package plus 1 (first byte for the valid flag 
-            returnedRawData = np.array([z,z])
-            
-            #makes the current raw data info the same as new so the logic later on this function will add the new data to the memory
-            acqNum_currentRawData  = acqNum_newRawData
-            asicNum_currentRawData = asicNum_newRawData
-        
-        elif(len(currentRawData)==2):
-            #for i in range(3, 10):
-            #    print('Cur0 %x %x' %(currentRawData[0,i]&0xFFFF, currentRawData[0,i]>>16))
-            #for i in range(3, 10):
-            #    print('Cur1 %x %x' %(currentRawData[1,i]&0xFFFF, currentRawData[1,i]>>16))
-            
-            #recovers currentRawData header info
-            #loop traverses the four traces to find the info
-            for j in range(0,2):
-                #print(len(currentRawData))
-                if(currentRawData[j,0]==1):
-                                                                                # extended header dword 0 (valid trace)
-                                                                                # extended header dword 1 (VC info)
-                    acqNum_currentRawData  =  currentRawData[j,2]               # extended header dword 2 (acq num)
-                    asicNum_currentRawData =  currentRawData[j,3] & 0xf         # extended header dword 1 (VC info)
-            #saves current data on returned data before adding new data
-            returnedRawData = currentRawData
-        else:
-            #packet size error
-            if (PRINT_VERBOSE): print('\n packet size error, packet len: ', len(currentRawData))
-
-        ##if (PRINT_VERBOSE): print('\nacqNum_currentRawData: ', acqNum_currentRawData, '\nisTOA_currentRawData: ', isTOA_currentRawData, '\nasicNum_currentRawData: ', asicNum_currentRawData)
-        ##if (PRINT_VERBOSE): print('\nacqNum_newRawData: ',     acqNum_newRawData,     '\nisTOA_newRawData: ',     isTOA_newRawData, '\nasicNum_newRawData: ', asicNum_newRawData)
-        #case 2: acqNumber are different
-        if(acqNum_newRawData != acqNum_currentRawData):
-            frameComplete = 0
-            readyForDisplay = 1
-            return [frameComplete, readyForDisplay, currentRawData]
-        
-        #fill the memory with the new data (when acqNums matches)
-        if (len(newRawData_DW)==1027):
-            if(asicNum_newRawData==0):
-                returnedRawData[0,0]  = 1
-                returnedRawData[0,1:] = newRawData_DW
-            if(asicNum_newRawData==1):
-                returnedRawData[1,0]  = 1
-                returnedRawData[1,1:] = newRawData_DW
-        
-        #checks if the image is complete
-        isValidTrace0 =  returnedRawData[0,0]
-        ##if (PRINT_VERBOSE): print('\nisValidTrace0', isValidTrace0)
-        isValidTrace1 =  returnedRawData[1,0]
-        ##if (PRINT_VERBOSE): print('\nisValidTrace1', isValidTrace1)
-        if((isValidTrace0 == 1) and (isValidTrace1 == 1)):
-            frameComplete = 1
-            readyForDisplay = 1
-        else:
-            frameComplete = 0
-            readyForDisplay = 0
-        
-        #if (PRINT_VERBOSE): print('frameComplete: ', frameComplete, 'readyForDisplay: ', readyForDisplay, 'returned raw data len', len(returnedRawData))
-        #return parameters
-        return [frameComplete, readyForDisplay, returnedRawData]
-
-
+        return self._buildFrameFromPackets(newRawData)
 
     def _buildFrameEpixHRADC32x32Image(self, currentRawData, newRawData):
         """ Performs the epixHRADC32x32 frame building.
             For this sensor the image takes two frames
             There is no guarantee both frames will always arrive nor on their order."""
-        #init local variables
-        frameComplete = 0
-        readyForDisplay = 0
-        returnedRawData = []
-        acqNum_currentRawData  = 0
-        asicNum_currentRawData = 0
-        acqNum_newRawData  = 0
-        asicNum_newRawData = 0
-
-        
-        #if (PRINT_VERBOSE): print('\nlen current Raw data', len(currentRawData), 'len new raw data', len(newRawData))
-        #converts data to 32 bit 
-        newRawData_DW = np.frombuffer(newRawData,dtype='uint32')
-        #if (PRINT_VERBOSE): print('\nlen current Raw data', len(currentRawData), 'len new raw data DW', len(newRawData_DW))
-
-        #retrieves header info
-                                                                  # header dword 0 (VC info)
-        acqNum_newRawData  =  newRawData_DW[1]                    # header dword 1
-        asicNum_newRawData =  newRawData_DW[2] & 0x7              # header dword 2
-        #if (PRINT_VERBOSE): print('\nacqNum_newRawData: ', acqNum_newRawData, '\nasicNum_newRawData:', asicNum_newRawData)
-        
-        #for i in range(3, 10):
-        #    print('New %x %x' %(newRawData_DW[i]&0xFFFF, newRawData_DW[i]>>16))
-        
-
-        #interpret headers
-        #case 1: new image (which means currentRawData is empty)
-        if (len(currentRawData) == 0):
-            frameComplete = 0
-            readyForDisplay = 0
-            z = np.zeros((516,),dtype='uint32')# 512 for the package plus 1 (first byte for the valid flag 
-            returnedRawData = np.array([z,z])
-            #makes the current raw data info the same as new so the logic later on this function will add the new data to the memory
-            acqNum_currentRawData  = acqNum_newRawData
-            asicNum_currentRawData = asicNum_newRawData
-        #case where the currentRawData is a byte array
-        elif(len(currentRawData) == 2060):
-            #for i in range(3, 10):
-            #    print('Curr %x %x' %(currentRawData[i]&0xFFFF, currentRawData[i]>>16))
-            frameComplete = 0
-            readyForDisplay = 0
-            z = np.zeros((516,),dtype='uint32')# 512 for the package plus 1 (first byte for the valid flag 
-            returnedRawData = np.array([z,z])
-            
-            #makes the current raw data info the same as new so the logic later on this function will add the new data to the memory
-            acqNum_currentRawData  = acqNum_newRawData
-            asicNum_currentRawData = asicNum_newRawData
-        
-        elif(len(currentRawData)==2):
-            #for i in range(3, 10):
-            #    print('Cur0 %x %x' %(currentRawData[0,i]&0xFFFF, currentRawData[0,i]>>16))
-            #for i in range(3, 10):
-            #    print('Cur1 %x %x' %(currentRawData[1,i]&0xFFFF, currentRawData[1,i]>>16))
-            
-            #recovers currentRawData header info
-            #loop traverses the four traces to find the info
-            for j in range(0,2):
-                print("_buildFrameEpixHRADC32x32Image",len(currentRawData))
-                if(currentRawData[j,0]==1):
-                                                                                # extended header dword 0 (valid trace)
-                                                                                # extended header dword 1 (VC info)
-                    acqNum_currentRawData  =  currentRawData[j,2]               # extended header dword 2 (acq num)
-                    asicNum_currentRawData =  currentRawData[j,3] & 0x7         # extended header dword 1 (VC info)
-            #saves current data on returned data before adding new data
-            returnedRawData = currentRawData
-        else:
-            #packet size error
-            if (PRINT_VERBOSE): print('\n_buildFrameEpixHRADC32x32Image: packet size error, packet len: ', len(currentRawData))
-
-        ##if (PRINT_VERBOSE): print('\nacqNum_currentRawData: ', acqNum_currentRawData, '\nisTOA_currentRawData: ', isTOA_currentRawData, '\nasicNum_currentRawData: ', asicNum_currentRawData)
-        ##if (PRINT_VERBOSE): print('\nacqNum_newRawData: ',     acqNum_newRawData,     '\nisTOA_newRawData: ',     isTOA_newRawData, '\nasicNum_newRawData: ', asicNum_newRawData)
-        #case 2: acqNumber are different
-        if(acqNum_newRawData != acqNum_currentRawData):
-            frameComplete = 0
-            readyForDisplay = 1
-            return [frameComplete, readyForDisplay, currentRawData]
-        
-        #fill the memory with the new data (when acqNums matches)
-        if (len(newRawData_DW)==515):
-            if(asicNum_newRawData==0 or asicNum_newRawData==2):
-                returnedRawData[0,0]  = 1
-                returnedRawData[0,1:] = newRawData_DW
-            if(asicNum_newRawData==1):
-                returnedRawData[1,0]  = 1
-                returnedRawData[1,1:] = newRawData_DW
-        
-        #checks if the image is complete
-        isValidTrace0 =  returnedRawData[0,0]
-        if (PRINT_VERBOSE): print('\n_buildFrameEpixHRADC32x32Image: isValidTrace0', isValidTrace0)
-        isValidTrace1 =  returnedRawData[1,0]
-        if (PRINT_VERBOSE): print('\n_buildFrameEpixHRADC32x32Image: isValidTrace1', isValidTrace1)
-        if((isValidTrace0 == 1) and (isValidTrace1 == 1)):
-            frameComplete = 1
-            readyForDisplay = 1
-        else:
-            frameComplete = 0
-            readyForDisplay = 0
-        
-        if (PRINT_VERBOSE): print('_buildFrameEpixHRADC32x32Image: frameComplete: ', frameComplete, 'readyForDisplay: ', readyForDisplay, 'returned raw data len', len(returnedRawData))
-        #return parameters
-        return [frameComplete, readyForDisplay, returnedRawData]
-
-    
+        return self._buildFrameFromPackets(newRawData)
+
+    def _buildFrameFromPackets(self, newRawData):
+        """ Adds one packet to the camera event builder.
+            The event builder keeps the events in progress, so the current raw data is not needed.
+            Returns the completed event if any, otherwise the event dropped from the pool (incomplete)."""
+        events = self.buildImageFrames(newRawData)
+        if (len(events) == 0):
+            return [0, 0, []]
+        for [frameComplete, eventData] in events:
+            if (frameComplete):
+                return [1, 1, eventData]
+        if (PRINT_VERBOSE): print('Incomplete events: ', self.eventBuilder.incompleteEvents, 'timed out: ', self.eventBuilder.timedOutEvents)
+        return [0, 1, events[-1][1]]
 
     ##########################################################
     # define all camera specific descrabler functions
@@ -823,78 +472,16 @@ class Camera():
         return imgDesc
     
     def getThermistorTemp(self, x):
-         # resistor divider 100k and MC65F103B (Rt25=10k)
-         # Vref 2.5V
-         if x != 0:
-            Umeas = x / 16383.0 * 2.5
-            Itherm = Umeas / 100000;
-            Rtherm = (2.5 - Umeas) / Itherm;
-            LnRtR25 = np.log(Rtherm/10000.0)
-            TthermK = 1.0 / (3.3538646E-03 + 2.5654090E-04 * LnRtR25 + 1.9243889E-06 * (LnRtR25**2) + 1.0969244E-07 * (LnRtR25**3))
-            return TthermK - 273.15
-         else:
-            return 0.0
+        return quadFormat.thermistorTemp(x)
     
     def _descrambleEPixQuadImageAsByteArray(self, rawData):
         """performs the ePix Quad image descrambling (this is a place holder only)"""
         
-        # example of monitoring data descrambling
+        # monitoring data footer
         if (PRINT_VERBOSE):
-            footerOffset = 32+self._superRowSizeInBytes*self.sensorHeight
-            footer = rawData[footerOffset:footerOffset+38*2]
-            
-            shtHumRaw      = (footer[1] << 8) | footer[0]
-            shtTempRaw     = (footer[3] << 8) | footer[2]
-            nctLocTempRaw  = footer[4]
-            nctRemTempLRaw = footer[6]
-            nctRemTempHRaw = footer[7]
-            ad7949DataRaw0 = (footer[ 9] << 8) | footer[ 8]
-            ad7949DataRaw1 = (footer[11] << 8) | footer[10]
-            ad7949DataRaw2 = (footer[13] << 8) | footer[12]
-            ad7949DataRaw3 = (footer[15] << 8) | footer[14]
-            ad7949DataRaw4 = (footer[17] << 8) | footer[16]
-            ad7949DataRaw5 = (footer[19] << 8) | footer[18]
-            ad7949DataRaw6 = (footer[21] << 8) | footer[20]
-            ad7949DataRaw7 = (footer[23] << 8) | footer[22]
-            sensorRegRaw = [0] * 26
-            for i in range(26):
-                sensorRegRaw[i] = (footer[25+i*2] << 8) | footer[24+i*2]
-            print('SHT31 humidity %f %%'           %(shtHumRaw / 65535.0 * 100.0))
-            print('SHT31 temperature %f deg C'     %(shtTempRaw / 65535.0 * 175.0 - 45.0))
-            print('NCT local temperature %d deg C' %(nctLocTempRaw))
-            print('NCT FPGA temperature %f deg C'  %(nctRemTempHRaw + (nctRemTempLRaw >> 6)*0.25))
-            print('ASIC_A0_2V5_Current %f mA'      %(ad7949DataRaw0 / 16383.0 * 2.5 / 330.0 * 1000000))
-            print('ASIC_A1_2V5_Current %f mA'      %(ad7949DataRaw1 / 16383.0 * 2.5 / 330.0 * 1000000))
-            print('ASIC_A2_2V5_Current %f mA'      %(ad7949DataRaw2 / 16383.0 * 2.5 / 330.0 * 1000000))
-            print('ASIC_A3_2V5_Current %f mA'      %(ad7949DataRaw3 / 16383.0 * 2.5 / 330.0 * 1000000))
-            print('ASIC_D0_2V5_Current %f mA'      %(ad7949DataRaw4 / 16383.0 * 2.5 / 330.0 * 1000000 / 2.0))
-            print('ASIC_D1_2V5_Current %f mA'      %(ad7949DataRaw5 / 16383.0 * 2.5 / 330.0 * 1000000 / 2.0))
-            print('Therm0_Temp %f deg C'           %(self.getThermistorTemp(ad7949DataRaw6)))
-            print('Therm1_Temp %f deg C'           %(self.getThermistorTemp(ad7949DataRaw7)))
-            print('PwrDigCurr %f A'                %(sensorRegRaw[0] * 0.1024 / 4095 / 0.02))
-            print('PwrDigVin %f V'                 %(sensorRegRaw[1] * 102.4 / 4095))
-            print('PwrDigTemp %f deg C'            %(sensorRegRaw[2] * 2.048 / 4095 * (130.0/(0.882-1.951)) + (0.882/0.0082+100) ))
-            print('PwrAnaCurr %f A'                %(sensorRegRaw[3] * 0.1024 / 4095 / 0.02))
-            print('PwrAnaVin %f V'                 %(sensorRegRaw[4] * 102.4 / 4095))
-            print('PwrAnaTemp %f deg C'            %(sensorRegRaw[5] * 2.048 / 4095 * (130.0/(0.882-1.951)) + (0.882/0.0082+100) ))
-            LdoNames = [
-               'A0+2_5V_H_Temp', 'A0+2_5V_L_Temp',
-               'A1+2_5V_H_Temp', 'A1+2_5V_L_Temp',
-               'A2+2_5V_H_Temp', 'A2+2_5V_L_Temp',
-               'A3+2_5V_H_Temp', 'A3+2_5V_L_Temp',
-               'D0+2_5V_Temp'  , 'D1+2_5V_Temp',
-               'A0+1_8V_Temp'  , 'A1+1_8V_Temp',
-               'A2+1_8V_Temp'
-            ]
-            for i in range(13):
-                print('%s %f deg C'                %(LdoNames[i], sensorRegRaw[6+i] * 1.65 / 65535 *100 ))
-            print('PcbAnaTemp0 %f deg C'           %(sensorRegRaw[19] * 1.65 / 65535 * (130.0/(0.882-1.951)) + (0.882/0.0082+100) ))
-            print('PcbAnaTemp1 %f deg C'           %(sensorRegRaw[20] * 1.65 / 65535 * (130.0/(0.882-1.951)) + (0.882/0.0082+100) ))
-            print('PcbAnaTemp2 %f deg C'           %(sensorRegRaw[21] * 1.65 / 65535 * (130.0/(0.882-1.951)) + (0.882/0.0082+100) ))
-            print('TrOptTemp %f deg C'             %(sensorRegRaw[22] * 1.0 / 256 ))
-            print('TrOptVcc %f V'                  %(sensorRegRaw[23] * 0.0001 ))
-            print('TrOptTxPwr %f uW'               %(sensorRegRaw[24] * 0.1 ))
-            print('TrOptRxPwr %f uW'               %(sensorRegRaw[25] * 0.1 ))
+            footer = quadFooter.decodeFrames(rawData)[0]
+            for name in footer.dtype.names:
+                print('%s %f' %(name, footer[name]))
         
         #removes header before displying the image
         for j in range(0,32):
@@ -0,0 +1,172 @@
+#!/usr/bin/env python
+#-----------------------------------------------------------------------------
+# Title      : multi-packet event builder for the ePix cameras
+#-----------------------------------------------------------------------------
+# File       : EventBuilder.py
+# Created    : 2026-10-19
+#-----------------------------------------------------------------------------
+# Description:
+# Assembles the events of cameras that send one acquisition as several
+# packets (Tixel, Cpix2, ePixM32, HrAdc). Packets are placed by acquisition
+# number (header dword 1) and slot (header dword 2) into a small pool of
+# preallocated events, so out of order and interleaved acquisitions are
+# built without allocating new arrays.
+#
+#-----------------------------------------------------------------------------
+# This file is part of the ePix rogue. It is subject to
+# the license terms in the LICENSE.txt file found in the top-level directory
+# of this distribution and at:
+#    https://confluence.slac.stanford.edu/display/ppareg/LICENSE.html.
+# No part of the ePix rogue, including this file, may be
+# copied, modified, propagated, or distributed except according to the terms
+# contained in the LICENSE.txt file.
+#-----------------------------------------------------------------------------
+
+import time
+import numpy as np
+
+PRINT_VERBOSE = 0
+
+NO_SLOT = -1
+
+
+################################################################################
+################################################################################
+#   Event builder
+#   Each event is a (numSlots, packetDW + 1) uint32 array. Column 0 holds the
+#   valid flag of the slot and columns 1: the packet (header included), which
+#   is the layout expected by the Camera descramblers.
+################################################################################
+class EventBuilder():
+    """builds events from packets keyed by acquisition number"""
+
+    def __init__(self, packetDW, slotLut, slotMask = 0xF, poolSize = 2, timeout = None, maxAcqAge = None):
+        """packetDW  : packet size in 32 bit words
+           slotLut   : slot index for each value of (header dword 2 & slotMask), NO_SLOT to drop
+           poolSize  : number of events that can be built concurrently (reorder window)
+           timeout   : seconds after which an incomplete event is dropped (None disables it)
+           maxAcqAge : acquisitions after which an incomplete event is dropped (None disables it)"""
+        self.packetDW = packetDW
+        self.slotLut  = np.array(slotLut, dtype=np.int8)
+        self.slotMask = slotMask
+        self.numSlots = int(self.slotLut.max()) + 1
+        self.fullMask = (1 << self.numSlots) - 1
+        self.timeout  = timeout
+        self.maxAcqAge = maxAcqAge
+        self._allocPool(poolSize)
+        self.resetCounters()
+
+    def _allocPool(self, poolSize):
+        self.poolSize = poolSize
+        self.pool     = np.zeros((poolSize, self.numSlots, self.packetDW + 1), dtype=np.uint32)
+        self.acqNum   = np.zeros(poolSize, dtype=np.int64)
+        self.mask     = np.zeros(poolSize, dtype=np.uint32)
+        self.used     = np.zeros(poolSize, dtype=bool)
+        self.start    = np.zeros(poolSize, dtype=np.float64)
+        self._next    = 0
+
+    def resetCounters(self):
+        self.completeEvents   = 0
+        self.incompleteEvents = 0
+        self.timedOutEvents   = 0
+        self.sizeErrors       = 0
+        self.slotErrors       = 0
+        self.duplicatePackets = 0
+
+    def setPoolSize(self, poolSize):
+        """changes the reorder window, the events in progress are dropped"""
+        if poolSize != self.poolSize:
+            self._allocPool(poolSize)
+
+    def clear(self):
+        """drops all the events in progress"""
+        self.used[:] = False
+        self.mask[:] = 0
+
+    def addPacket(self, packet, timestamp = None):
+        """places one packet, returns the list of [frameComplete, event] that left the pool.
+           Complete events are views of the pool, valid until that entry is reused, the
+           incomplete ones are copies as their entry can be reused by this same packet."""
+        packetDW = np.frombuffer(packet, dtype=np.uint32)
+        if len(packetDW) != self.packetDW:
+            self.sizeErrors += 1
+            if (PRINT_VERBOSE): print('EventBuilder: packet size error, packet len: ', len(packetDW))
+            return []
+        slot = self.slotLut[packetDW[2] & self.slotMask]
+        if slot == NO_SLOT:
+            self.slotErrors += 1
+            return []
+        if timestamp is None:
+            timestamp = time.time()
+
+        acqNum = int(packetDW[1])
+        emitted = self._evictTimedOut(timestamp, acqNum)
+
+        hits = np.flatnonzero(self.used & (self.acqNum == acqNum))
+        if len(hits) > 0:
+            idx = hits[0]
+        else:
+            idx = self._allocEvent(acqNum, timestamp, emitted)
+
+        event = self.pool[idx]
+        if self.mask[idx] & (1 << slot):
+            self.duplicatePackets += 1
+        event[slot, 0]  = 1
+        event[slot, 1:] = packetDW
+        self.mask[idx] |= (1 << slot)
+
+        if self.mask[idx] == self.fullMask:
+            self.used[idx] = False
+            self.completeEvents += 1
+            emitted.append([1, event])
+        return emitted
+
+    def flush(self):
+        """emits all the events in progress as incomplete, oldest first"""
+        emitted = []
+        for idx in np.argsort(self.start):
+            if self.used[idx]:
+                self.incompleteEvents += 1
+                emitted.append([0, self._releaseIncomplete(idx)])
+        return emitted
+
+    def _allocEvent(self, acqNum, timestamp, emitted):
+        free = np.flatnonzero(~self.used)
+        if len(free) > 0:
+            # round robin keeps recently emitted events valid as long as possible
+            idx = free[np.argmin((free - self._next) % self.poolSize)]
+        else:
+            # pool full, the oldest event will not be completed anymore
+            idx = np.argmin(self.start)
+            self.incompleteEvents += 1
+            emitted.append([0, self._releaseIncomplete(idx)])
+        self._next = (idx + 1) % self.poolSize
+        self.used[idx]   = True
+        self.acqNum[idx] = acqNum
+        self.start[idx]  = timestamp
+        self.mask[idx]   = 0
+        self.pool[idx, :, 0] = 0
+        return idx
+
+    def _evictTimedOut(self, timestamp, acqNum):
+        emitted = []
+        expired = np.zeros(self.poolSize, dtype=bool)
+        if self.timeout is not None:
+            expired |= (timestamp - self.start) > self.timeout
+        if self.maxAcqAge is not None:
+            # acquisition counter distance, wraps at 32 bits, newer events are never expired
+            acqAge = (acqNum - self.acqNum) & 0xFFFFFFFF
+            expired |= (acqAge > self.maxAcqAge) & (acqAge < 0x80000000)
+        for idx in np.flatnonzero(self.used & expired):
+            self.timedOutEvents += 1
+            emitted.append([0, self._releaseIncomplete(idx)])
+        return emitted
+
+    def _releaseIncomplete(self, idx):
+        # missing slots are returned as zeros
+        for slot in range(self.numSlots):
+            if not (self.mask[idx] & (1 << slot)):
+                self.pool[idx, slot, :] = 0
+        self.used[idx] = False
+        # the entry is free, a copy survives its reuse
+        return self.pool[idx].copy()
@@ -0,0 +1,216 @@
+#!/usr/bin/env python
+#-----------------------------------------------------------------------------
+# Title      : frame integrity counters and rogue .dat file index
+#-----------------------------------------------------------------------------
+# File       : FrameFile.py
+# Created    : 2026-10-19
+#-----------------------------------------------------------------------------
+# Description:
+# Frame integrity counters and memory mapped index of a rogue .dat file.
+# Only needs numpy, so offline readers and the descramblers can use it without
+# rogue. The live stream monitor built on these counters is in FrameMonitor.py.
+#
+#-----------------------------------------------------------------------------
+# This file is part of the ePix rogue. It is subject to
+# the license terms in the LICENSE.txt file found in the top-level directory
+# of this distribution and at:
+#    https://confluence.slac.stanford.edu/display/ppareg/LICENSE.html.
+# No part of the ePix rogue, including this file, may be
+# copied, modified, propagated, or distributed except according to the terms
+# contained in the LICENSE.txt file.
+#-----------------------------------------------------------------------------
+
+import mmap
+import struct
+import bisect
+import numpy as np
+
+
+PRINT_VERBOSE = 0
+
+# cameraType : (frame size in bytes, sequence/acquisition header dword, packets per event)
+# frame size None means the size of the first received frame is used
+FRAME_MONITOR_CAMERAS = {
+    'ePix100a'     : (None,    2, 1),
+    'ePixS'        : (None,    2, 1),
+    'ePix10ka'     : (274988,  2, 1),
+    'ePixQuad'     : (1095232, 2, 1),
+    'ePixQuadSim'  : (None,    2, 1),
+    'ePixMsh'      : (4660,    2, 1),
+    'Tixel48x48'   : (4620,    1, 4),
+    'Cpix2'        : (4620,    1, 4),
+    'ePixM32Array' : (4108,    1, 2),
+    'HrAdc32x32'   : (2060,    1, 2),
+}
+
+# event rate histogram bins (1 Hz to 100 kHz, log spaced)
+RATE_BIN_EDGES = list(np.logspace(0, 5, 51))
+
+SEQ_MASK = 0xFFFFFFFF
+
+
+################################################################################
+################################################################################
+#   Frame integrity counters
+#   Plain python bookkeeping shared by the live and offline monitors
+################################################################################
+class FrameIntegrityCounter():
+    """counts frames, size errors, lost and incomplete events of one camera stream"""
+
+    def __init__(self, cameraType = 'ePix10ka', expectedSize = None):
+        self.cameraType = cameraType
+        [defaultSize, self.seqWord, self.packetsPerEvent] = FRAME_MONITOR_CAMERAS.get(cameraType, (None, 2, 1))
+        self._defaultSize = expectedSize if expectedSize is not None else defaultSize
+        self.rateBinEdges = RATE_BIN_EDGES
+        self.reset()
+
+    def reset(self):
+        self.expectedSize = self._defaultSize
+        self.frameCount = 0
+        self.eventCount = 0
+        self.sizeErrors = 0
+        self.lostEvents = 0
+        self.incompleteEvents = 0
+        self.seqResets = 0
+        self.lastSeq = None
+        self.packetCount = 0
+        self.lastTime = None
+        self.rateHist = [0] * (len(self.rateBinEdges) + 1)
+
+    def process(self, size, seq, timestamp = None):
+        """book keeping of one frame (live path, scalar only)"""
+        self.frameCount += 1
+        if self.expectedSize is None:
+            self.expectedSize = size
+        # frames with wrong size are not used for event building
+        if size != self.expectedSize:
+            self.sizeErrors += 1
+            return
+        # further packet of the current event
+        if seq == self.lastSeq:
+            self.packetCount += 1
+            return
+        # new event
+        if self.lastSeq is not None:
+            if self.packetCount < self.packetsPerEvent:
+                self.incompleteEvents += 1
+            gap = (seq - self.lastSeq - 1) & SEQ_MASK
+            if gap > (SEQ_MASK >> 1):
+                # counter went backwards, the sequence counter was reset
+                self.seqResets += 1
+            else:
+                self.lostEvents += gap
+            if timestamp is not None and self.lastTime is not None and timestamp > self.lastTime:
+                self.rateHist[bisect.bisect(self.rateBinEdges, 1.0/(timestamp - self.lastTime))] += 1
+        self.lastSeq = seq
+        self.lastTime = timestamp
+        self.packetCount = 1
+        self.eventCount += 1
+
+    def processArrays(self, sizes, seqs):
+        """vectorized book keeping of a batch of frames (offline path)"""
+        sizes = np.asarray(sizes)
+        seqs = np.asarray(seqs, dtype=np.uint32)
+        self.frameCount += len(sizes)
+        if len(sizes) == 0:
+            return
+        if self.expectedSize is None:
+            self.expectedSize = int(sizes[0])
+        sizeOk = sizes == self.expectedSize
+        self.sizeErrors += int(len(sizes) - np.count_nonzero(sizeOk))
+        seqs = seqs[sizeOk]
+        if len(seqs) == 0:
+            return
+        # prepend the open event of the previous batch
+        hasOpenEvent = self.lastSeq is not None
+        if hasOpenEvent:
+            seqs = np.concatenate((np.array([self.lastSeq], dtype=np.uint32), seqs))
+        starts = np.concatenate(([0], np.flatnonzero(seqs[1:] != seqs[:-1]) + 1))
+        counts = np.diff(np.concatenate((starts, [len(seqs)])))
+        if hasOpenEvent:
+            counts[0] += self.packetCount - 1
+        # all but the last event are closed
+        self.incompleteEvents += int(np.count_nonzero(counts[:-1] < self.packetsPerEvent))
+        eventSeqs = seqs[starts]
+        gaps = (eventSeqs[1:] - eventSeqs[:-1] - np.uint32(1)).astype(np.uint32)
+        resets = gaps > (SEQ_MASK >> 1)
+        self.seqResets += int(np.count_nonzero(resets))
+        self.lostEvents += int(gaps[~resets].sum(dtype=np.uint64))
+        self.eventCount += len(starts) - (1 if hasOpenEvent else 0)
+        self.lastSeq = int(eventSeqs[-1])
+        self.packetCount = int(counts[-1])
+
+    def processFileIndex(self, index, channel = 0x1):
+        """checks all frames of a FrameFileIndex recorded on the given channel"""
+        sel = index.channels == channel
+        self.processArrays(index.sizes[sel], index.headerWords(self.seqWord)[sel])
+
+    def summary(self):
+        return ('%s: %d frames, %d events, %d size errors, %d lost events, %d incomplete events, %d sequence resets' %
+                (self.cameraType, self.frameCount, self.eventCount, self.sizeErrors, self.lostEvents, self.incompleteEvents, self.seqResets))
+
+
+################################################################################
+################################################################################
+#   Rogue file index
+#   Memory maps a rogue .dat file and indexes its records without reading
+#   the payloads
+################################################################################
+class FrameFileIndex():
+    """memory mapped index of the records stored in a rogue .dat file"""
+
+    def __init__(self, filename):
+        self.filename = filename
+        self._file = open(filename, mode = 'rb')
+        self.data = mmap.mmap(self._file.fileno(), 0, access = mmap.ACCESS_READ)
+
+        offsets = []
+        sizes = []
+        channels = []
+        pos = 0
+        end = len(self.data)
+        # record header: size (bytes including the second header word), flags (channel in bits 31:24)
+        while pos + 8 <= end:
+            [size, flags] = struct.unpack_from('<II', self.data, pos)
+            if (size < 4) or (pos + 4 + size > end):
+                if (PRINT_VERBOSE): print('FrameFileIndex: truncated record at byte', pos)
+                break
+            offsets.append(pos + 8)
+            sizes.append(size - 4)
+            channels.append(flags >> 24)
+            pos = pos + 4 + size
+
+        self.offsets = np.array(offsets, dtype=np.int64)
+        self.sizes = np.array(sizes, dtype=np.int64)
+        self.channels = np.array(channels, dtype=np.uint8)
+
+    def __len__(self):
+        return len(self.offsets)
+
+    def payload(self, i, dtype = 'uint8'):
+        """returns record i as a read only view of the mapped file (no copy)"""
+        itemsize = np.dtype(dtype).itemsize
+        return np.frombuffer(self.data, dtype=dtype, count=int(self.sizes[i]//itemsize), offset=int(self.offsets[i]))
+
+    def headerWords(self, word):
+        """returns dword <word> of every record, 0 for records that are too short"""
+        words = np.zeros(len(self), dtype=np.uint32)
+        valid = self.sizes >= 4*(word + 1)
+        buf = np.frombuffer(self.data, dtype=np.uint8)
+        idx = (self.offsets[valid] + 4*word)[:,None] + np.arange(4)
+        words[valid] = buf[idx].view('<u4').ravel()
+        return words
+
+    def recordBytes(self, offset, count):
+        """returns bytes [offset, offset+count) of every record as a (records, count) uint8
+           array, zeros for records that are too short"""
+        data = np.zeros((len(self), count), dtype=np.uint8)
+        valid = self.sizes >= offset + count
+        buf = np.frombuffer(self.data, dtype=np.uint8)
+        idx = (self.offsets[valid] + offset)[:,None] + np.arange(count)
+        data[valid] = buf[idx]
+        return data
+
+    def close(self):
+        self.data.close()
+        self._file.close()
@@ -0,0 +1,217 @@
+#!/usr/bin/env python
+#-----------------------------------------------------------------------------
+# Title      : synthetic raw frames for the ePix cameras
+#-----------------------------------------------------------------------------
+# File       : FrameGenerator.py
+# Created    : 2026-10-19
+#-----------------------------------------------------------------------------
+# Description:
+# Inverse of the Camera descramblers: turns a (sensorHeight, sensorWidth)
+# image into the raw packets the camera sends (super row interleave of the
+# ePix100a/10ka/Quad, 4 TOA/TOT packets of Tixel/Cpix2, 2 packets of
+# ePixM32/HrAdc) with headers and acquisition numbers, and writes them as
+# rogue .dat files. Used for round trip tests and throughput benchmarks of
+# the descramblers without recorded data.
+#
+#-----------------------------------------------------------------------------
+# This file is part of the ePix rogue. It is subject to
+# the license terms in the LICENSE.txt file found in the top-level directory
+# of this distribution and at:
+#    https://confluence.slac.stanford.edu/display/ppareg/LICENSE.html.
+# No part of the ePix rogue, including this file, may be
+# copied, modified, propagated, or distributed except according to the terms
+# contained in the LICENSE.txt file.
+#-----------------------------------------------------------------------------
+
+import numpy as np
+import ePixViewer.Cameras as cameras
+import ePixViewer.FrameFile as frameFile
+
+PRINT_VERBOSE = 0
+
+# single packet cameras: 8 header dwords, multi-packet cameras: 3 header dwords
+# (dword 1 acquisition number, dword 2 the slot code of the packet)
+FRAME_HEADER_BYTES  = 32
+PACKET_HEADER_BYTES = 12
+
+# (height, width, bit mask, raw row order) of every camera, written out from the
+# original per camera descramblers and not taken from the Camera class, so a
+# wrong row map or slot table in a descrambler fails the round trip.
+# 'halves'   : odd image rows first, taken from the end of the frame (ePix100a)
+# 'quarters' : image rows j%4 == 1, 2, 3, 0, odd ones from the end (ePix Quad)
+CAMERA_LAYOUTS = {
+    'ePix100a'     : (708, 768, 0xFFFF, 'halves'),
+    'ePixS'        : (24,  20,  0xFFFF, 'halves'),
+    'ePix10ka'     : (356, 384, 0x7FFF, 'halves'),
+    'ePixQuad'     : (712, 768, 0x7FFF, 'quarters'),
+    'ePixQuadSim'  : (712, 768, 0x7FFF, 'quarters'),
+    'ePixMsh'      : (48,  48,  0x7FFF, None),
+    'Tixel48x48'   : (96,  96,  0xFFFF, None),
+    'Cpix2'        : (96,  96,  0x7FFF, None),
+    'ePixM32Array' : (64,  64,  0x3FFF, None),
+    'HrAdc32x32'   : (32,  64,  0xFFFF, None),
+}
+
+# multi-packet cameras: packet size in 32 bit words, (rows, columns) of the image
+# tiles sent as separate packets and the header dword 2 code of every tile,
+# slot = row * columns + column. Tixel/Cpix2 codes are the ASIC (bits 2:0) and TOA (bit 3)
+PACKET_LAYOUTS = {
+    'Tixel48x48'   : (1155, (2, 2), [0x0, 0x1, 0x8, 0x9]),
+    'Cpix2'        : (1155, (2, 2), [0x0, 0x1, 0x8, 0x9]),
+    'ePixM32Array' : (1027, (1, 2), [0x0, 0x1]),
+    'HrAdc32x32'   : (515,  (1, 2), [0x0, 0x1]),
+}
+
+# rogue .dat record header: size (bytes including the flags word), flags (channel in bits 31:24)
+DAT_DATA_CHANNEL = 0x1
+
+
+################################################################################
+################################################################################
+#   Scrambler
+#   The packet layout comes from the tables above, the Camera class is only
+#   used by descramble() to check the round trip.
+################################################################################
+def rawRowOrder(order, height):
+    """raw row of every image row, same loops as the original byte array descramblers"""
+    if (order == 'halves'):
+        top = [height - j for j in range(height) if j%2 == 1]
+        bot = [j for j in range(height) if j%2 == 0]
+        return np.array(top + bot)
+    if (order == 'quarters'):
+        groups = {0 : [], 1 : [], 2 : [], 3 : []}
+        for j in range(height):
+            groups[j%4].append(height - j if j%2 == 1 else j)
+        return np.array(groups[1] + groups[2] + groups[3] + groups[0])
+    return None
+
+
+class FrameScrambler():
+    """converts images to the raw packets of one camera type"""
+
+    def __init__(self, cameraType = 'ePix100a'):
+        self.cameraType = cameraType
+        self.camera = cameras.Camera(cameraType = cameraType)
+        [self.height, self.width, self.bitMask, rowOrder] = CAMERA_LAYOUTS[cameraType]
+        frameSize = frameFile.FRAME_MONITOR_CAMERAS.get(cameraType, (None, 2, 1))[0]
+
+        if (cameraType in PACKET_LAYOUTS):
+            [packetDW, [rows, cols], self.slotCodes] = PACKET_LAYOUTS[cameraType]
+            self.tileShape = (self.height // rows, self.width // cols)
+            self.tileCols = cols
+            self.numPackets = rows * cols
+            self.packetSize = 4 * packetDW
+        else:
+            # frames are padded to the firmware frame size (trailing monitoring data)
+            self.rowMap = rawRowOrder(rowOrder, self.height)
+            self.numPackets = 1
+            self.packetSize = max(frameSize or 0, FRAME_HEADER_BYTES + 2 * self.height * self.width)
+
+    def scramble(self, image, acqNum = 0, out = None):
+        """returns the (numPackets, packetSize) uint8 raw packets of one image"""
+        if out is None:
+            out = np.zeros((self.numPackets, self.packetSize), dtype=np.uint8)
+        image = np.asarray(image).astype('<u2', copy = False)
+        acqNum = acqNum & 0xFFFFFFFF
+
+        if (self.numPackets == 1):
+            header = out[0, :FRAME_HEADER_BYTES].view('<u4')
+            header[:] = 0
+            # acquisition number and sequence counter
+            header[1] = acqNum
+            header[2] = acqNum
+            pixels = out[0, FRAME_HEADER_BYTES:FRAME_HEADER_BYTES + 2 * self.height * self.width].view('<u2').reshape(self.height, self.width)
+            if (self.rowMap is None):
+                pixels[...] = image
+            else:
+                pixels[self.rowMap] = image
+            return out
+
+        [tileHeight, tileWidth] = self.tileShape
+        for slot in range(self.numPackets):
+            [row, col] = divmod(slot, self.tileCols)
+            header = out[slot, :PACKET_HEADER_BYTES].view('<u4')
+            header[0] = 0
+            header[1] = acqNum
+            header[2] = self.slotCodes[slot]
+            pixels = out[slot, PACKET_HEADER_BYTES:PACKET_HEADER_BYTES + 2 * tileHeight * tileWidth].view('<u2')
+            pixels[...] = image[row*tileHeight:(row+1)*tileHeight, col*tileWidth:(col+1)*tileWidth].ravel()
+        return out
+
+    def descramble(self, packets):
+        """descrambles packets with the Camera class (round trip check), None if the event is incomplete"""
+        if (self.numPackets == 1):
+            return self.camera.descrambleImage(bytearray(packets[0]))
+        self.camera.eventBuilder.clear()
+        for packet in packets:
+            for [frameComplete, event] in self.camera.buildImageFrames(packet):
+                if (frameComplete):
+                    return self.camera.descrambleImage(event)
+        return None
+
+
+################################################################################
+#   Rogue .dat files
+################################################################################
+def writeDatRecords(f, packets, channel = DAT_DATA_CHANNEL):
+    """writes packets (bytes like or uint8 arrays) as rogue records to an open file, returns the bytes written"""
+    written = 0
+    for packet in packets:
+        size = len(packet)
+        f.write(np.array([size + 4, (channel & 0xFF) << 24], dtype='<u4').tobytes())
+        f.write(packet)
+        written += size + 8
+    return written
+
+
+################################################################################
+################################################################################
+#   Generator
+#   pedestal + gaussian noise + random hits, masked to the camera bit mask
+################################################################################
+class FrameGenerator():
+    """synthetic images and their raw packets for one camera type"""
+
+    def __init__(self, cameraType = 'ePix100a', pedestal = 1000, noise = 10.0, hitsPerFrame = 0, hitAmplitude = 500, seed = None):
+        """pedestal, noise : ADU values, scalars or (sensorHeight, sensorWidth) arrays
+           hitsPerFrame    : mean number of randomly placed hits of hitAmplitude ADU per image"""
+        self.scrambler = FrameScrambler(cameraType)
+        self.shape = (self.scrambler.height, self.scrambler.width)
+        self.pedestal = pedestal
+        self.noise = noise
+        self.hitsPerFrame = hitsPerFrame
+        self.hitAmplitude = hitAmplitude
+        self.rng = np.random.default_rng(seed)
+        self._packets = np.zeros((self.scrambler.numPackets, self.scrambler.packetSize), dtype=np.uint8)
+
+    def image(self):
+        """returns one synthetic (sensorHeight, sensorWidth) uint16 image"""
+        image = self.pedestal + self.rng.standard_normal(self.shape) * self.noise
+        if (self.hitsPerFrame > 0):
+            hits = self.rng.integers(0, image.size, self.rng.poisson(self.hitsPerFrame))
+            np.add.at(image.reshape(-1), hits, self.hitAmplitude)
+        image = np.clip(np.rint(image), 0, self.scrambler.bitMask).astype(np.uint16)
+        if (self.scrambler.cameraType == 'Tixel48x48'):
+            # the Tixel descrambler keeps only the pixels with the valid bit (bit 0) set
+            image |= 1
+        return image
+
+    def frames(self, count, start = 0, images = None):
+        """yields [acqNum, image, packets] for count acquisitions. The packets buffer
+           is reused, images (an iterable) replaces the synthetic images"""
+        images = iter(images) if images is not None else None
+        for acqNum in range(start, start + count):
+            image = next(images) if images is not None else self.image()
+            yield [acqNum, image, self.scrambler.scramble(image, acqNum, out = self._packets)]
+
+    def writeDat(self, filename, numFrames = None, fileSize = None, channel = DAT_DATA_CHANNEL, start = 0):
+        """writes numFrames acquisitions, or as many as fit in fileSize bytes, to a rogue .dat file.
+           Returns the number of acquisitions written"""
+        recordSize = self.scrambler.numPackets * (self.scrambler.packetSize + 8)
+        if (numFrames is None):
+            numFrames = max(1, int(fileSize) // recordSize) if fileSize is not None else 1
+        with open(filename, 'wb') as f:
+            for [acqNum, image, packets] in self.frames(numFrames, start):
+                writeDatRecords(f, packets, channel)
+        if (PRINT_VERBOSE): print('FrameGenerator: %d acquisitions, %d bytes written to %s' % (numFrames, numFrames * recordSize, filename))
+        return numFrames
@@ -0,0 +1,105 @@
+#!/usr/bin/env python
+#-----------------------------------------------------------------------------
+# Title      : frame integrity monitor for the ePix camera streams
+#-----------------------------------------------------------------------------
+# File       : FrameMonitor.py
+# Created    : 2026-10-19
+#-----------------------------------------------------------------------------
+# Description:
+# Tracks frame sizes, sequence gaps and event rates of a camera data stream.
+# The same counters are used live (stream tap on the data VC) and offline
+# (memory mapped index of a rogue .dat file, see FrameFile.py).
+#
+#-----------------------------------------------------------------------------
+# This file is part of the ePix rogue. It is subject to
+# the license terms in the LICENSE.txt file found in the top-level directory
+# of this distribution and at:
+#    https://confluence.slac.stanford.edu/display/ppareg/LICENSE.html.
+# No part of the ePix rogue, including this file, may be
+# copied, modified, propagated, or distributed except according to the terms
+# contained in the LICENSE.txt file.
+#-----------------------------------------------------------------------------
+
+import struct
+import time
+import rogue.interfaces.stream
+import pyrogue as pr
+
+# the counters and the file index only need numpy, they are kept importable from here
+from ePixViewer.FrameFile import FRAME_MONITOR_CAMERAS, FrameIntegrityCounter, FrameFileIndex
+
+
+################################################################################
+################################################################################
+#   Live frame monitor
+#   pyrogue device with the counters exported as variables. Connect it with
+#   pyrogue.streamTap(dataVc, monitor) so the data path is not slowed down.
+################################################################################
+class _FrameMonitorSlave(rogue.interfaces.stream.Slave):
+    """reads only the frame header and feeds the counters"""
+
+    def __init__(self, counter):
+        rogue.interfaces.stream.Slave.__init__(self)
+        self._counter = counter
+        self._seqOffset = 4*counter.seqWord
+        self._header = bytearray(self._seqOffset + 4)
+
+    def _acceptFrame(self, frame):
+        size = frame.getPayload()
+        if size >= len(self._header):
+            frame.read(self._header, 0)
+            seq = struct.unpack_from('<I', self._header, self._seqOffset)[0]
+        else:
+            seq = None
+        self._counter.process(size, seq, time.time())
+
+
+class FrameMonitor(pr.Device):
+    def __init__(self, cameraType = 'ePix10ka', expectedSize = None, **kwargs):
+        """Create the frame size, sequence gap and rate monitor"""
+        super().__init__(description='Camera Stream Integrity Monitor', **kwargs)
+
+        self._counter = FrameIntegrityCounter(cameraType = cameraType, expectedSize = expectedSize)
+        self._slave = _FrameMonitorSlave(self._counter)
+        self._lastRateTime = time.time()
+        self._lastRateCount = 0
+
+        def getCounter(name):
+            def func(dev, var):
+                value = getattr(self._counter, name)
+                return 0 if value is None else value
+            return func
+
+        self.add(pr.LocalVariable(name='CameraType',       description='Camera type',                        mode='RO', value=cameraType))
+        self.add(pr.LocalVariable(name='ExpectedSize',     description='Expected frame size (bytes)',        mode='RO', value=0, localGet=getCounter('expectedSize')))
+        self.add(pr.LocalVariable(name='FrameCount',       description='Received frames',                    mode='RO', value=0, localGet=getCounter('frameCount'),       pollInterval=1))
+        self.add(pr.LocalVariable(name='EventCount',       description='Received events',                    mode='RO', value=0, localGet=getCounter('eventCount'),       pollInterval=1))
+        self.add(pr.LocalVariable(name='SizeErrors',       description='Frames with unexpected size',        mode='RO', value=0, localGet=getCounter('sizeErrors'),       pollInterval=1))
+        self.add(pr.LocalVariable(name='LostEvents',       description='Events missing in the sequence',     mode='RO', value=0, localGet=getCounter('lostEvents'),       pollInterval=1))
+        self.add(pr.LocalVariable(name='IncompleteEvents', description='Events with missing packets',        mode='RO', value=0, localGet=getCounter('incompleteEvents'), pollInterval=1))
+        self.add(pr.LocalVariable(name='SeqResets',        description='Sequence counter resets',            mode='RO', value=0, localGet=getCounter('seqResets'),        pollInterval=1))
+        self.add(pr.LocalVariable(name='LastSeq',          description='Last sequence/acquisition number',   mode='RO', value=0, localGet=getCounter('lastSeq'),          pollInterval=1))
+        self.add(pr.LocalVariable(name='EventRate',        description='Event rate since the last update',   mode='RO', value=0.0, units='Hz', disp='{:1.1f}', localGet=self._getEventRate, pollInterval=1))
+        self.add(pr.LocalVariable(name='RateHistogram',    description='Event rate histogram (1 Hz - 100 kHz, log bins)', mode='RO', value=[0], localGet=getCounter('rateHist'), hidden=True))
+
+        self.add(pr.LocalCommand(name='ResetCounters', description='Reset all counters', function=self.fnResetCounters))
+
+    def _getStreamSlave(self):
+        return self._slave
+
+    def _getEventRate(self, dev, var):
+        now = time.time()
+        count = self._counter.eventCount
+        rate = (count - self._lastRateCount) / (now - self._lastRateTime) if now > self._lastRateTime else 0.0
+        self._lastRateTime = now
+        self._lastRateCount = count
+        return rate
+
+    def fnResetCounters(self, dev, cmd, arg):
+        self._counter.reset()
+        self._lastRateCount = 0
+        self._lastRateTime = time.time()
+
+    @property
+    def counter(self):
+        return self._counter
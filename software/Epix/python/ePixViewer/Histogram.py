@@ -0,0 +1,131 @@
+#!/usr/bin/env python
+#-----------------------------------------------------------------------------
+# Title      : ADU histogram accumulator (spectrum mode)
+#-----------------------------------------------------------------------------
+# File       : Histogram.py
+# Created    : 2026-10-19
+#-----------------------------------------------------------------------------
+# Description:
+# Accumulates the ADU spectrum of (dark subtracted) images in fixed size
+# histograms: one global histogram plus optional per ASIC and per pixel
+# histograms. Frames are filled in batches with np.bincount, so the same
+# accumulator is used live by the viewer and offline over large files.
+#
+#-----------------------------------------------------------------------------
+# This file is part of the ePix rogue. It is subject to
+# the license terms in the LICENSE.txt file found in the top-level directory
+# of this distribution and at:
+#    https://confluence.slac.stanford.edu/display/ppareg/LICENSE.html.
+# No part of the ePix rogue, including this file, may be
+# copied, modified, propagated, or distributed except according to the terms
+# contained in the LICENSE.txt file.
+#-----------------------------------------------------------------------------
+
+import numpy as np
+
+PRINT_VERBOSE = 0
+
+
+################################################################################
+################################################################################
+#   Histogram accumulator
+#   One bin per integer ADU in [minValue, maxValue). Values outside the range
+#   are clipped into the first/last bin and counted in underflow/overflow.
+################################################################################
+class HistogramAccumulator():
+    """global, per ASIC and per pixel ADU histograms"""
+
+    def __init__(self, minValue = -100, maxValue = 1000, asicGrid = None, perPixel = False, mask = None):
+        """asicGrid : (rows, columns) of ASICs for the per ASIC histograms, None disables them
+           perPixel : also keeps one histogram per pixel ((pixels, bins) uint32, mind the memory)
+           mask     : boolean (height, width) array of the pixels to use, None uses all"""
+        self.minValue = int(minValue)
+        self.maxValue = int(maxValue)
+        self.numBins = self.maxValue - self.minValue
+        self.asicGrid = asicGrid
+        self.perPixel = perPixel
+        self.mask = mask
+        self.shape = None
+        self.clear()
+
+    def clear(self):
+        self.hist = np.zeros(self.numBins, dtype=np.int64)
+        self.asicHist = None
+        self.pixelHist = None
+        self.numFrames = 0
+        self.underflow = 0
+        self.overflow = 0
+
+    def _setShape(self, shape):
+        # per pixel asic index, rebuilt when the image size changes
+        self.shape = shape
+        [height, width] = shape
+        if self.asicGrid is not None:
+            [asicRows, asicCols] = self.asicGrid
+            rows = np.arange(height) * asicRows // height
+            cols = np.arange(width) * asicCols // width
+            self._asicIndex = (rows[:,None] * asicCols + cols[None,:]).ravel()
+            self.asicHist = np.zeros((asicRows * asicCols, self.numBins), dtype=np.int64)
+        if self.perPixel:
+            self.pixelHist = np.zeros((height * width, self.numBins), dtype=np.uint32)
+        self._pixelIndex = np.arange(height * width)
+        if self.mask is not None:
+            keep = np.asarray(self.mask, dtype=bool).ravel()
+            self._pixelIndex = self._pixelIndex[keep]
+            if self.asicGrid is not None:
+                self._asicIndex = self._asicIndex[keep]
+
+    def fill(self, frames):
+        """adds one (height, width) image or a (frames, height, width) batch"""
+        frames = np.asarray(frames)
+        if frames.ndim == 2:
+            frames = frames[None]
+        if frames.shape[1:] != self.shape:
+            if self.numFrames > 0:
+                print('HistogramAccumulator: image size changed, histograms cleared')
+                self.clear()
+            self._setShape(frames.shape[1:])
+
+        pixels = frames.reshape(frames.shape[0], -1)
+        if self.mask is not None:
+            pixels = pixels[:, self._pixelIndex]
+        adu = np.rint(pixels).astype(np.int64) if pixels.dtype.kind == 'f' else pixels.astype(np.int64)
+        self.underflow += int(np.count_nonzero(adu < self.minValue))
+        self.overflow += int(np.count_nonzero(adu >= self.maxValue))
+        np.clip(adu, self.minValue, self.maxValue - 1, out=adu)
+        adu -= self.minValue
+
+        self.hist += np.bincount(adu.ravel(), minlength=self.numBins)
+        if self.asicHist is not None:
+            index = self._asicIndex * self.numBins + adu
+            self.asicHist += np.bincount(index.ravel(), minlength=self.asicHist.size).reshape(self.asicHist.shape)
+        if self.pixelHist is not None:
+            # one bincount over pixels x bins, much faster than an unbuffered np.add.at per sample
+            index = self._pixelIndex * self.numBins + adu
+            counts = np.bincount(index.ravel(), minlength=self.pixelHist.size)
+            self.pixelHist += counts.reshape(self.pixelHist.shape).astype(np.uint32)
+        self.numFrames += frames.shape[0]
+
+    def merge(self, other):
+        """adds the counts of another accumulator with the same settings (e.g. filled by another process)"""
+        self.hist += other.hist
+        if other.asicHist is not None:
+            self.asicHist = other.asicHist.copy() if self.asicHist is None else self.asicHist + other.asicHist
+        if other.pixelHist is not None:
+            self.pixelHist = other.pixelHist.copy() if self.pixelHist is None else self.pixelHist + other.pixelHist
+        self.numFrames += other.numFrames
+        self.underflow += other.underflow
+        self.overflow += other.overflow
+
+    def binValues(self):
+        """ADU value of each bin"""
+        return np.arange(self.minValue, self.maxValue)
+
+    def save(self, filename):
+        data = {'bins' : self.binValues(), 'hist' : self.hist, 'numFrames' : self.numFrames,
+                'underflow' : self.underflow, 'overflow' : self.overflow}
+        if self.asicHist is not None:
+            data['asicHist'] = self.asicHist
+        if self.pixelHist is not None:
+            data['pixelHist'] = self.pixelHist.reshape(self.shape + (self.numBins,))
+        np.savez(filename, **data)
@@ -0,0 +1,145 @@
+#!/usr/bin/env python
+#-----------------------------------------------------------------------------
+# Title      : latency and throughput counters of the viewer data path
+#-----------------------------------------------------------------------------
+# File       : PipelineStats.py
+# Created    : 2026-10-19
+#-----------------------------------------------------------------------------
+# Description:
+# Keeps the last N latencies of every stage a frame goes through in the
+# viewer (stream accept, event building, signal queue, frame building,
+# descrambling, dark subtraction, rendering) and the accepted, processed,
+# skipped and dropped frame counts per virtual channel, so the stage that
+# limits the display rate on a given machine can be found. The summary is
+# shown in the viewer diagnostics tab and can be saved as CSV.
+#
+#-----------------------------------------------------------------------------
+# This file is part of the ePix rogue. It is subject to
+# the license terms in the LICENSE.txt file found in the top-level directory
+# of this distribution and at:
+#    https://confluence.slac.stanford.edu/display/ppareg/LICENSE.html.
+# No part of the ePix rogue, including this file, may be
+# copied, modified, propagated, or distributed except according to the terms
+# contained in the LICENSE.txt file.
+#-----------------------------------------------------------------------------
+
+import csv
+import time
+import threading
+import contextlib
+import numpy as np
+import ePixViewer.TraceBuffer as traceBuf
+
+# stages in data path order, the report lists them in this order
+PIPELINE_STAGES = [
+    'accept',           # EventReader._acceptFrame, payload copy
+    'eventBuild',       # multi-packet event builder (in _acceptFrame)
+    'queue',            # accept to _processFrame, Qt signal latency
+    'process',          # EventReader._processFrame
+    'buildImageFrame',  # Camera.buildImageFrame
+    'descramble',       # Camera.descrambleImage(Roi)
+    'darkSubtraction',  # dark and common mode correction
+    'render',           # MplCanvas drawing
+    'displayDelay',     # readFileDelay sleep after the image is drawn
+    'postProcessing',   # line plots, pixel time series, histogram
+    'endToEnd',         # accept to image drawn
+]
+
+# names of the virtual channels (lower 4 bits of the first payload byte)
+PIPELINE_VC_NAMES = {0 : 'image', 2 : 'scope', 3 : 'monitoring'}
+
+PIPELINE_COUNTERS = ['accepted', 'processed', 'skipped', 'dropped']
+
+PIPELINE_PERCENTILES = [50, 90, 99]
+
+
+################################################################################
+################################################################################
+#   Pipeline statistics
+#   Latencies are kept in one TraceBuffer per stage (the last capacity
+#   samples), the counters since the last reset. Stages are recorded from the
+#   rogue stream thread and the Qt thread, updates take a lock.
+################################################################################
+class PipelineStats():
+    """rolling stage latencies and per virtual channel frame counters"""
+
+    def __init__(self, capacity = 1000):
+        self.capacity = capacity
+        self._lock = threading.Lock()
+        self.reset()
+
+    def reset(self):
+        with self._lock:
+            self.latencies = {}
+            self.counters = {}
+            self.startTime = time.time()
+
+    def addLatency(self, stage, seconds):
+        with self._lock:
+            buf = self.latencies.get(stage)
+            if (buf is None):
+                buf = self.latencies[stage] = traceBuf.TraceBuffer(1, self.capacity)
+            buf.append(seconds)
+
+    @contextlib.contextmanager
+    def timed(self, stage):
+        """with stats.timed('descramble'): ... records the time spent in the block"""
+        start = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.addLatency(stage, time.perf_counter() - start)
+
+    def count(self, vcNum, counter, n = 1):
+        """adds n to one of PIPELINE_COUNTERS of a virtual channel"""
+        with self._lock:
+            counts = self.counters.get(vcNum)
+            if (counts is None):
+                counts = self.counters[vcNum] = dict.fromkeys(PIPELINE_COUNTERS, 0)
+            counts[counter] += n
+
+    @staticmethod
+    def vcName(vcNum):
+        return PIPELINE_VC_NAMES.get(vcNum, 'vc%d' % vcNum)
+
+    def stageSummary(self):
+        """list of [stage, count, mean, p50, p90, p99, max] in seconds, for the stages with samples"""
+        with self._lock:
+            samples = {stage : (buf.totalCount, buf.view()[0].copy()) for stage, buf in self.latencies.items()}
+        stages = [s for s in PIPELINE_STAGES if s in samples] + sorted(s for s in samples if s not in PIPELINE_STAGES)
+        rows = []
+        for stage in stages:
+            [total, data] = samples[stage]
+            rows.append([stage, total, data.mean()] + list(np.percentile(data, PIPELINE_PERCENTILES)) + [data.max()])
+        return rows
+
+    def counterSummary(self):
+        """list of [vc name, accepted, processed, skipped, dropped, accepted/s, processed/s]"""
+        elapsed = max(time.time() - self.startTime, 1e-9)
+        with self._lock:
+            counters = {vcNum : dict(counts) for vcNum, counts in self.counters.items()}
+        return [[self.vcName(vcNum)] + [counts[c] for c in PIPELINE_COUNTERS] + [counts['accepted'] / elapsed, counts['processed'] / elapsed]
+                for vcNum, counts in sorted(counters.items())]
+
+    def report(self):
+        """text table of the stage latencies (ms) and the frame counters"""
+        lines = ['%-16s %8s %9s %9s %9s %9s %9s' % ('Stage (ms)', 'count', 'mean', 'p50', 'p90', 'p99', 'max')]
+        for [stage, total, *values] in self.stageSummary():
+            lines.append('%-16s %8d ' % (stage, total) + ' '.join('%9.2f' % (v * 1e3) for v in values))
+        lines.append('')
+        lines.append('%-16s %9s %9s %9s %9s %9s %9s' % ('Channel', 'accepted', 'processed', 'skipped', 'dropped', 'acc/s', 'proc/s'))
+        for [name, accepted, processed, skipped, dropped, acceptedRate, processedRate] in self.counterSummary():
+            lines.append('%-16s %9d %9d %9d %9d %9.1f %9.1f' % (name, accepted, processed, skipped, dropped, acceptedRate, processedRate))
+        return '\n'.join(lines)
+
+    def saveCsv(self, filename):
+        """writes the stage table (ms) and the counter table to one CSV file"""
+        with open(filename, 'w', newline='') as f:
+            writer = csv.writer(f)
+            writer.writerow(['stage', 'count', 'mean_ms', 'p50_ms', 'p90_ms', 'p99_ms', 'max_ms'])
+            for [stage, total, *values] in self.stageSummary():
+                writer.writerow([stage, total] + ['%.4f' % (v * 1e3) for v in values])
+            writer.writerow([])
+            writer.writerow(['channel'] + PIPELINE_COUNTERS + ['accepted_per_s', 'processed_per_s'])
+            for row in self.counterSummary():
+                writer.writerow(row[:5] + ['%.3f' % v for v in row[5:]])
@@ -0,0 +1,91 @@
+#!/usr/bin/env python
+#-----------------------------------------------------------------------------
+# Title      : pseudo scope trace decoder for the ePix viewer
+#-----------------------------------------------------------------------------
+# File       : PseudoScope.py
+# Created    : 2026-10-19
+#-----------------------------------------------------------------------------
+# Description:
+# Decodes the channel A/B traces of the PseudoScopeCore frames into float32
+# buffers reused from frame to frame. The last N traces can be averaged or
+# kept as a min/max persistence band.
+#
+#-----------------------------------------------------------------------------
+# This file is part of the ePix rogue. It is subject to
+# the license terms in the LICENSE.txt file found in the top-level directory
+# of this distribution and at:
+#    https://confluence.slac.stanford.edu/display/ppareg/LICENSE.html.
+# No part of the ePix rogue, including this file, may be
+# copied, modified, propagated, or distributed except according to the terms
+# contained in the LICENSE.txt file.
+#-----------------------------------------------------------------------------
+
+import numpy as np
+
+# header is 8 32 bit words, footer is 5 32 bit words
+SCOPE_HEADER_WORDS16 = 16
+SCOPE_FOOTER_WORDS16 = 10
+SCOPE_ADC_SCALE = np.float32(2.0/2**14)
+
+
+################################################################################
+################################################################################
+#   Pseudo scope traces
+################################################################################
+class PseudoScopeTraces():
+    """decodes scope frames, keeps the last numTraces traces for averaging/persistence"""
+
+    def __init__(self, numTraces = 1, persistence = False):
+        self.traceLength = 0
+        self.numTraces = numTraces
+        self.persistence = persistence
+        self._alloc(0)
+
+    def _alloc(self, traceLength):
+        self.traceLength = traceLength
+        # (trace, channel, sample) history, the running sum makes the average O(1) per frame
+        self._history = np.zeros((self.numTraces, 2, traceLength), dtype=np.float32)
+        self._sum = np.zeros((2, traceLength), dtype=np.float32)
+        self._pos = 0
+        self.count = 0
+        self.chA = self._history[0, 0]
+        self.chB = self._history[0, 1]
+
+    def setAveraging(self, numTraces, persistence = False):
+        """numTraces traces are averaged (or kept as min/max band with persistence)"""
+        self.numTraces = max(1, numTraces)
+        self.persistence = persistence
+        self._alloc(self.traceLength)
+
+    def decode(self, rawData):
+        """converts one scope frame to volts (-1..1), returns [chA, chB] views
+           valid until the same history entry is reused"""
+        data = np.frombuffer(rawData, dtype='uint16')[SCOPE_HEADER_WORDS16:-SCOPE_FOOTER_WORDS16]
+        traceLength = len(data) // 2
+        if (traceLength != self.traceLength):
+            self._alloc(traceLength)
+
+        trace = self._history[self._pos]
+        if (self.count == self.numTraces):
+            self._sum -= trace
+        np.multiply(data[:2*traceLength].reshape(2, traceLength), SCOPE_ADC_SCALE, out=trace, casting='unsafe')
+        trace -= 1.0
+        self._sum += trace
+        self._pos = (self._pos + 1) % self.numTraces
+        self.count = min(self.count + 1, self.numTraces)
+        if (self._pos == 0):
+            # rebuilds the running sum once per history turn so float32 rounding does not accumulate
+            np.sum(self._history, axis=0, out=self._sum)
+
+        self.chA = trace[0]
+        self.chB = trace[1]
+        return [self.chA, self.chB]
+
+    def average(self):
+        """(2, traceLength) mean of the last numTraces traces"""
+        return self._sum / max(1, self.count)
+
+    def envelope(self):
+        """[min, max] (2, traceLength) arrays over the last numTraces traces"""
+        history = self._history[:self.count]
+        return [history.min(axis=0), history.max(axis=0)]
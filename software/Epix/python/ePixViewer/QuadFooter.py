@@ -0,0 +1,131 @@
+#!/usr/bin/env python
+#-----------------------------------------------------------------------------
+# Title      : ePix Quad environmental footer decoder
+#-----------------------------------------------------------------------------
+# File       : QuadFooter.py
+# Created    : 2026-10-19
+#-----------------------------------------------------------------------------
+# Description:
+# Decodes the 38 word monitoring footer appended to every ePix Quad image.
+# The footer is viewed as a numpy structured array and converted to
+# engineering values with the EpixQuadMonitor conversions, for one frame or a
+# whole batch of frames at once (e.g. all the frames of a .dat file).
+#
+#-----------------------------------------------------------------------------
+# This file is part of the ePix rogue. It is subject to
+# the license terms in the LICENSE.txt file found in the top-level directory
+# of this distribution and at:
+#    https://confluence.slac.stanford.edu/display/ppareg/LICENSE.html.
+# No part of the ePix rogue, including this file, may be
+# copied, modified, propagated, or distributed except according to the terms
+# contained in the LICENSE.txt file.
+#-----------------------------------------------------------------------------
+
+import numpy as np
+import ePixViewer.FrameFile as frameFile
+import ePixViewer.QuadFormat as conv
+
+# header (32 bytes) followed by 712 rows of 768 16 bit pixels
+QUAD_FOOTER_OFFSET = conv.QUAD_FOOTER_OFFSET
+QUAD_FOOTER_WORDS  = conv.QUAD_FOOTER_WORDS
+
+QUAD_LDO_NAMES = [
+    'A0+2_5V_H_Temp', 'A0+2_5V_L_Temp',
+    'A1+2_5V_H_Temp', 'A1+2_5V_L_Temp',
+    'A2+2_5V_H_Temp', 'A2+2_5V_L_Temp',
+    'A3+2_5V_H_Temp', 'A3+2_5V_L_Temp',
+    'D0+2_5V_Temp'  , 'D1+2_5V_Temp',
+    'A0+1_8V_Temp'  , 'A1+1_8V_Temp',
+    'A2+1_8V_Temp'
+]
+
+# raw footer, same names as the EpixQuadMonitor registers
+QUAD_FOOTER_RAW_DTYPE = np.dtype([
+    ('ShtHumRaw',      '<u2'),
+    ('ShtTempRaw',     '<u2'),
+    ('NctLocTempRaw',  'u1'),
+    ('NctPad',         'u1'),
+    ('NctRemTempLRaw', 'u1'),
+    ('NctRemTempHRaw', 'u1'),
+    ('AD7949DataRaw',  '<u2', (8,)),
+    ('SensorRegRaw',   '<u2', (26,)),
+])
+
+# engineering values, same names as the EpixQuadMonitor link variables
+QUAD_FOOTER_DTYPE = np.dtype(
+    [(name, 'f8') for name in ['ShtHum', 'ShtTemp', 'NctLocTemp', 'NctRemTemp']] +
+    [('ASIC_A%d_2V5_Current' % i, 'f8') for i in range(4)] +
+    [('ASIC_D%d_2V5_Current' % i, 'f8') for i in range(2)] +
+    [('Therm%d_Temp' % i, 'f8') for i in range(2)] +
+    [(name, 'f8') for name in ['PwrDigCurr', 'PwrDigVin', 'PwrDigTemp', 'PwrAnaCurr', 'PwrAnaVin', 'PwrAnaTemp']] +
+    [(name, 'f8') for name in QUAD_LDO_NAMES] +
+    [('PcbAnaTemp%d' % i, 'f8') for i in range(3)] +
+    [(name, 'f8') for name in ['TrOptTemp', 'TrOptVcc', 'TrOptTxPwr', 'TrOptRxPwr']]
+)
+
+
+################################################################################
+#   Decoder
+################################################################################
+def footerView(frames, offset = QUAD_FOOTER_OFFSET):
+    """returns the raw footers of one frame (bytes like) or of a (frames, bytes)
+       uint8 array as a structured array, without copying the data"""
+    frames = np.asarray(frames if isinstance(frames, np.ndarray) else np.frombuffer(frames, dtype=np.uint8))
+    if frames.ndim == 1:
+        frames = frames.reshape(1, -1)
+    return np.ndarray(shape=(frames.shape[0],), dtype=QUAD_FOOTER_RAW_DTYPE, buffer=frames,
+                      offset=offset, strides=(frames.strides[0],))
+
+def decodeFooters(raw):
+    """converts raw footers (QUAD_FOOTER_RAW_DTYPE) to engineering values (QUAD_FOOTER_DTYPE)"""
+    out = np.zeros(len(raw), dtype=QUAD_FOOTER_DTYPE)
+    adc = raw['AD7949DataRaw'].astype(np.float64)
+    reg = raw['SensorRegRaw'].astype(np.float64)
+
+    out['ShtHum']     = conv.shtHum(raw['ShtHumRaw'])
+    out['ShtTemp']    = conv.shtTemp(raw['ShtTempRaw'])
+    out['NctLocTemp'] = conv.nctTempLoc(raw['NctLocTempRaw'])
+    out['NctRemTemp'] = conv.nctTemp(raw['NctRemTempHRaw'], raw['NctRemTempLRaw'])
+    for i in range(4):
+        out['ASIC_A%d_2V5_Current' % i] = conv.lt3086DoubleCurr(adc[:,i])
+    for i in range(2):
+        out['ASIC_D%d_2V5_Current' % i] = conv.lt3086SingleCurr(adc[:,4+i])
+        out['Therm%d_Temp' % i]         = conv.thermistorTemp(adc[:,6+i])
+    out['PwrDigCurr'] = conv.pwrCurr(reg[:,0])
+    out['PwrDigVin']  = conv.pwrVin(reg[:,1])
+    out['PwrDigTemp'] = conv.pwrTemp(reg[:,2])
+    out['PwrAnaCurr'] = conv.pwrCurr(reg[:,3])
+    out['PwrAnaVin']  = conv.pwrVin(reg[:,4])
+    out['PwrAnaTemp'] = conv.pwrTemp(reg[:,5])
+    for i in range(13):
+        out[QUAD_LDO_NAMES[i]] = conv.ldoTemp(reg[:,6+i])
+    for i in range(3):
+        out['PcbAnaTemp%d' % i] = conv.anaTemp(reg[:,19+i])
+    out['TrOptTemp']  = conv.trOptTemp(reg[:,22])
+    out['TrOptVcc']   = conv.trOptVolt(reg[:,23])
+    out['TrOptTxPwr'] = conv.trOptPwr(reg[:,24])
+    out['TrOptRxPwr'] = conv.trOptPwr(reg[:,25])
+    return out
+
+def decodeFrames(frames, offset = QUAD_FOOTER_OFFSET):
+    """engineering values of the footers of one frame or of a (frames, bytes) uint8 array"""
+    return decodeFooters(footerView(frames, offset))
+
+def readFooters(filename, channel = None, offset = QUAD_FOOTER_OFFSET):
+    """decodes the footers of all the records of a rogue .dat file (optionally of one channel).
+       Returns (record numbers, engineering values)"""
+    fileIndex = frameFile.FrameFileIndex(filename)
+    try:
+        footers = fileIndex.recordBytes(offset, QUAD_FOOTER_WORDS * 2)
+        valid = fileIndex.sizes >= offset + QUAD_FOOTER_WORDS * 2
+        if channel is not None:
+            valid &= (fileIndex.channels == channel)
+        records = np.flatnonzero(valid)
+        return [records, decodeFrames(footers[records], offset = 0)]
+    finally:
+        fileIndex.close()
+
+def toDataFrame(values, index = None):
+    """pandas DataFrame of decoded footers (pandas is only needed by this function)"""
+    import pandas as pd
+    return pd.DataFrame.from_records(values, index = index)
@@ -0,0 +1,131 @@
+#!/usr/bin/env python
+#-----------------------------------------------------------------------------
+# Title      : ePix Quad data format
+#-----------------------------------------------------------------------------
+# File       : QuadFormat.py
+# Created    : 2026-10-19
+#-----------------------------------------------------------------------------
+# Description:
+# Frame layout and row order of the ePix Quad images, shared by the simulator,
+# the viewer descrambler and the frame generator.
+# Raw to engineering value conversions of the ePix Quad monitoring sensors.
+# Every function takes a scalar (returns a float) or a numpy array (converts
+# element wise), so the EpixQuadMonitor link variables, the image footer
+# decoder and the offline tools share the same formulas.
+# This is a numpy only module, it lives with the viewer so that importing it
+# does not build the rogue device classes of ePixQuad/__init__.
+#-----------------------------------------------------------------------------
+# This file is part of the rogue software platform. It is subject to
+# the license terms in the LICENSE.txt file found in the top-level directory
+# of this distribution and at:
+#    https://confluence.slac.stanford.edu/display/ppareg/LICENSE.html.
+# No part of the rogue software platform, including this file, may be
+# copied, modified, propagated, or distributed except according to the terms
+# contained in the LICENSE.txt file.
+#-----------------------------------------------------------------------------
+import numpy as np
+
+# frame layout: 32 byte header, 712 rows of 768 16 bit pixels, 38 word footer,
+# padded to the firmware frame size
+QUAD_ROWS          = 712
+QUAD_COLS          = 768
+QUAD_HEADER_BYTES  = 32
+QUAD_FOOTER_WORDS  = 38
+QUAD_FOOTER_BYTES  = QUAD_FOOTER_WORDS * 2
+QUAD_FOOTER_OFFSET = QUAD_HEADER_BYTES + QUAD_ROWS * QUAD_COLS * 2
+QUAD_FRAME_BYTES   = 1095232
+QUAD_ADC_MAX       = 0x3FFF
+
+def quadRowMap(rows = QUAD_ROWS):
+   """raw row of every image row, same order as the Cameras descrambler"""
+   r = np.arange(rows)
+   return np.concatenate((rows - r[r%4 == 1], r[r%4 == 2], rows - r[r%4 == 3], r[r%4 == 0]))
+
+def scramble(image):
+   """converts a (rows, cols) image to the row order sent by the camera"""
+   raw = np.empty_like(image)
+   raw[quadRowMap(image.shape[0])] = image
+   return raw
+
+def descramble(raw):
+   """inverse of scramble"""
+   return raw[quadRowMap(raw.shape[0])]
+
+# LTC2945 power monitors
+def pwrCurr(x):
+   return x * 0.1024 / 4095 / 0.02
+
+def pwrVin(x):
+   return x * 102.4 / 4095
+
+def pwrTemp(x):
+   a = 130.0/(0.882-1.951)
+   b = (0.882/0.0082)+100
+   return x * 2.048 / 4095 * a + b
+
+# SHT31 humidity and temperature sensor
+def shtHum(x):
+   return x / 65535.0 * 100.0
+
+def shtTemp(x):
+   return x / 65535.0 * 175.0 - 45.0
+
+# NCT218 temperature sensor, remote temperature from the H and L bytes
+def nctTemp(h, l):
+   return h * 1.0 + (l >> 6) * 0.25
+
+def nctTempLoc(x):
+   return x * 1.0
+
+def lt3086DoubleCurr(x):
+   # Imon = Iin / 1000
+   # Rload = 330 ohm
+   # ADC buffer gain x 2
+   # Two parallel LDOs current x 2
+   # returns current in A
+   return x / 16383.0 * 2.5 / 330.0 * 1000
+
+def lt3086SingleCurr(x):
+   # Imon = Iin / 1000
+   # Rload = 330 ohm
+   # ADC buffer gain x 2
+   # One LDO current x 1
+   # returns current in mA
+   return x / 16383.0 * 2.5 / 330.0 * 1000000 / 2.0
+
+def thermistorTemp(x):
+   # resistor divider 100k and MC65F103B (Rt25=10k)
+   # Vref 2.5V
+   # 0 is returned for a zero reading and -273.15 when the divider is out of range
+   xa = np.asarray(x, dtype=np.float64)
+   Umeas = xa / 16383.0 * 2.5
+   with np.errstate(divide='ignore', invalid='ignore'):
+      Itherm = Umeas / 100000
+      Rtherm = (2.5 - Umeas) / Itherm
+      LnRtR25 = np.log(Rtherm/10000.0)
+      TthermK = 1.0 / (3.3538646E-03 + 2.5654090E-04 * LnRtR25 + 1.9243889E-06 * (LnRtR25**2) + 1.0969244E-07 * (LnRtR25**3))
+   TthermK = np.where(Rtherm > 0.0, TthermK, 0.0) - 273.15
+   TthermK = np.where(xa != 0, TthermK, 0.0)
+   return float(TthermK) if np.ndim(x) == 0 else TthermK
+
+def anaTemp(x):
+   a = 130.0/(0.882-1.951)
+   b = (0.882/0.0082)+100
+   return x * 1.65 / 65535 * a + b
+
+def ldoTemp(x):
+   return x * 1.65 / 65535 *100
+
+# optical transceiver
+def trOptTemp(x):
+   return x * 1.0 / 256
+
+def trOptVolt(x):
+   return x * 0.0001
+
+def trOptPwr(x):
+   return x * 0.1
+
+# environmental monitoring stream (temperatures and humidity sent in 1/100 units)
+def envCenti(x):
+   return x / 100.0
@@ -0,0 +1,203 @@
+#!/usr/bin/env python
+#-----------------------------------------------------------------------------
+# Title      : fixed capacity trace buffer for the ePix viewer plots
+#-----------------------------------------------------------------------------
+# File       : TraceBuffer.py
+# Created    : 2026-10-19
+#-----------------------------------------------------------------------------
+# Description:
+# Circular buffer holding the last N samples of several traces. Appending is
+# O(1) and the ordered history is returned as a view (no copy), so long
+# running plots keep a constant memory and CPU cost.
+#
+#-----------------------------------------------------------------------------
+# This file is part of the ePix rogue. It is subject to
+# the license terms in the LICENSE.txt file found in the top-level directory
+# of this distribution and at:
+#    https://confluence.slac.stanford.edu/display/ppareg/LICENSE.html.
+# No part of the ePix rogue, including this file, may be
+# copied, modified, propagated, or distributed except according to the terms
+# contained in the LICENSE.txt file.
+#-----------------------------------------------------------------------------
+
+import warnings
+import numpy as np
+
+
+################################################################################
+################################################################################
+#   Trace buffer
+#   Every sample is written twice (at pos and pos + capacity) so the last
+#   capacity samples are always a contiguous slice of the storage.
+################################################################################
+class TraceBuffer():
+    """circular buffer of numTraces traces with capacity samples each"""
+
+    def __init__(self, numTraces, capacity, dtype = 'float64'):
+        self.numTraces = numTraces
+        self.capacity = capacity
+        self._data = np.zeros((numTraces, 2 * capacity), dtype = dtype)
+        self.clear()
+
+    def clear(self):
+        self._pos = 0
+        self.count = 0
+        self.totalCount = 0
+
+    def __len__(self):
+        return self.count
+
+    def append(self, sample):
+        """adds one sample (numTraces values) to every trace"""
+        self._data[:, self._pos] = sample
+        self._data[:, self._pos + self.capacity] = sample
+        self._pos = (self._pos + 1) % self.capacity
+        self.count = min(self.count + 1, self.capacity)
+        self.totalCount += 1
+
+    def view(self):
+        """(numTraces, count) view of the samples, oldest first"""
+        start = self._pos + self.capacity - self.count
+        return self._data[:, start:start + self.count]
+
+    def last(self):
+        """most recent sample of every trace"""
+        return self._data[:, self._pos + self.capacity - 1]
+
+    def resetTrace(self, index):
+        """restarts the history of one (float) trace, its missing samples read as nan"""
+        self._data[index] = np.nan
+
+    def resize(self, numTraces):
+        """keeps the history of the first numTraces traces, added (float) traces start as nan"""
+        if numTraces == self.numTraces:
+            return
+        data = np.full((numTraces, 2 * self.capacity), np.nan, dtype = self._data.dtype)
+        keep = min(numTraces, self.numTraces)
+        data[:keep] = self._data[:keep]
+        self._data = data
+        self.numTraces = numTraces
+
+    def decimated(self, maxPoints):
+        """returns [x, traces] with at most maxPoints samples per trace. x is the
+           sample index, the traces are a strided view of the history"""
+        data = self.view()
+        step = max(1, -(-self.count // maxPoints))
+        x = np.arange(self.totalCount - self.count, self.totalCount, step)
+        return [x, data[:, ::step]]
+
+
+def minMaxDecimate(data, numBins):
+    """min/max envelope of the last axis of data in numBins bins, so peaks stay
+       visible when a long trace is drawn on fewer pixels. Returns [x, y] with
+       up to 2*numBins points (min and max of each bin), or the data if it is shorter.
+       Every sample is in a bin, the last bin can be shorter than the others"""
+    length = data.shape[-1]
+    if (numBins <= 0) or (length <= 2 * numBins):
+        return [np.arange(length), data]
+    binSize = -(-length // numBins)
+    numBins = -(-length // binSize)
+    # the last bin is padded with its last sample, which leaves its min and max unchanged
+    pad = numBins * binSize - length
+    if pad > 0:
+        data = np.concatenate((data, np.repeat(data[..., -1:], pad, axis = -1)), axis = -1)
+    bins = data.reshape(data.shape[:-1] + (numBins, binSize))
+    y = np.empty(data.shape[:-1] + (numBins, 2), dtype = data.dtype)
+    np.min(bins, axis = -1, out = y[..., 0])
+    np.max(bins, axis = -1, out = y[..., 1])
+    start = np.arange(numBins) * binSize
+    x = np.repeat((start + np.minimum(start + binSize, length) - 1) // 2, 2)
+    return [x, y.reshape(data.shape[:-1] + (2 * numBins,))]
+
+
+################################################################################
+################################################################################
+#   Pixel tracker
+#   Time series of several pixels and ROI means of the descrambled images.
+#   All the targets share one trace buffer, pixels are sampled with one
+#   vectorized gather and ROIs with a sum of their slice. A target that is
+#   added or moved starts a new history, its older samples are nan.
+################################################################################
+class PixelTracker():
+    """tracks pixels and rectangular ROIs over the last capacity images"""
+
+    def __init__(self, capacity = 1000):
+        self.capacity = capacity
+        self.targets = []
+        self.names = []
+        self.buffer = TraceBuffer(0, self.capacity)
+        self._rebuild()
+
+    def _rebuild(self):
+        roi = np.array(self.targets, dtype=np.int64).reshape(-1, 4)
+        [self._y0, self._y1, self._x0, self._x1] = roi.T
+        self._pixelsOnly = bool(np.all((self._y1 - self._y0 == 1) & (self._x1 - self._x0 == 1)))
+        self.buffer.resize(len(self.targets))
+
+    def __len__(self):
+        return len(self.targets)
+
+    def addPixel(self, y, x):
+        """tracks one pixel, returns its index"""
+        return self.addRoi(y, y + 1, x, x + 1, name = 'Pixel[%d,%d]' % (x, y))
+
+    def addRoi(self, y0, y1, x0, x1, name = None):
+        """tracks the mean of image[y0:y1, x0:x1], returns its index"""
+        self.targets.append((y0, y1, x0, x1))
+        self.names.append(name if name is not None else 'ROI[%d:%d,%d:%d]' % (x0, x1, y0, y1))
+        self._rebuild()
+        return len(self.targets) - 1
+
+    def moveTarget(self, index, y, x):
+        """moves target index (keeping its size) to start at pixel y, x. Only its own history restarts"""
+        (y0, y1, x0, x1) = self.targets[index]
+        self.targets[index] = (y, y + y1 - y0, x, x + x1 - x0)
+        if (y1 - y0 == 1) and (x1 - x0 == 1):
+            self.names[index] = 'Pixel[%d,%d]' % (x, y)
+        else:
+            self.names[index] = 'ROI[%d:%d,%d:%d]' % (x, x + x1 - x0, y, y + y1 - y0)
+        self._rebuild()
+        self.buffer.resetTrace(index)
+
+    def removeTargets(self, first = 0):
+        """stops tracking the targets from index first on"""
+        del self.targets[first:]
+        del self.names[first:]
+        self._rebuild()
+
+    def clear(self):
+        self.buffer.clear()
+
+    def update(self, image):
+        """samples all the targets of one image"""
+        if len(self.targets) == 0:
+            return
+        [height, width] = image.shape
+        if self._pixelsOnly:
+            sample = image[np.clip(self._y0, 0, height - 1), np.clip(self._x0, 0, width - 1)]
+        else:
+            # ROIs are clipped to the image
+            y0 = np.clip(self._y0, 0, height)
+            y1 = np.clip(self._y1, 0, height)
+            x0 = np.clip(self._x0, 0, width)
+            x1 = np.clip(self._x1, 0, width)
+            # a few small ROIs, summing their slices is cheaper than an integral image
+            sums = [image[y0[i]:y1[i], x0[i]:x1[i]].sum(dtype=np.float64) for i in range(len(y0))]
+            sample = np.array(sums) / np.maximum((y1 - y0) * (x1 - x0), 1)
+        self.buffer.append(sample)
+
+    def series(self):
+        """(targets, samples) view of the history, oldest first"""
+        return self.buffer.view()
+
+    def mean(self):
+        """mean of each target over its history, nan if it has no samples yet"""
+        with warnings.catch_warnings():
+            warnings.simplefilter('ignore', RuntimeWarning)
+            return np.nanmean(self.buffer.view(), axis=1)
+
+    def rms(self):
+        """standard deviation of each target over its history (the noise of a dark pixel)"""
+        with warnings.catch_warnings():
+            warnings.simplefilter('ignore', RuntimeWarning)
+            return np.nanstd(self.buffer.view(), axis=1)
@@ -7,7 +7,26 @@
 # copied, modified, propagated, or distributed except according to the terms 
 # contained in the LICENSE.txt file.
 #-----------------------------------------------------------------------------
-from ePixViewer._ePixViewer import *
 from ePixViewer.imgProcessing import *
+from ePixViewer.QuadFooter import *
+from ePixViewer.Histogram import *
 
+# these modules define a class of the same name, a star import would replace
+# the module attribute used by 'import ePixViewer.EventBuilder as evtBld'.
+# FrameMonitor needs rogue and is not imported here, offline readers only use
+# the numpy FrameFile module.
+import ePixViewer.FrameFile
+import ePixViewer.EventBuilder
+import ePixViewer.PipelineStats
+import ePixViewer.FrameGenerator
 
+# the viewer window (Qt and matplotlib) is imported on first use, so batch
+# scripts using the cameras and file readers start without Qt or a display
+def __getattr__(name):
+    if name.startswith('_'):
+        raise AttributeError(name)
+    import ePixViewer._ePixViewer as _viewer
+    try:
+        return getattr(_viewer, name)
+    except AttributeError:
+        raise AttributeError("module 'ePixViewer' has no attribute '%s'" % name) from None
@@ -30,6 +30,11 @@ import pyrogue
 import time
 import ePixViewer.imgProcessing as imgPr
 import ePixViewer.Cameras as cameras
+import ePixViewer.QuadFormat as monConv
+import ePixViewer.TraceBuffer as traceBuf
+import ePixViewer.PseudoScope as pseudoScope
+import ePixViewer.Histogram as histogram
+import ePixViewer.PipelineStats as pipelineStats
 import numpy as np
 from matplotlib.figure import Figure
 
@@ -50,6 +55,14 @@ except ImportError:
 
 PRINT_VERBOSE = 0
 
+# maximum number of points drawn per line, longer traces are decimated
+MAX_TRACE_POINTS = 2000
+# number of images kept in the pixel time series, line colors of the tracked pixels
+PIXEL_TS_LENGTH = 1000
+PIXEL_TS_COLORS = ['k', 'g', 'm', 'c', 'y', 'r--', 'b--', 'k--']
+# line colors of the per ASIC histograms
+HISTOGRAM_COLORS = ['r', 'b', 'g', 'y', 'm', 'c', 'r--', 'b--', 'g--', 'y--', 'm--', 'c--', 'r:', 'b:', 'g:', 'y:']
+
 ################################################################################
 ################################################################################
 #   Window class
@@ -79,6 +92,9 @@ class Window(QMainWindow, QObject):
         # creates a camera object
         self.currentCam = cameras.Camera(cameraType = cameraType)
 
+        # latency and frame counters of the data path, shown in the diagnostics tab
+        self.pipelineStats = pipelineStats.PipelineStats()
+
         # add actions for menu item
         extractAction = QAction("&Quit", self)
         extractAction.setShortcut("Ctrl+Q")
@@ -148,14 +164,17 @@ class Window(QMainWindow, QObject):
         self.mouseX = 0
         self.mouseY = 0
         self.image = QImage()
-        self.pixelTimeSeries = np.array([])
+        self.pixelTracker = traceBuf.PixelTracker(capacity = PIXEL_TS_LENGTH)
+        self.pixelTracker.addPixel(self.mouseY, self.mouseX)
         self.chAdata = np.array([])
         self.chBdata = np.array([])
+        self.scopeTraces = pseudoScope.PseudoScopeTraces()
+        self.setDisplayRoi()
+        self.histogram = None
 
         #initialize data monitoring
-        self.monitoringDataTraces = np.zeros((8,1), dtype='int32')
-        self.monitoringDataIndex = 0
         self.monitoringDataLength = 100
+        self.monitoringDataTraces = traceBuf.TraceBuffer(8, self.monitoringDataLength)
 
         #init bit mask
         self.pixelBitMask.setText(str(hex(np.uint16(self.currentCam.bitMask))))
@@ -231,6 +250,13 @@ class Window(QMainWindow, QObject):
         self.readFileDelay = delay
 
 
+    # number of acquisitions of a multi-packet camera built concurrently, incomplete
+    # events older than maxEventAge seconds are dropped
+    def setReorderWindow(self, reorderWindow, maxEventAge = None):
+        if (self.currentCam.isMultiPacket()):
+            self.currentCam.setReorderWindow(reorderWindow, maxEventAge = maxEventAge)
+
+
     def file_open(self):
         self.eventReader.frameIndex = 1
         self.eventReader.VIEW_DATA_CHANNEL_ID = 1
@@ -339,11 +365,21 @@ class Window(QMainWindow, QObject):
     # If image frame is completed calls displayImageFromReader
     # If image is incomplete stores the partial image
     def buildImageFrame(self):
+        if (self.currentCam.isMultiPacket()):
+            # multi-packet events are assembled by the event reader, only complete ones get here
+            if (not self.displayBusy):
+                self.displayImageFromReader(imageData = self.eventReader.lastEvent)
+            else:
+                self.pipelineStats.count(0, 'dropped')
+            self.eventReader.busy = False
+            return
+
         newRawData = self.eventReader.frameData.copy()
         #print('newRawData', len(newRawData))
         #print('self.rawImageFrame',len(self.rawImgFrame))
         #print('self.currentCam',self.currentCam)
-        [frameComplete, readyForDisplay, self.rawImgFrame] = self.currentCam.buildImageFrame(currentRawData = self.rawImgFrame, newRawData = newRawData)
+        with self.pipelineStats.timed('buildImageFrame'):
+            [frameComplete, readyForDisplay, self.rawImgFrame] = self.currentCam.buildImageFrame(currentRawData = self.rawImgFrame, newRawData = newRawData)
         #print('@ bulidImageFrame: frameComplete: ', frameComplete, 'readyForDisplay: ', readyForDisplay, 'returned raw data len', len(self.rawImgFrame))
 
         if (readyForDisplay):
@@ -351,6 +387,7 @@ class Window(QMainWindow, QObject):
                 self.displayImageFromReader(imageData = self.rawImgFrame)
             else:
                 print("Display busy (%d)" %(self.displayBysyCounter))
+                self.pipelineStats.count(0, 'dropped')
                 self.displayBysyCounter = self.displayBysyCounter + 1
                 if (self.displayBysyCounter> 10):
                     self.displayBysyCounter = 0
@@ -381,15 +418,20 @@ class Window(QMainWindow, QObject):
         self.displayBusy = True
         self.imgTool.imgWidth = self.currentCam.sensorWidth
         self.imgTool.imgHeight = self.currentCam.sensorHeight
-        #get descrambled image com camera
-        self.imgDesc = self.currentCam.descrambleImage(imageData)
+        #get descrambled image com camera, the dark image is always taken from full images
+        with self.pipelineStats.timed('descramble'):
+            if (self.isDisplayRoiEnabled() and (not self.imgTool.imgDark_isRequested)):
+                self.imgDesc = self.currentCam.descrambleImageRoi(imageData, roi = self.displayRoi, decimation = self.displayDecimation, binning = self.displayBinning)
+            else:
+                self.imgDesc = self.currentCam.descrambleImage(imageData)
 
         arrayLen = len(self.imgDesc)
 
         self._updateImageScales()
 
         if (self.imgTool.imgDark_isSet):
-            self.ImgDarkSub = self.imgTool.getDarkSubtractedImg(self.imgDesc)
+            with self.pipelineStats.timed('darkSubtraction'):
+                self.ImgDarkSub = self.getDarkSubtractedImg(self.imgDesc)
             _8bitImg = self.ImgDarkSub#self.imgTool.reScaleImgTo8bit(self.ImgDarkSub, self.imageScaleMax, self.imageScaleMin)
         else:
             # get the data into the image object
@@ -398,19 +440,70 @@ class Window(QMainWindow, QObject):
         #self.image = QImage(_8bitImg.repeat(4), self.imgTool.imgWidth, self.imgTool.imgHeight, QImage.Format_RGB32)
 
         #pp = QPixmap.fromImage(self.image)
-        self.mainImageDisp.update_figure(_8bitImg, contrast=[self.imageScaleMax, self.imageScaleMin], autoScale = False)
+        with self.pipelineStats.timed('render'):
+            self.mainImageDisp.update_figure(_8bitImg, contrast=[self.imageScaleMax, self.imageScaleMin], autoScale = False)
+        self.pipelineStats.addLatency('endToEnd', time.perf_counter() - self.eventReader.processAcceptTime)
         #self.label.setPixmap(pp.scaled(self.label.size(),KeepAspectRatio,SmoothTransformation))
         #self.label.adjustSize()
         # updates the frame number
         # this sleep is a weak way of waiting for the file to be readout completely... needs improvement
-        time.sleep(self.readFileDelay)
+        with self.pipelineStats.timed('displayDelay'):
+            time.sleep(self.readFileDelay)
         thisString = 'Frame {} of {}'.format(self.eventReader.frameIndex, self.eventReader.numAcceptedFrames)
 
         self.displayBusy = False
 
-        self.postImageDisplayProcessing()
+        with self.pipelineStats.timed('postProcessing'):
+            self.postImageDisplayProcessing()
 
 
+    # dark subtraction of the displayed image (full image or region of interest),
+    # the common mode is only corrected on full images where the ADC banks are known
+    def getDarkSubtractedImg(self, image):
+        if (self.isDisplayRoiEnabled() and (image.shape != self.imgTool.imgDark.shape)):
+            return self.imgTool.getDarkSubtractedRoi(image, roi = self.displayRoi, decimation = self.displayDecimation, binning = self.displayBinning)
+        return self.imgTool.getCommonModeCorrectedImg(self.imgTool.getDarkSubtractedImg(image))
+
+    # common mode correction of the dark subtracted images, method 'median', 'mean' or None (off).
+    # mask selects the reference (e.g. unbonded) pixels, threshold excludes the pixels hit by photons
+    def setCommonMode(self, method, mask = None, threshold = None):
+        self.imgTool.setCommonMode(method, bankWidth = self.currentCam.bankWidth(), mask = mask, threshold = threshold)
+
+    def setCommonModeFromGui(self):
+        method = str(self.commonModeMethod.currentText())
+        try:
+            thresholdText = self.commonModeThresholdLine.text().strip()
+            threshold = float(thresholdText) if len(thresholdText) > 0 else None
+        except ValueError:
+            print("Error: common mode threshold must be a number. Got: ", self.commonModeThresholdLine.text())
+            return
+        self.setCommonMode(None if method == 'Off' else method, mask = self.imgTool.commonModeMask, threshold = threshold)
+        print("Common mode set to", method)
+
+    def isDisplayRoiEnabled(self):
+        return (self.displayRoi is not None) or (self.displayDecimation > 1)
+
+    # displays only roi = [x0, x1, y0, y1] (None for the full sensor), reduced by decimation
+    # (every n-th pixel, or the mean of n x n blocks with binning). Pixel coordinates of the
+    # line plots and time series are relative to the displayed image.
+    def setDisplayRoi(self, roi = None, decimation = 1, binning = False):
+        self.displayRoi = roi
+        self.displayDecimation = max(1, decimation)
+        self.displayBinning = binning
+
+    def setDisplayRoiFromGui(self):
+        try:
+            roiText = self.displayRoiLine.text().strip()
+            roi = [int(v) for v in roiText.split(',')] if len(roiText) > 0 else None
+            if (roi is not None and len(roi) != 4):
+                raise ValueError
+            decimation = int(self.displayDecimationLine.text())
+        except ValueError:
+            print("Error: ROI must be x0,x1,y0,y1 and decimation an integer. Got: ", self.displayRoiLine.text(), self.displayDecimationLine.text())
+            return
+        self.setDisplayRoi(roi, decimation = decimation, binning = self.cbDisplayBinning.isChecked())
+        print("Display ROI set.")
+
     """Checks the value on the user interface, if valid update them"""
     def _updateImageScales(self):
         #saves current values locally
@@ -427,109 +520,195 @@ class Window(QMainWindow, QObject):
     def displayPseudoScopeFromReader(self):
         # saves data locally
         rawData = self.eventReaderScope.frameDataScope
-        # converts bytes to array of dwords
-        data  = np.frombuffer(rawData,dtype='uint16')
-        # limits trace length for fast display (may be removed in the future)
-
-        #header are 8 32 bit words
-        #footer are 5 32 bit words
-        data  = data[16:-10]
-        oscWords = len(data)
-
-        self.chAdata = -1.0 + data[0:int(oscWords/2)] * (2.0/2**14)
-        self.chBdata = -1.0 + data[int(oscWords/2): oscWords] * (2.0/2**14)
+        self.updateScopeAveraging()
+        # decodes channel A and B into the reused float32 buffers
+        [self.chAdata, self.chBdata] = self.scopeTraces.decode(rawData)
 
         if (self.LinePlot2_RB1.isChecked()):
-            self.lineDisplay2.update_plot(self.cbScopeCh0.isChecked(), "Scope Trace A", 'r',  self.chAdata,
-                                            self.cbScopeCh1.isChecked(), "Scope Trace B", 'b',  self.chBdata)
+            # min/max envelope at the plot width, one point per pixel keeps full length traces fast
+            numBins = max(1, self.lineDisplay2.width())
+            if (self.scopeTraces.numTraces > 1 and not self.scopeTraces.persistence):
+                [x, traces] = traceBuf.minMaxDecimate(self.scopeTraces.average(), numBins)
+            else:
+                [x, traces] = traceBuf.minMaxDecimate(np.stack((self.chAdata, self.chBdata)), numBins)
+            lines = [self.cbScopeCh0.isChecked(), "Scope Trace A", 'r',  (x, traces[0]),
+                     self.cbScopeCh1.isChecked(), "Scope Trace B", 'b',  (x, traces[1])]
+            if (self.scopeTraces.numTraces > 1 and self.scopeTraces.persistence):
+                [tmin, tmax] = self.scopeTraces.envelope()
+                [x, tmin] = traceBuf.minMaxDecimate(tmin, numBins)
+                [x, tmax] = traceBuf.minMaxDecimate(tmax, numBins)
+                lines += [self.cbScopeCh0.isChecked(), "Scope Trace A min", 'r:', (x, tmin[0]),
+                          self.cbScopeCh0.isChecked(), "Scope Trace A max", 'r:', (x, tmax[0]),
+                          self.cbScopeCh1.isChecked(), "Scope Trace B min", 'b:', (x, tmin[1]),
+                          self.cbScopeCh1.isChecked(), "Scope Trace B max", 'b:', (x, tmax[1])]
+            with self.pipelineStats.timed('scopeRender'):
+                self.lineDisplay2.update_lines(*lines)
         self.eventReaderScope.busy = False
 
+    # number of scope traces averaged, or kept as min/max band with persistence
+    def setScopeAveraging(self, numTraces, persistence = False):
+        self.scopeTraces.setAveraging(numTraces, persistence = persistence)
+
+    def updateScopeAveraging(self):
+        try:
+            numTraces = int(self.scopeAveragesLine.text())
+        except ValueError:
+            numTraces = self.scopeTraces.numTraces
+        persistence = self.cbScopePersistence.isChecked()
+        if ((max(1, numTraces) != self.scopeTraces.numTraces) or (persistence != self.scopeTraces.persistence)):
+            self.setScopeAveraging(numTraces, persistence = persistence)
+
 
     def displayMonitoringDataFromReader(self):
         rawData = self.eventReaderMonitoring.frameDataMonitoring
-        envData = np.zeros((8,1), dtype='int32')
 
         #exits if there is no
-        if (len(rawData)==0) :
-            return false
-        #removes header before displying the image
-        for j in range(0,32):
-            rawData.pop(0)
-        for j in range(0,8):
-            envData[j] = int.from_bytes(rawData[j*4:(j+1)*4], byteorder='little')
+        if (len(rawData)<32+8*4) :
+            self.eventReaderMonitoring.busy = False
+            return False
+        #skips the header, 8 32 bit words of environmental data
+        envData = np.frombuffer(rawData, dtype='<u4', count=8, offset=32).astype('float64')
         #convert temperature and humidity by spliting for 100
-        envData[0] = envData[0]  / 100
-        envData[1] = envData[1]  / 100
-        envData[2] = envData[2]  / 100
+        envData[0:3] = monConv.envCenti(envData[0:3])
 
-        if (self.monitoringDataIndex == 0):
-            self.monitoringDataTraces = envData
-        else:
-            self.monitoringDataTraces = np.append(self.monitoringDataTraces, envData, 1)
+        self.monitoringDataTraces.append(envData)
 
         if (self.LinePlot2_RB2.isChecked()):
-            self.lineDisplay2.update_plot(self.cbEnvMonCh0.isChecked(), "Env. Data 0", 'r',  self.monitoringDataTraces[0,:],
-                                            self.cbEnvMonCh1.isChecked(), "Env. Data 1", 'b',  self.monitoringDataTraces[1,:],
-                                            self.cbEnvMonCh2.isChecked(), "Env. Data 2", 'g',  self.monitoringDataTraces[2,:],
-                                            self.cbEnvMonCh3.isChecked(), "Env. Data 3", 'y',  self.monitoringDataTraces[3,:],
-                                            self.cbEnvMonCh4.isChecked(), "Env. Data 4", 'r+-', self.monitoringDataTraces[4,:],
-                                            self.cbEnvMonCh5.isChecked(), "Env. Data 5", 'b+-', self.monitoringDataTraces[5,:],
-                                            self.cbEnvMonCh6.isChecked(), "Env. Data 6", 'g+-', self.monitoringDataTraces[6,:],
-                                            self.cbEnvMonCh7.isChecked(), "Env. Data 7", 'y+-', self.monitoringDataTraces[7,:])
-
-        #increments position
-        self.monitoringDataIndex = self.monitoringDataIndex + 1
-        if (self.monitoringDataIndex > self.monitoringDataLength):
-            self.monitoringDataTraces = np.delete(self.monitoringDataTraces, 0, 1)
+            [x, traces] = self.monitoringDataTraces.decimated(MAX_TRACE_POINTS)
+            renderStart = time.perf_counter()
+            self.lineDisplay2.update_lines(self.cbEnvMonCh0.isChecked(), "Env. Data 0", 'r',  (x, traces[0]),
+                                            self.cbEnvMonCh1.isChecked(), "Env. Data 1", 'b',  (x, traces[1]),
+                                            self.cbEnvMonCh2.isChecked(), "Env. Data 2", 'g',  (x, traces[2]),
+                                            self.cbEnvMonCh3.isChecked(), "Env. Data 3", 'y',  (x, traces[3]),
+                                            self.cbEnvMonCh4.isChecked(), "Env. Data 4", 'r+-', (x, traces[4]),
+                                            self.cbEnvMonCh5.isChecked(), "Env. Data 5", 'b+-', (x, traces[5]),
+                                            self.cbEnvMonCh6.isChecked(), "Env. Data 6", 'g+-', (x, traces[6]),
+                                            self.cbEnvMonCh7.isChecked(), "Env. Data 7", 'y+-', (x, traces[7]))
+            self.pipelineStats.addLatency('monitoringRender', time.perf_counter() - renderStart)
 
         self.eventReaderMonitoring.busy = False
 
     # Evaluates which post display algorithms are needed if any
     def postImageDisplayProcessing(self):
         #saves dark image set, if requested
+        darkWasSet = self.imgTool.imgDark_isSet
         if (self.imgTool.imgDark_isRequested):
             self.imgTool.setDarkImg(self.imgDesc)
-        #if the image gets done, saves it for other processes
-        if (self.imgTool.imgDark_isSet):
-            self.ImgDarkSub = self.imgTool.getDarkSubtractedImg(self.imgDesc)
+        #if the image gets done, saves it for other processes (the displayed image is already corrected)
+        if (self.imgTool.imgDark_isSet and not darkWasSet):
+            self.ImgDarkSub = self.getDarkSubtractedImg(self.imgDesc)
 
         #check horizontal line display
         if ((self.cbHorizontalLineEnabled.isChecked()) or (self.cbVerticalLineEnabled.isChecked()) or (self.cbpixelTimeSeriesEnabled.isChecked())):
             self.updatePixelTimeSeriesLinePlot()
             self.updateLinePlots()
 
+        #accumulates the ADU histogram
+        if (self.cbHistogramEnabled.isChecked()):
+            self.updateHistogram()
+
     def updateLinePlots(self):
         ##if (PRINT_VERBOSE): print('Horizontal plot processing')
 
         #full line plot
         if (self.imgTool.imgDark_isSet):
-            #self.ImgDarkSub
-            self.lineDisplay1.update_plot(self.cbHorizontalLineEnabled.isChecked(),  "Horizontal", 'r', self.ImgDarkSub[self.mouseY,:],
-                                            self.cbVerticalLineEnabled.isChecked(),    "Vertical",   'b', self.ImgDarkSub[:,self.mouseX],
-                                            self.cbpixelTimeSeriesEnabled.isChecked(), "Pixel TS",   'k', self.pixelTimeSeries)
+            image = self.ImgDarkSub
         else:
-            #self.imgDesc
-            self.lineDisplay1.update_plot(self.cbHorizontalLineEnabled.isChecked(),  "Horizontal", 'r', self.imgDesc[self.mouseY,:],
-                                            self.cbVerticalLineEnabled.isChecked(),    "Vertical",   'b', self.imgDesc[:,self.mouseX],
-                                            self.cbpixelTimeSeriesEnabled.isChecked(), "Pixel TS",   'k', self.pixelTimeSeries)
+            image = self.imgDesc
+        lines = [self.cbHorizontalLineEnabled.isChecked(),  "Horizontal", 'r', image[self.mouseY,:],
+                 self.cbVerticalLineEnabled.isChecked(),    "Vertical",   'b', image[:,self.mouseX]]
+        # one line per tracked pixel or ROI, the first one is the pixel of interest
+        [x, series] = self.pixelTracker.buffer.decimated(MAX_TRACE_POINTS)
+        for i in range(len(self.pixelTracker)):
+            lines += [self.cbpixelTimeSeriesEnabled.isChecked(), self.pixelTracker.names[i], PIXEL_TS_COLORS[i%len(PIXEL_TS_COLORS)], (x, series[i])]
+        self.lineDisplay1.update_lines(*lines)
 
 
     """ Plot pixel values for multiple images """
     def clearPixelTimeSeriesLinePlot(self):
-        self.pixelTimeSeries = np.array([])
+        self.pixelTracker.clear()
 
 
     def updatePixelTimeSeriesLinePlot(self):
         ##if (PRINT_VERBOSE): print('Horizontal plot processing')
 
-        #full line plot
+        if(not self.cbpixelTimeSeriesEnabled.isChecked()):
+            self.clearPixelTimeSeriesLinePlot()
+            return
+
+        #samples all the tracked pixels and ROIs
         if (self.imgTool.imgDark_isSet):
-            self.pixelTimeSeries = np.append(self.pixelTimeSeries, self.ImgDarkSub[self.mouseY,self.mouseX])
+            self.pixelTracker.update(self.ImgDarkSub)
         else:
-            self.pixelTimeSeries = np.append(self.pixelTimeSeries, self.imgDesc[self.mouseY,self.mouseX])
+            self.pixelTracker.update(self.imgDesc)
 
-        if(not self.cbpixelTimeSeriesEnabled.isChecked()):
-            self. clearPixelTimeSeriesLinePlot()
+        #live statistics of the tracked pixels
+        mean = self.pixelTracker.mean()
+        rms = self.pixelTracker.rms()
+        self.pixelTimeSeriesStats.setText('\n'.join(['%s mean %.1f rms %.2f' %(self.pixelTracker.names[i], mean[i], rms[i]) for i in range(min(len(mean), 8))]))
+
+    def addTrackedPixel(self):
+        self.pixelTracker.addPixel(self.mouseY, self.mouseX)
+
+    def addTrackedRoi(self):
+        try:
+            roiSize = int(self.pixelRoiSizeLine.text())
+        except ValueError:
+            roiSize = 1
+        self.pixelTracker.addRoi(self.mouseY, self.mouseY+roiSize, self.mouseX, self.mouseX+roiSize)
+
+    def clearTrackedPixels(self):
+        #keeps the pixel of interest only
+        self.pixelTracker.removeTargets(first = 1)
+
+    """ ADU histogram (spectrum) of the dark subtracted images """
+    def updateHistogram(self):
+        try:
+            minValue = int(self.histogramMinLine.text())
+            maxValue = int(self.histogramMaxLine.text())
+        except ValueError:
+            minValue = maxValue = 0
+        if (maxValue <= minValue):
+            print("Error: histogram range must be min < max. Got: ", self.histogramMinLine.text(), self.histogramMaxLine.text())
+            self.cbHistogramEnabled.setChecked(False)
+            return
+        #ASIC boundaries are only known on full images
+        asicGrid = None
+        if (self.cbHistogramPerAsic.isChecked() and not self.isDisplayRoiEnabled()):
+            asicGrid = self.currentCam.asicGrid()
+        #a new accumulator is started when the settings change
+        if ((self.histogram is None) or ([self.histogram.minValue, self.histogram.maxValue, self.histogram.asicGrid] != [minValue, maxValue, asicGrid])):
+            self.histogram = histogram.HistogramAccumulator(minValue, maxValue, asicGrid = asicGrid)
+
+        if (self.imgTool.imgDark_isSet):
+            self.histogram.fill(self.ImgDarkSub)
+        else:
+            self.histogram.fill(self.imgDesc)
+        self.histogramStats.setText('%d frames, %d under, %d over range' %(self.histogram.numFrames, self.histogram.underflow, self.histogram.overflow))
+
+        if (self.LinePlot2_RB3.isChecked()):
+            x = self.histogram.binValues()
+            lines = [True, "All pixels", 'k', (x, self.histogram.hist)]
+            if (self.histogram.asicHist is not None):
+                for i in range(len(self.histogram.asicHist)):
+                    lines += [True, "ASIC %d" %(i), HISTOGRAM_COLORS[i%len(HISTOGRAM_COLORS)], (x, self.histogram.asicHist[i])]
+            self.lineDisplay2.update_lines(*lines)
+
+    def clearHistogram(self):
+        if (self.histogram is not None):
+            self.histogram.clear()
+
+    def saveHistogramToFile(self):
+        if (self.histogram is None):
+            return
+        #open a pop up menu to set the filename
+        self.filename = QFileDialog.getSaveFileName(self, 'Save File', '', 'numpy file (*.npz);; Any (*.*)')
+        # PyQt5 returns (filename, filter)
+        if (isinstance(self.filename, tuple)):
+            self.filename = self.filename[0]
+        if (self.filename):
+            self.histogram.save(self.filename)
+            print("Histogram saved to", self.filename)
 
     """Save the enabled series to file, plot 1"""
     def SaveSeriesToFile(self):
@@ -548,7 +727,7 @@ class Window(QMainWindow, QObject):
                 np.savetxt(os.path.splitext(self.filename)[0] + "_vertical" + os.path.splitext(self.filename)[1], self.imgDesc[:,self.mouseX], fmt='%d', delimiter=',', newline='\n')
 
         if (self.cbpixelTimeSeriesEnabled.isChecked()):
-            np.savetxt(os.path.splitext(self.filename)[0] + "_pixel" + os.path.splitext(self.filename)[1], self.pixelTimeSeries, fmt='%d', delimiter=',', newline='\n')
+            np.savetxt(os.path.splitext(self.filename)[0] + "_pixel" + os.path.splitext(self.filename)[1], self.pixelTracker.series().T, fmt='%f', delimiter=',', newline='\n', header=','.join(self.pixelTracker.names))
 
 
     """Save the enabled monitoring series to file, plot 2"""
@@ -564,6 +743,25 @@ class Window(QMainWindow, QObject):
                 print("channel1")
                 np.savetxt(os.path.splitext(self.filename)[0] + "_scope1" + os.path.splitext(self.filename)[1], self.chBdata, fmt='%f', delimiter=',', newline='\n')
 
+    # refreshes the diagnostics tab, only while it is shown
+    def updateDiagnostics(self):
+        if (self.diagnosticsText.isVisible()):
+            self.diagnosticsText.setText(self.pipelineStats.report())
+
+    def resetDiagnostics(self):
+        self.pipelineStats.reset()
+        self.diagnosticsText.setText(self.pipelineStats.report())
+
+    def saveDiagnosticsToFile(self):
+        #open a pop up menu to set the filename
+        self.filename = QFileDialog.getSaveFileName(self, 'Save File', '', 'csv file (*.csv);; Any (*.*)')
+        # PyQt5 returns (filename, filter)
+        if (isinstance(self.filename, tuple)):
+            self.filename = self.filename[0]
+        if (self.filename):
+            self.pipelineStats.saveCsv(self.filename)
+            print("Diagnostics saved to", self.filename)
+
     def _paintEvent(self, e):
         qp = QPainter()
         qp.begin(self.image)
@@ -617,8 +815,8 @@ class Window(QMainWindow, QObject):
             elif (self.imgDesc != []):
                 self.mousePixelValue = self.imgDesc[self.mouseY, self.mouseX]
 
-            # clear the pixel time sereis every time the pixel of interest is changed
-            self.clearPixelTimeSeriesLinePlot()
+            # the time series of the pixel of interest restarts when it moves, the added pixels and ROIs keep theirs
+            self.pixelTracker.moveTarget(0, self.mouseY, self.mouseX)
 
             #print('Raw mouse coordinates: {},{}'.format(mouseX, mouseY))
             #print('Pixel map dimensions: {},{}'.format(pixmapW, pixmapH))
@@ -661,6 +859,8 @@ class EventReader(rogue.interfaces.stream.Slave):
         self.frameDataScope = bytearray()
         self.frameDataMonitoring = bytearray()
         self.readDataDone = False
+        self.lastEvent = None
+        self.newEvent = False
         self.parent = parent
         #############################
         # define the data type IDs
@@ -672,6 +872,10 @@ class EventReader(rogue.interfaces.stream.Slave):
         self.busy = False
         self.busyTimeout = 0
         self.lastTime = time.clock_gettime(0)
+        # accept time of the frame last sent to _processFrame and of the one being displayed
+        self.triggerAcceptTime = time.perf_counter()
+        self.processAcceptTime = self.triggerAcceptTime
+        self.stats = parent.pipelineStats
 
 
     # Checks all frames in the file to look for the one that needs to be displayed
@@ -684,6 +888,7 @@ class EventReader(rogue.interfaces.stream.Slave):
         #print("\n---------------------------------\n-\n- Entering DEBUG mode _acceptFrame \n-\n-\n--------------------------------- ")
         #pdb.set_trace()
 
+        acceptTime = time.perf_counter()
         self.lastFrame = frame
         # reads entire frame
         p = bytearray(self.lastFrame.getPayload())
@@ -695,6 +900,8 @@ class EventReader(rogue.interfaces.stream.Slave):
         self.numAcceptedFrames += 1
 
         VcNum =  p[0] & 0xF
+        self.stats.addLatency('accept', time.perf_counter() - acceptTime)
+        self.stats.count(VcNum, 'accepted')
         if (self.busy):
             self.busyTimeout = self.busyTimeout + 1
             if (PRINT_VERBOSE): print("Event Reader Busy: " +  str(self.busyTimeout))
@@ -703,19 +910,41 @@ class EventReader(rogue.interfaces.stream.Slave):
         else:
             self.busyTimeout = 0
 
-
-        if (time.clock_gettime(0)-self.lastTime)>1 or self.parent.currentCam.cameraType == 'ePixM32Array':
+        # multi-packet cameras: every data packet goes to the event builder so that
+        # interleaved acquisitions are assembled, only complete events are displayed
+        multiPacket = (VcNum == 0) and self.parent.currentCam.isMultiPacket()
+        if (multiPacket):
+            with self.stats.timed('eventBuild'):
+                for [frameComplete, eventData] in self.parent.currentCam.buildImageFrames(p):
+                    if (frameComplete):
+                        self.lastEvent = eventData.copy()
+                        self.newEvent = True
+
+        # frames not sent to _processFrame are counted as skipped
+        forwarded = False
+
+        # display at most once per second, except ePixM32 which displays every complete event
+        displayDue = ((time.clock_gettime(0)-self.lastTime)>1) or (self.parent.currentCam.cameraType == 'ePixM32Array')
+        if (displayDue) and ((not multiPacket) or self.newEvent):
             self.lastTime = time.clock_gettime(0)
+            if (multiPacket): self.newEvent = False
+            self.triggerAcceptTime = acceptTime
             if ((VcNum == self.VIEW_PSEUDOSCOPE_ID) and (not self.busy)):
                 self.lastProcessedFrameTime = time.time()
                 self.parent.processPseudoScopeFrameTrigger.emit()
+                forwarded = True
             elif (VcNum == self.VIEW_MONITORING_DATA_ID and (not self.busy)):
                 self.lastProcessedFrameTime = time.time()
                 self.parent.processMonitoringFrameTrigger.emit()
+                forwarded = True
             elif (VcNum == 0):
                 if (((self.numAcceptedFrames == self.frameIndex) or (self.frameIndex == 0)) and (self.numAcceptedFrames%self.numSkipFrames==0)):
                     self.lastProcessedFrameTime = time.time()
-                    if (self.parent.cbdisplayImageEn.isChecked()): self.parent.processFrameTrigger.emit()
+                    if (self.parent.cbdisplayImageEn.isChecked()):
+                        self.parent.processFrameTrigger.emit()
+                        forwarded = True
+        if (not forwarded):
+            self.stats.count(VcNum, 'skipped')
 
 
 
@@ -723,8 +952,14 @@ class EventReader(rogue.interfaces.stream.Slave):
 
         index = self.numProcessFrames%4
         self.numProcessFrames += 1
+        processStart = time.perf_counter()
+        p = self.frameDataArray[index]
+        vcNum = (p[0] & 0xF) if len(p) > 0 else 0
+        self.stats.addLatency('queue', processStart - self.triggerAcceptTime)
         if ((self.enable) and (not self.busy)):
             self.busy = True
+            self.stats.count(vcNum, 'processed')
+            self.processAcceptTime = self.triggerAcceptTime
 
             # Get the channel number
             chNum = (self.lastFrame.getFlags() >> 24)
@@ -770,6 +1005,9 @@ class EventReader(rogue.interfaces.stream.Slave):
 #                time.sleep(self.readFileDelay)
             #sets busy flag at the end
             #self.busy = False
+            self.stats.addLatency('process', time.perf_counter() - processStart)
+        else:
+            self.stats.count(vcNum, 'dropped')
 
 
 ################################################################################
@@ -836,6 +1074,28 @@ class MplCanvas(FigureCanvas):
         self.axes.set_title(self.MyTitle)
         self.draw()
 
+    # same arguments as update_plot, the data array can also be an (x, y) tuple.
+    # The line artists are kept between calls and only their data is replaced,
+    # the axes are rebuilt when the set of lines changes or another plot cleared them
+    def update_lines(self, *args):
+        lines = [args[i:i+4] for i in range(0, len(args), 4)]
+        lineKey = [(lineName, lineColor) for [lineEnabled, lineName, lineColor, l] in lines]
+        if ((getattr(self, 'lineKey', None) != lineKey) or (self.lineArtists[0] not in self.axes.lines)):
+            self.axes.cla()
+            self.lineArtists = [self.axes.plot([], [], lineColor)[0] for [lineEnabled, lineName, lineColor, l] in lines]
+            self.lineKey = lineKey
+            self.axes.set_title(self.MyTitle)
+        for [line, [lineEnabled, lineName, lineColor, l]] in zip(self.lineArtists, lines):
+            line.set_visible(lineEnabled)
+            if (lineEnabled):
+                if (isinstance(l, tuple)):
+                    line.set_data(l[0], l[1])
+                else:
+                    line.set_data(np.arange(len(l)), l)
+        self.axes.relim(visible_only=True)
+        self.axes.autoscale_view()
+        self.draw_idle()
+
     def update_plot_with_marker(self, *args):
         argIndex = 0
         lineName = ""
@@ -909,6 +1169,8 @@ class TabbedCtrlCanvas(QTabWidget):
         tab2	= QWidget()
         tab3    = QWidget()
         tab4    = QWidget()
+        tab5    = QWidget()
+        tab6    = QWidget()
 
         ######################################################
         # create widgets for tab 1 (Main)
@@ -968,6 +1230,30 @@ class TabbedCtrlCanvas(QTabWidget):
         myParent.imageScaleMinLine.setText(str(myParent.imageScaleMin))
         # check boxes
         myParent.cbdisplayImageEn = QCheckBox('Display Image Enable')
+        # region of interest and decimation
+        displayRoiLabel = QLabel("ROI (x0,x1,y0,y1), decimation")
+        myParent.displayRoiLine = QLineEdit()
+        myParent.displayRoiLine.setMaximumWidth(150)
+        myParent.displayRoiLine.setMinimumWidth(100)
+        myParent.displayDecimationLine = QLineEdit()
+        myParent.displayDecimationLine.setMaximumWidth(100)
+        myParent.displayDecimationLine.setMinimumWidth(50)
+        myParent.displayDecimationLine.setText(str(1))
+        myParent.cbDisplayBinning = QCheckBox('Binning')
+        btnSetDisplayRoi = QPushButton("Set ROI")
+        btnSetDisplayRoi.setMaximumWidth(150)
+        btnSetDisplayRoi.clicked.connect(myParent.setDisplayRoiFromGui)
+        # common mode correction
+        commonModeLabel = QLabel("Common mode (method, threshold)")
+        myParent.commonModeMethod = QComboBox()
+        myParent.commonModeMethod.addItems(['Off'] + imgPr.COMMON_MODE_METHODS)
+        myParent.commonModeMethod.setMaximumWidth(150)
+        myParent.commonModeThresholdLine = QLineEdit()
+        myParent.commonModeThresholdLine.setMaximumWidth(100)
+        myParent.commonModeThresholdLine.setMinimumWidth(50)
+        btnSetCommonMode = QPushButton("Set")
+        btnSetCommonMode.setMaximumWidth(150)
+        btnSetCommonMode.clicked.connect(myParent.setCommonModeFromGui)
 
         # set layout to tab 1
         tab1Frame = QFrame()
@@ -976,7 +1262,7 @@ class TabbedCtrlCanvas(QTabWidget):
         tab1Frame.setLineWidth(1);
         grid = QGridLayout()
         grid.setSpacing(5)
-        grid.addWidget(tab1Frame,0,0,7,7)
+        grid.addWidget(tab1Frame,0,0,8,7)
 
         # add widgets to tab1
         grid.addWidget(numDarkImgLabel, 1, 1)
@@ -994,6 +1280,15 @@ class TabbedCtrlCanvas(QTabWidget):
         grid.addWidget(imageScaleLabel, 4, 1)
         grid.addWidget(myParent.imageScaleMaxLine, 4, 2)
         grid.addWidget(myParent.imageScaleMinLine,4, 3)
+        grid.addWidget(displayRoiLabel, 5, 1)
+        grid.addWidget(myParent.displayRoiLine, 5, 2)
+        grid.addWidget(myParent.displayDecimationLine, 5, 3)
+        grid.addWidget(myParent.cbDisplayBinning, 5, 4)
+        grid.addWidget(btnSetDisplayRoi, 6, 4)
+        grid.addWidget(commonModeLabel, 7, 1)
+        grid.addWidget(myParent.commonModeMethod, 7, 2)
+        grid.addWidget(myParent.commonModeThresholdLine, 7, 3)
+        grid.addWidget(btnSetCommonMode, 7, 4)
 
         # complete tab1
         tab1.setLayout(grid)
@@ -1059,6 +1354,22 @@ class TabbedCtrlCanvas(QTabWidget):
         btnSaveSeriesToFile.clicked.connect(myParent.SaveSeriesToFile)
         btnSaveSeriesToFile.resize(btnSaveSeriesToFile.minimumSizeHint())
 
+        # tracked pixels and ROIs, taken at the pixel of interest
+        btnAddTrackedPixel = QPushButton("Track pixel")
+        btnAddTrackedPixel.setMaximumWidth(150)
+        btnAddTrackedPixel.clicked.connect(myParent.addTrackedPixel)
+        btnAddTrackedRoi = QPushButton("Track ROI")
+        btnAddTrackedRoi.setMaximumWidth(150)
+        btnAddTrackedRoi.clicked.connect(myParent.addTrackedRoi)
+        btnClearTracked = QPushButton("Clear tracked")
+        btnClearTracked.setMaximumWidth(150)
+        btnClearTracked.clicked.connect(myParent.clearTrackedPixels)
+        pixelRoiSizeLabel = QLabel("ROI size")
+        myParent.pixelRoiSizeLine = QLineEdit()
+        myParent.pixelRoiSizeLine.setMaximumWidth(150)
+        myParent.pixelRoiSizeLine.setText(str(10))
+        myParent.pixelTimeSeriesStats = QLabel("")
+
 
         # set layout to tab 3
         tab3Frame1 = QFrame()
@@ -1073,12 +1384,18 @@ class TabbedCtrlCanvas(QTabWidget):
         grid3.setColumnMinimumWidth(2, 1)
         grid3.setColumnMinimumWidth(3, 1)
         grid3.setColumnMinimumWidth(5, 1)
-        grid3.addWidget(tab3Frame1,0,0,5,7)
+        grid3.addWidget(tab3Frame1,0,0,9,7)
         grid3.addWidget(myParent.cbHorizontalLineEnabled,1, 1)
         grid3.addWidget(myParent.cbVerticalLineEnabled,2, 1)
         grid3.addWidget(myParent.cbpixelTimeSeriesEnabled,3, 1)
         grid3.addWidget(myParent.cbImageZoomEnabled,1, 3)
         grid3.addWidget(btnSaveSeriesToFile,4, 1)
+        grid3.addWidget(btnAddTrackedPixel,5, 1)
+        grid3.addWidget(btnAddTrackedRoi,6, 1)
+        grid3.addWidget(pixelRoiSizeLabel,6, 3)
+        grid3.addWidget(myParent.pixelRoiSizeLine,6, 4)
+        grid3.addWidget(btnClearTracked,7, 1)
+        grid3.addWidget(myParent.pixelTimeSeriesStats,2, 3, 4, 3)
 
 
         # complete tab3
@@ -1093,6 +1410,7 @@ class TabbedCtrlCanvas(QTabWidget):
         myParent.LinePlot2_RB1 = QRadioButton("Scope")
         myParent.LinePlot2_RB1.setChecked(True)
         myParent.LinePlot2_RB2 = QRadioButton("Env. Monitoring")
+        myParent.LinePlot2_RB3 = QRadioButton("Histogram")
 
         # button save trace to file
         btnSaveMonitoringSeriesToFile = QPushButton("Save to file")
@@ -1103,6 +1421,11 @@ class TabbedCtrlCanvas(QTabWidget):
         # check boxes
         myParent.cbScopeCh0 = QCheckBox('Channel 0')
         myParent.cbScopeCh1 = QCheckBox('Channel 1')
+        myParent.cbScopePersistence = QCheckBox('Persistence')
+        scopeAveragesLabel = QLabel("Traces (avg./persist.)")
+        myParent.scopeAveragesLine = QLineEdit()
+        myParent.scopeAveragesLine.setMaximumWidth(150)
+        myParent.scopeAveragesLine.setText(str(1))
         #
         myParent.cbEnvMonCh0 = QCheckBox('Strong back temp.')
         myParent.cbEnvMonCh1 = QCheckBox('Ambient temp.')
@@ -1131,7 +1454,11 @@ class TabbedCtrlCanvas(QTabWidget):
         grid4.addWidget(myParent.LinePlot2_RB1, 1, 1)
         grid4.addWidget(myParent.cbScopeCh0, 2, 1)
         grid4.addWidget(myParent.cbScopeCh1, 3, 1)
+        grid4.addWidget(myParent.cbScopePersistence, 4, 1)
+        grid4.addWidget(scopeAveragesLabel, 5, 1)
+        grid4.addWidget(myParent.scopeAveragesLine, 5, 2)
         grid4.addWidget(myParent.LinePlot2_RB2, 1, 3)
+        grid4.addWidget(myParent.LinePlot2_RB3, 1, 5)
         grid4.addWidget(myParent.cbEnvMonCh0, 2, 3)
         grid4.addWidget(myParent.cbEnvMonCh1, 3, 3)
         grid4.addWidget(myParent.cbEnvMonCh2, 4, 3)
@@ -1145,12 +1472,99 @@ class TabbedCtrlCanvas(QTabWidget):
         # complete tab4
         tab4.setLayout(grid4)
 
+        ######################################################
+        # create widgets for tab 5 (Histogram)
+        ######################################################
+
+        # check boxes
+        myParent.cbHistogramEnabled = QCheckBox('Accumulate histogram')
+        myParent.cbHistogramPerAsic = QCheckBox('Per ASIC')
+        # range in ADU, one bin per ADU
+        histogramRangeLabel = QLabel("Range ADU (min, max)")
+        myParent.histogramMinLine = QLineEdit()
+        myParent.histogramMinLine.setMaximumWidth(100)
+        myParent.histogramMinLine.setMinimumWidth(50)
+        myParent.histogramMinLine.setText(str(-100))
+        myParent.histogramMaxLine = QLineEdit()
+        myParent.histogramMaxLine.setMaximumWidth(100)
+        myParent.histogramMaxLine.setMinimumWidth(50)
+        myParent.histogramMaxLine.setText(str(1000))
+        myParent.histogramStats = QLabel("")
+
+        # buttons clear and save
+        btnClearHistogram = QPushButton("Clear")
+        btnClearHistogram.setMaximumWidth(150)
+        btnClearHistogram.clicked.connect(myParent.clearHistogram)
+        btnSaveHistogramToFile = QPushButton("Save to file")
+        btnSaveHistogramToFile.setMaximumWidth(150)
+        btnSaveHistogramToFile.clicked.connect(myParent.saveHistogramToFile)
+
+        # set layout to tab 5
+        tab5Frame1 = QFrame()
+        tab5Frame1.setFrameStyle(QFrame.Panel);
+        tab5Frame1.setGeometry(100, 200, 0, 0)
+        tab5Frame1.setLineWidth(1);
+
+        # add widgets into tab5
+        grid5 = QGridLayout()
+        grid5.setSpacing(5)
+        grid5.setColumnMinimumWidth(0, 1)
+        grid5.setColumnMinimumWidth(2, 1)
+        grid5.setColumnMinimumWidth(3, 1)
+        grid5.setColumnMinimumWidth(5, 1)
+        grid5.addWidget(tab5Frame1,0,0,6,7)
+        grid5.addWidget(myParent.cbHistogramEnabled, 1, 1)
+        grid5.addWidget(myParent.cbHistogramPerAsic, 1, 3)
+        grid5.addWidget(histogramRangeLabel, 2, 1)
+        grid5.addWidget(myParent.histogramMinLine, 2, 2)
+        grid5.addWidget(myParent.histogramMaxLine, 2, 3)
+        grid5.addWidget(btnClearHistogram, 3, 1)
+        grid5.addWidget(btnSaveHistogramToFile, 3, 2)
+        grid5.addWidget(myParent.histogramStats, 4, 1, 1, 4)
+
+        # complete tab5
+        tab5.setLayout(grid5)
+
+        ######################################################
+        # create widgets for tab 6 (Diagnostics)
+        ######################################################
+
+        # stage latencies and frame counters, refreshed every second
+        myParent.diagnosticsText = QLabel(myParent.pipelineStats.report())
+        diagnosticsFont = QFont("Monospace")
+        diagnosticsFont.setStyleHint(QFont.TypeWriter)
+        myParent.diagnosticsText.setFont(diagnosticsFont)
+        myParent.diagnosticsText.setAlignment(Qt.AlignTop | Qt.AlignLeft)
+        myParent.diagnosticsTimer = QTimer()
+        myParent.diagnosticsTimer.timeout.connect(myParent.updateDiagnostics)
+        myParent.diagnosticsTimer.start(1000)
+
+        # buttons reset and save
+        btnResetDiagnostics = QPushButton("Reset")
+        btnResetDiagnostics.setMaximumWidth(150)
+        btnResetDiagnostics.clicked.connect(myParent.resetDiagnostics)
+        btnSaveDiagnosticsToFile = QPushButton("Save CSV")
+        btnSaveDiagnosticsToFile.setMaximumWidth(150)
+        btnSaveDiagnosticsToFile.clicked.connect(myParent.saveDiagnosticsToFile)
+
+        # add widgets into tab6
+        grid6 = QGridLayout()
+        grid6.setSpacing(5)
+        grid6.addWidget(myParent.diagnosticsText, 0, 0, 1, 3)
+        grid6.addWidget(btnResetDiagnostics, 1, 0)
+        grid6.addWidget(btnSaveDiagnosticsToFile, 1, 1)
+
+        # complete tab6
+        tab6.setLayout(grid6)
+
 
         # Add tabs
         self.addTab(tab1,"Main")
         self.addTab(tab2,"File controls")
         self.addTab(tab3,"Line Display 1")
         self.addTab(tab4,"Line Display 2")
+        self.addTab(tab5,"Histogram")
+        self.addTab(tab6,"Diagnostics")
 
         self.setGeometry(300, 300, 300, 150)
         self.setWindowTitle('')
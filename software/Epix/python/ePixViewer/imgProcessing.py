@@ -24,23 +24,17 @@
 
 import sys
 import os
-import rogue.utilities
-import rogue.utilities.fileio
-import rogue.interfaces.stream
-import pyrogue    
+#import rogue.utilities
+#import rogue.utilities.fileio
+#import rogue.interfaces.stream
+#import pyrogue    
 import time
 import numpy as np
 
-try:
-    from PyQt5.QtWidgets import *
-    from PyQt5.QtCore    import *
-    from PyQt5.QtGui     import *
-except ImportError:
-    from PyQt4.QtCore    import *
-    from PyQt4.QtGui     import *
-
 PRINT_VERBOSE = 0
 
+COMMON_MODE_METHODS = ['median', 'mean']
+
 ################################################################################
 ################################################################################
 #   Image processing class
@@ -65,6 +59,12 @@ class ImageProcessing():
     imgDark_isSet = False
     imgDark_isRequested = False
 
+    # common mode correction, disabled when commonModeMethod is None
+    commonModeMethod = None
+    commonModeBankWidth = 96
+    commonModeMask = None
+    commonModeThreshold = None
+
 
     def __init__(self, parent) :
         # pointer to the parent class        
@@ -92,6 +92,7 @@ class ImageProcessing():
         #checks for end condition
         if (self.numSavedDarkImg == self.numDarkImages):
             self.imgDark = np.average(self._imgDarkSet,axis=0)
+            self._imgDarkRoiKey = None
             self.imgDark_isSet = True
             self.imgDark_isRequested = False
             self.numSavedDarkImg = 0
@@ -104,6 +105,30 @@ class ImageProcessing():
     def getDarkSubtractedImg(self, rawImg):
         return rawImg - self.imgDark
 
+    def getDarkSubtractedRoi(self, rawImg, roi = None, decimation = 1, binning = False):
+        """dark subtraction of an image made by applyRoi, the dark image is cropped once per roi setting"""
+        roiKey = (None if roi is None else tuple(roi), decimation, binning)
+        if (getattr(self, '_imgDarkRoiKey', None) != roiKey):
+            self._imgDarkRoi = applyRoi(self.imgDark, roi, decimation, binning)
+            self._imgDarkRoiKey = roiKey
+        return rawImg - self._imgDarkRoi
+
+    def setCommonMode(self, method, bankWidth = 96, mask = None, threshold = None):
+        """enables the common mode correction ('median' or 'mean' of every bank row), None disables it"""
+        if (method is not None) and (method not in COMMON_MODE_METHODS):
+            raise ValueError('Unknown common mode method %s, use one of %s' %(method, COMMON_MODE_METHODS))
+        self.commonModeMethod = method
+        self.commonModeBankWidth = bankWidth
+        self.commonModeMask = mask
+        self.commonModeThreshold = threshold
+
+    def getCommonModeCorrectedImg(self, image):
+        """subtracts the common mode of a (dark subtracted) image or batch of images, if enabled"""
+        if (self.commonModeMethod is None):
+            return image
+        return subtractCommonMode(image, self.commonModeBankWidth, mask = self.commonModeMask,
+                                  threshold = self.commonModeThreshold, method = self.commonModeMethod)
+
     def reScaleImgTo8bit(self, rawImage, scaleMax=20000, scaleMin=-200):
         #init
         image = np.clip(rawImage, scaleMin, scaleMax)
@@ -122,3 +147,85 @@ class ImageProcessing():
     def applyBitMask(self, image, mask = 0xFFFF):
         return np.bitwise_and(image, mask)
 
+
+"""Crops an image to roi = [x0, x1, y0, y1] and reduces it by decimation,
+   keeping every n-th pixel or, with binning, the mean of n x n blocks"""
+def applyRoi(image, roi = None, decimation = 1, binning = False):
+    if (roi is not None):
+        [x0, x1, y0, y1] = roi
+        image = image[y0:y1, x0:x1]
+    if (decimation > 1):
+        if (binning):
+            height = image.shape[0] // decimation
+            width = image.shape[1] // decimation
+            image = image[:height*decimation, :width*decimation].reshape(height, decimation, width, decimation).mean(axis=(1,3))
+        else:
+            image = image[::decimation, ::decimation]
+    return image
+
+
+"""Common mode of every row of every ADC bank (bankWidth adjacent columns) of one
+   (H, W) image or a (N, H, W) batch. Only the reference pixels are used: the
+   pixels set in mask ((H, W) boolean, e.g. the unbonded pixels) and, with a
+   threshold, below it (excludes the photons). method is 'median' or 'mean'.
+   Returns (H, W // bankWidth) or (N, H, W // bankWidth), 0 where a bank row has
+   no reference pixel"""
+def commonMode(frames, bankWidth, mask = None, threshold = None, method = 'median'):
+    if (method not in COMMON_MODE_METHODS):
+        raise ValueError('Unknown common mode method %s, use one of %s' %(method, COMMON_MODE_METHODS))
+    frames = np.asarray(frames)
+    [height, width] = frames.shape[-2:]
+    numBanks = width // bankWidth
+    banks = _bankView(frames, bankWidth)
+
+    valid = None
+    if (mask is not None):
+        valid = np.asarray(mask, dtype=bool)[:, :numBanks*bankWidth].reshape(height, numBanks, bankWidth)
+        # keeps only the columns that hold reference pixels: the reference pixels of each
+        # bank row are moved first, the median/mean then runs on the few gathered pixels
+        order = np.argsort(~valid, axis=-1, kind='stable')[..., :max(1, np.count_nonzero(valid, axis=-1).max())]
+        valid = np.take_along_axis(valid, order, axis=-1)
+        banks = np.take_along_axis(banks, np.broadcast_to(order, banks.shape[:-3] + order.shape), axis=-1)
+    if (threshold is not None):
+        below = banks < threshold
+        valid = below if valid is None else (below & valid)
+
+    if (method == 'mean'):
+        if (valid is None):
+            return banks.mean(axis=-1, dtype=np.float64)
+        count = np.count_nonzero(valid, axis=-1)
+        return np.where(valid, banks, 0).sum(axis=-1, dtype=np.float64) / np.maximum(count, 1)
+
+    # median from a sort along the bank row (much faster than np.median on short rows),
+    # the pixels that are not used are sorted last as +inf
+    if (valid is None):
+        data = np.sort(banks, axis=-1)
+        count = np.full(data.shape[:-1] + (1,), bankWidth)
+    else:
+        data = np.where(valid, banks, np.inf)
+        data.sort(axis=-1)
+        count = np.broadcast_to(np.count_nonzero(valid, axis=-1), data.shape[:-1])[..., None]
+    low = np.take_along_axis(data, np.maximum(count - 1, 0) // 2, axis=-1)[..., 0]
+    high = np.take_along_axis(data, count // 2, axis=-1)[..., 0]
+    return np.where(count[..., 0] > 0, (low.astype(np.float64) + high) / 2, 0.0)
+
+
+"""Subtracts the common mode (see commonMode) of one (H, W) image or a (N, H, W)
+   batch. Returns a float64 copy, or writes into out (which can be frames itself
+   when it is a float array)"""
+def subtractCommonMode(frames, bankWidth, mask = None, threshold = None, method = 'median', out = None):
+    frames = np.asarray(frames)
+    cm = commonMode(frames, bankWidth, mask = mask, threshold = threshold, method = method)
+    if (out is None):
+        out = frames.astype(np.float64)
+    elif (out is not frames):
+        out[...] = frames
+    _bankView(out, bankWidth)[...] -= cm[..., None]
+    return out
+
+
+"""(..., H, W // bankWidth, bankWidth) view of the bank columns of images"""
+def _bankView(frames, bankWidth):
+    numBanks = frames.shape[-1] // bankWidth
+    return np.lib.stride_tricks.as_strided(frames, shape = frames.shape[:-1] + (numBanks, bankWidth),
+                                           strides = frames.strides[:-1] + (frames.strides[-1] * bankWidth, frames.strides[-1]))
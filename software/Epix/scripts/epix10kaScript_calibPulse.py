@@ -142,7 +142,7 @@ class MbDebug(rogue.interfaces.stream.Slave):
 ##############################
 # Set base
 ##############################
-class EpixBoard(pyrogue.Root):
+class EpixBoard(fpga.ConfigDiffRoot):
     def __init__(self, guiTop, cmd, dataWriter, srp, **kwargs):
         super().__init__(name='ePixBoard',description='ePix 10ka Board', **kwargs)
         #self.add(MyRunControl('runControl'))
@@ -208,7 +208,7 @@ if (START_VIEWER):
 #############################################################
 if (TEST_DARK):
     #read config parameters for the fpga and asic
-    ePixBoard.readConfig("yml/epix10ka_u0.yml")
+    ePixBoard.readConfigDiff("yml/epix10ka_u0.yml")
 
     #set registers to take dark images
     #ePixBoard.Epix10ka.Epix10kaAsic0.fnSetPixelBitmap(cmd=cmd, dev=ePixBoard.Epix10ka.Epix10kaAsic0, arg='pixelBitMaps/epix10ka_gain_00.csv')
@@ -261,7 +261,7 @@ if (TEST_DARK):
 
 if (TEST_LINEARITY_TEST_A or TEST_LINEARITY_TEST_B):
     #read config parameters for the fpga and asic
-    ePixBoard.readConfig("yml/epix10ka_u0.yml")
+    ePixBoard.readConfigDiff("yml/epix10ka_u0.yml")
 
     #set registers to take dark images
     #ePixBoard.Epix10ka.Epix10kaAsic0.fnSetPixelBitmap(cmd=cmd, dev=ePixBoard.Epix10ka.Epix10kaAsic0, arg='pixelBitMaps/epix10ka_gain_00.csv')
@@ -324,7 +324,7 @@ if (TEST_LINEARITY_TEST_A or TEST_LINEARITY_TEST_B):
 
 if (TEST_LINEARITY_TEST_C or TEST_LINEARITY_TEST_D):
     #read config parameters for the fpga and asic
-    ePixBoard.readConfig("yml/epix10ka_u0.yml")
+    ePixBoard.readConfigDiff("yml/epix10ka_u0.yml")
 
     #set registers to take dark images
     #ePixBoard.Epix10ka.Epix10kaAsic0.fnSetPixelBitmap(cmd=cmd, dev=ePixBoard.Epix10ka.Epix10kaAsic0, arg='pixelBitMaps/epix10ka_gain_00.csv')
@@ -388,7 +388,7 @@ if (TEST_LINEARITY_TEST_C or TEST_LINEARITY_TEST_D):
 
 if (TEST_LINEARITY_TEST_E or TEST_LINEARITY_TEST_F):
     #read config parameters for the fpga and asic
-    ePixBoard.readConfig("yml/epix10ka_u0.yml")
+    ePixBoard.readConfigDiff("yml/epix10ka_u0.yml")
 
     #set registers to take dark images
     #ePixBoard.Epix10ka.Epix10kaAsic0.fnSetPixelBitmap(cmd=cmd, dev=ePixBoard.Epix10ka.Epix10kaAsic0, arg='pixelBitMaps/epix10ka_gain_00.csv')
@@ -451,7 +451,7 @@ if (TEST_LINEARITY_TEST_E or TEST_LINEARITY_TEST_F):
 
 if (TEST_WEIGHTINGFUNCTION):
     #read config parameters for the fpga and asic
-    ePixBoard.readConfig("yml/epix10ka_u0.yml")
+    ePixBoard.readConfigDiff("yml/epix10ka_u0.yml")
 
     #set registers to take dark images
     #ePixBoard.Epix10ka.Epix10kaAsic0.fnSetPixelBitmap(cmd=cmd, dev=ePixBoard.Epix10ka.Epix10kaAsic0, arg='pixelBitMaps/epix10ka_gain_00.csv')
@@ -217,46 +217,12 @@ class MbDebug(rogue.interfaces.stream.Slave):
             print('-------- Microblaze Console --------')
             print(p.decode('utf-8'))
 
-#######################################
-# Custom run control
-#######################################
-class MyRunControl(pyrogue.RunControl):
-    def __init__(self,name):
-        pyrogue.RunControl.__init__(self,name, description='Run Controller ePix 10ka',  rates={1:'1 Hz', 2:'2 Hz', 4:'4 Hz', 8:'8 Hz', 10:'10 Hz', 30:'30 Hz', 60:'60 Hz', 120:'120 Hz'})
-        self._thread = None
-
-    def _setRunState(self,dev,var,value,changed):
-        if changed: 
-            if self.runState.get(read=False) == 'Running': 
-                self._thread = threading.Thread(target=self._run) 
-                self._thread.start() 
-            else: 
-                self._thread.join() 
-                self._thread = None 
-
-
-    def _run(self):
-        self.runCount.set(0) 
-        self._last = int(time.time()) 
- 
- 
-        while (self.runState.value() == 'Running'): 
-            delay = 1.0 / ({value: key for key,value in self.runRate.enum.items()}[self._runRate]) 
-            time.sleep(delay) 
-            self._root.ssiPrbsTx.oneShot() 
-  
-            self._runCount += 1 
-            if self._last != int(time.time()): 
-                self._last = int(time.time()) 
-                self.runCount._updated() 
-
 ##############################
 # Set base
 ##############################
-class EpixBoard(pyrogue.Root):
+class EpixBoard(fpga.ConfigDiffRoot):
     def __init__(self, guiTop, cmd, dataWriter, srp, **kwargs):
         super().__init__(name = 'ePixBoard',description = 'ePix 10ka Board', **kwargs)
-        #self.add(MyRunControl('runControl'))
         self.add(dataWriter)
         self.guiTop = guiTop
 
@@ -266,11 +232,12 @@ class EpixBoard(pyrogue.Root):
 
         # Add Devices
         self.add(fpga.Epix10ka(name='Epix10ka', offset=0, memBase=srp, hidden=False, enabled=True))
-        self.add(pyrogue.RunControl(name = 'runControl', description='Run Controller ePix 10ka', cmd=self.Trigger, rates={1:'1 Hz', 2:'2 Hz', 4:'4 Hz', 8:'8 Hz', 10:'10 Hz', 30:'30 Hz', 60:'60 Hz', 120:'120 Hz'}))
+        self.add(fpga.HwTriggerRunControl(name = 'runControl', description='Run Controller ePix 10ka', trigger='Epix10ka.EpixFpgaRegisters'))
 
 # Create GUI
 appTop = QApplication(sys.argv)
 ePixBoard = EpixBoard(0, cmd, dataWriter, srp)
+pyrogue.streamTap(pgpVc0, ePixBoard.runControl)
 ePixBoard.start(pollEn=args.pollEn, initRead = args.initRead, timeout=3.0)
 
 
@@ -283,7 +250,7 @@ if args.test == 1:
    if os.path.isdir(args.dir):
       
       print('Setting camera registers')
-      ePixBoard.ReadConfig(args.c)
+      ePixBoard.readConfigDiff(args.c)
       #ePixBoard.setYaml(args.c, True)
       #ePixBoard.setYaml(yaml.safe_load(args.c), True)
       
@@ -12,6 +12,7 @@ Acquire data from epix10ka
 """
 import argparse
 import ePixFpga as fpga
+import ePixViewer.FrameMonitor as frameMonitor
 import logging
 import os
 import pyrogue.utilities.fileio
@@ -20,41 +21,6 @@ import sys
 import time
 
 
-class frameit(rogue.interfaces.stream.Slave):
-    """Stream Slave subclass. Counts frames in real-time."""
-
-    def __init__(self):
-        """Sub Class Constructor."""
-        rogue.interfaces.stream.Slave.__init__(self)
-        self.EPIX10KA_FS = 274988  # frame size in bytes
-        self.accepted = 0
-        self.lost = 0
-        self.processed = 0
-        self.lastseq = 0
-        self.log = logging.getLogger("epix10ka.acquirelog")
-
-    def _acceptFrame(self, frame):
-        """Override acceptframe."""
-        p = bytearray(4)  # create an array of 4 bytes i.e. 32-bit word contintaing sequence #
-        # store frame data (4 bytes) in p
-        frame.read(p, 8)  # skip the 1st 4 bytes to get to sequence number, store it
-        framesize = frame.getPayload()  # store size of frame
-        seq = int.from_bytes(p, 'little')  # store sequence number
-        if framesize != self.EPIX10KA_FS:  # test correct frame size
-            self.log.error("frame size is not correct: acceptedFrames=%d lastseq=%d \
-            seq=%d newframesize=%d" % (self.accepted, self.lastseq, seq, framesize))
-            self.lost += 1
-        else:
-            if self.processed > 0:
-                if self.lastseq+1 != seq:
-                    self.log.error("lost a frame had=%d, got=%d" % (self.lastseq, seq))
-                    self.lost += 1
-            self.processed += 1
-
-        self.lastseq = seq  # remember this sequence for next frame
-        self.accepted += 1
-
-
 def main():
     """Routine to acquire data. This uses argparse to get cli params.
 
@@ -133,6 +99,8 @@ def main():
     # add devices to board
     board.add(dw)
     board.add(fpga.Epix10ka(name='Epix10ka', offset=0, memBase=srp, enabled=True))
+    if args.bandwidth:
+        board.add(frameMonitor.FrameMonitor(name='FrameMonitor', cameraType='ePix10ka'))
 
     board.start(pollEn=False)
 
@@ -141,8 +109,9 @@ def main():
     targetASIC = getattr(board.Epix10ka, 'Epix10kaAsic' + str(asic))
 
     if args.bandwidth:
-        checkframe = frameit()
-        pyrogue.streamConnect(pgpVc0, checkframe)
+        # tap the data path, the monitor only reads the frame header
+        pyrogue.streamTap(pgpVc0, board.FrameMonitor)
+        board.FrameMonitor.ResetCounters()
 
     if args.asic:
         if args.setmatrix:
@@ -256,13 +225,14 @@ def main():
         board.dataWriter.open.set(False)
 
     if args.bandwidth:
-        acq_log.info('Number of lost frames %d out of %d' %
-                     (checkframe.lost, checkframe.processed))
+        counter = board.FrameMonitor.counter
+        acq_log.info('Number of lost frames %d out of %d (%d size errors, %d sequence resets)' %
+                     (counter.lostEvents, counter.eventCount, counter.sizeErrors, counter.seqResets))
         acq_log.info('Data Rate %.2f MB/s' %
-                     (checkframe.processed*checkframe.EPIX10KA_FS/args.time[0]/1e6))
-        if checkframe.processed != checkframe.accepted:
+                     (counter.eventCount*counter.expectedSize/args.time[0]/1e6))
+        if counter.eventCount != counter.frameCount:
             acq_log.debug('Link Speed %.2f MB/s' %
-                          (checkframe.accepted*checkframe.EPIX10KA_FS/args.time[0]/1e6))
+                          (counter.frameCount*counter.expectedSize/args.time[0]/1e6))
 
     board.stop()
     acq_log.info("Done")
@@ -10,10 +10,12 @@
 ##############################################################################
 
 import sys
+import time
 import pyrogue as pr
-import pyrogue.gui
 import rogue
 import argparse
+import ePixAsics as epix
+import ePixFpga as fpga
 import ePixQuad as quad
 import ePixViewer as vi
 
@@ -54,12 +56,20 @@ parser.add_argument(
     help     = "Start viewer",
 )  
 
+parser.add_argument(
+    "--headless", 
+    type     = argBool,
+    required = False,
+    default  = False,
+    help     = "Run without GUI and viewer (no Qt or X server needed), file commands need a file name argument",
+)  
+
 parser.add_argument(
     "--type", 
     type     = str,
     required = False,
     default  = 'pgp3_cardG3',
-    help     = "Data card type pgp3_cardG3, datadev or simulation)",
+    help     = "Data card type pgp3_cardG3, datadev, simulation (VHDL testbench) or pysim (python board model))",
 )  
 
 parser.add_argument(
@@ -85,22 +95,63 @@ parser.add_argument(
     help     = "Enable ADC calibration write to PROM. Can corrupt the FPGA's image potentially!",
 )  
 
+parser.add_argument(
+    "--asicMask", 
+    type     = lambda s: int(s, 0),
+    required = False,
+    default  = 0xFFFF,
+    help     = "ASICs created in the tree (default 0xFFFF, all 16). The Epix10kaSaci nodes of the other ASICs are missing, their yml entries are skipped",
+)  
+
+parser.add_argument(
+    "--startupProfile", 
+    type     = argBool,
+    required = False,
+    default  = False,
+    help     = "Print the Root creation and start() times per device class",
+)  
+
 # Get the arguments
 args = parser.parse_args()
 
+if args.headless:
+   epix.setHeadless(True)
+
 #################################################################
 
+# Startup profiling, the device constructors are only wrapped when enabled
+profiler = fpga.StartupProfiler()
+if args.startupProfile:
+   profiler.install()
+
 # Set base
-base = quad.Top(hwType=args.type, dev=args.pgp, lane=args.l, promWrEn=args.adcCalib)    
+with profiler.stage('Root creation'):
+   base = quad.Top(hwType=args.type, dev=args.pgp, lane=args.l, promWrEn=args.adcCalib, asicMask=args.asicMask)    
 
 # Start the system
-base.start(
-#    pollEn   = args.pollEn,
-#    initRead = args.initRead,
-#    timeout  = 5.0,    
-)
+with profiler.stage('start'):
+   base.start(
+   #    pollEn   = args.pollEn,
+   #    initRead = args.initRead,
+   #    timeout  = 5.0,    
+   )
+
+if args.startupProfile:
+   profiler.remove()
+   print(profiler.report(base))
+
+if args.headless:
+   print("Running headless, Ctrl-C to exit\n")
+   try:
+      while True:
+         time.sleep(1)
+   except KeyboardInterrupt:
+      pass
+   base.stop()
+   exit()
 
 # Create GUI
+import pyrogue.gui
 appTop = pr.gui.application(sys.argv)
 guiTop = pr.gui.GuiTop(group='rootMesh')
 appTop.setStyle('Fusion')
@@ -20,6 +20,15 @@ from time import gmtime, strftime
 import pandas as pd
 import numpy as np
 
+# ADC stream feeding each bank of the 4 interleaved super rows (RdoutCoreBram muxStrMap)
+# index is sRow*16 + bank, value is adc*8 + lane
+MUX_STR_MAP = (
+   list(range(40,48)) + list(range(56,64)) +    # sRow 0: ASIC 9, 10, 13, 14
+   list(range(32,40)) + list(range(48,56)) +    # sRow 1: ASIC 8, 11, 12, 15
+   list(range( 8,16)) + list(range(24,32)) +    # sRow 2: ASIC 1, 2, 5, 6
+   list(range( 0, 8)) + list(range(16,24))      # sRow 3: ASIC 0, 3, 4, 7
+)
+
 class EventReader(rogue.interfaces.stream.Slave):
    """retrieves data from a file using rogue utilities services"""
    
@@ -32,16 +41,25 @@ class EventReader(rogue.interfaces.stream.Slave):
       self._superRowSize = int(768/2)
       self._NumColPerAdcCh = int(96/2)
       self._superRowSizeInBytes = self._superRowSize * 4
+      self._NumBanks = 16
+      self._NumSuperRows = 4
       self.sensorHeight = 712
       
-      #self.average = 10
+      # per ADC stream column order of the statistics
+      self.adcChMap = np.array(MUX_STR_MAP)
+      self.adcChOrder = np.argsort(self.adcChMap)
+      
       self.reqFrames = 0
       self.accFrames = 0
-      self.pixelSum = 0
-      self.pixelAvg = 0
-      self.rmsData = []
-      self.rms = 0
+      self.frameBuf = np.zeros((0,), dtype=np.uint16)
+      self.chMean = np.zeros(self._NumSuperRows*self._NumBanks)
+      self.chRms = np.zeros(self._NumSuperRows*self._NumBanks)
    
+   def setReqFrames(self, reqFrames):
+      # frames are stored raw (not descrambled): row, super row, bank, column
+      self.frameBuf = np.zeros((reqFrames, self.sensorHeight//self._NumSuperRows, self._NumSuperRows, self._NumBanks, self._NumColPerAdcCh), dtype=np.uint16)
+      self.reqFrames = reqFrames
+      self.accFrames = 0
    
    def _acceptFrame(self,frame):
    
@@ -54,22 +72,21 @@ class EventReader(rogue.interfaces.stream.Slave):
       VcNum =  p[0] & 0xF
       
       headerBytes = 8 * 4
-      pixelOffset = headerBytes + self._superRowSizeInBytes * 3 * 4 + int(self._superRowSizeInBytes/2)
       
-      #print(pixelOffset)
-   
       if (VcNum == 0 and self.accFrames < self.reqFrames):
-         pixel = (((p[pixelOffset+7] << 8) | p[pixelOffset+6]) & 0x3FFF)
-         self.pixelSum = self.pixelSum + pixel
-         if self.accFrames == 0:
-            self.rmsData = []
-         self.rmsData.append(pixel)
-         if self.accFrames == self.reqFrames - 1:
-            self.rms = np.sqrt(np.mean((self.rmsData-np.mean(self.rmsData))**2))
+         pixels = np.frombuffer(p, dtype=np.uint16, count=self.frameBuf[0].size, offset=headerBytes)
+         self.frameBuf[self.accFrames] = pixels.reshape(self.frameBuf.shape[1:])
          self.accFrames = self.accFrames + 1
-         if (PRINT_VERBOSE): 
-            for i in range(10):
-               print('%d'%( ((p[pixelOffset+i*2+1] << 8) | p[pixelOffset+i*2]) & 0x3FFF ))
+   
+   def calcStatistics(self):
+      # mean over all frames and pixels of each ADC channel
+      # rms is the temporal noise of each pixel averaged over the ADC channel
+      data = np.bitwise_and(self.frameBuf[:self.accFrames], 0x3FFF)
+      chMean = data.mean(axis=(0,1,4))
+      chRms = data.std(axis=0, dtype=np.float32).mean(axis=(0,3))
+      self.chMean = chMean.reshape(-1)[self.adcChOrder]
+      self.chRms = chRms.reshape(-1)[self.adcChOrder]
+      return self.chMean, self.chRms
       
 
 
@@ -109,6 +126,22 @@ parser.add_argument(
     help     = "PGP devide (default /dev/pgpcard_0)",
 )  
 
+parser.add_argument(
+    "--outFile", 
+    type     = str,
+    required = False,
+    default  = 'epixQuadAdcPipelineDelayScan.csv',
+    help     = "Delay vs ADC channel table (csv)",
+)  
+
+parser.add_argument(
+    "--frames", 
+    type     = int,
+    required = False,
+    default  = 50,
+    help     = "Number of frames averaged per delay setting",
+)  
+
 # Get the arguments
 args = parser.parse_args()
 
@@ -158,26 +191,41 @@ QuadTop.SystemRegs.AutoTrigEn.set(False)  # stop and reset auto trigger counter
 QuadTop.SystemRegs.AutoTrigPer.set(2000000) # 20ms = 50Hz
 QuadTop.SystemRegs.TrigSrcSel.set(0x3)
 
-# request 10 frames for average
-eventReader.reqFrames = 50
+# request frames for average
+eventReader.setReqFrames(args.frames)
 
 QuadTop.RdoutCore.RdoutEn.set(True)
 adcPipDly = QuadTop.RdoutCore.AdcPipelineDelay.get()
 
+chNames = ['ADC%d_CH%d'%(ch//8, ch%8) for ch in np.sort(eventReader.adcChMap)]
+scanMean = np.zeros((256, len(chNames)))
+scanRms = np.zeros((256, len(chNames)))
+
 print('AsicRoClkHalfT is set to %d. AdcPipelineDelay should be re-adjusted for different AsicRoClkHalfT settings'%(QuadTop.AcqCore.AsicRoClkHalfT.get()))
-print('AdcPipelineDelay, PixelAvg, PixelRMS')
-# look for pulsed pixel (maximum)
+print('AdcPipelineDelay, ChannelAvg (min, max), ChannelRMS (min, max)')
+# characterize all ADC channels for every delay
 for i in range(256):
    QuadTop.RdoutCore.AdcPipelineDelay.set(0xAAAA0000 | i)
    QuadTop.SystemRegs.AutoTrigEn.set(True)   # start auto trigger counter
    while(eventReader.accFrames < eventReader.reqFrames):
       pass
    QuadTop.SystemRegs.AutoTrigEn.set(False)  # stop and reset auto trigger counter
-   print('%d, %f, %f'%(i, eventReader.pixelSum/eventReader.reqFrames, eventReader.rms))
-   if (PRINT_VERBOSE): print(eventReader.rmsData)
-   eventReader.pixelSum = 0
+   scanMean[i], scanRms[i] = eventReader.calcStatistics()
+   print('%d, %f (%f, %f), %f (%f, %f)'%(i, 
+      scanMean[i].mean(), scanMean[i].min(), scanMean[i].max(), 
+      scanRms[i].mean(), scanRms[i].min(), scanRms[i].max()))
+   if (PRINT_VERBOSE): print(dict(zip(chNames, scanMean[i])))
    eventReader.accFrames = 0
 
+# delay vs channel table
+table = pd.concat([
+   pd.DataFrame(scanMean, columns=[ch + '_Avg' for ch in chNames]),
+   pd.DataFrame(scanRms, columns=[ch + '_RMS' for ch in chNames]),
+], axis=1)
+table.index.name = 'AdcPipelineDelay'
+table.to_csv(args.outFile)
+print('Delay vs channel table saved to %s'%(args.outFile))
+
 QuadTop.RdoutCore.AdcPipelineDelay.set(0xAAAA0000 | adcPipDly)
 
 QuadTop.stop()
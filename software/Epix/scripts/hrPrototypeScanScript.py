@@ -123,46 +123,12 @@ class MbDebug(rogue.interfaces.stream.Slave):
             print('-------- Microblaze Console --------')
             print(p.decode('utf-8'))
 
-#######################################
-# Custom run control
-#######################################
-class MyRunControl(pyrogue.RunControl):
-    def __init__(self,name):
-        pyrogue.RunControl.__init__(self,name=name,description='Run Controller HR prototype', rates={1:'1 Hz', 2:'2 Hz', 4:'4 Hz', 8:'8 Hz', 10:'10 Hz', 30:'30 Hz', 60:'60 Hz', 120:'120 Hz'})
-        self._thread = None
-        
-    def _setRunState(self,dev,var,value):
-        if self._runState != value:
-            self._runState = value
-
-            if self._runState == 'Running':
-                self._thread = threading.Thread(target=self._run)
-                self._thread.start()
-            else:
-                self._thread.join()
-                self._thread = None
-
-    def _run(self):
-        self._runCount = 0
-        self._last = int(time.time())
-
-        while (self._runState == 'Running'):
-            delay = 1.0 / ({value: key for key,value in self.runRate.enum.items()}[self._runRate])
-            time.sleep(delay)
-            self._root.Trigger()
-
-            self._runCount += 1
-            if self._last != int(time.time()):
-                self._last = int(time.time())
-                self.runCount._updated()
-            
 ##############################
 # Set base
 ##############################
-class EpixBoard(pyrogue.Root):
+class EpixBoard(fpga.ConfigDiffRoot):
     def __init__(self, guiTop, cmd, dataWriter, srp, **kwargs):
         super().__init__(name = 'ePixBoard', description = 'HR prototype Board', **kwargs)
-        #self.add(MyRunControl('runControl'))
         self.add(dataWriter)
         self.guiTop = guiTop
 
@@ -172,7 +138,8 @@ class EpixBoard(pyrogue.Root):
 
         # Add Devices
         self.add(fpga.HrPrototype(name='hrFPGA', offset=0, memBase=srp, hidden=False, enabled=True))
-        self.add(pyrogue.RunControl(name = 'runControl', description='Run Controller hr prototype', cmd=self.Trigger, rates={1:'1 Hz', 2:'2 Hz', 4:'4 Hz', 8:'8 Hz', 10:'10 Hz', 30:'30 Hz', 60:'60 Hz', 120:'120 Hz'}))
+        # HR prototype trigger registers run on the 100 MHz system clock
+        self.add(fpga.HwTriggerRunControl(name = 'runControl', description='Run Controller hr prototype', trigger='hrFPGA.TriggerRegisters', baseClock=100000000, framesPerTrigger=2))
 
 
 
@@ -182,6 +149,7 @@ appTop = QApplication(sys.argv)
 guiTop = pyrogue.gui.GuiTop(group = 'HRGui')
 ePixBoard = EpixBoard(guiTop, cmd, dataWriter, srp)
 ePixBoard.start()
+pyrogue.streamTap(pgpVc0, ePixBoard.runControl)
 guiTop.addTree(ePixBoard)
 
 # Viewer gui
@@ -212,7 +180,7 @@ print("Started rogue mesh and epics V3 server. To exit type stop()")
 
 if (TEST_SCAN_SDCLK_SD_RST):
     #read config parameters for the fpga and asic
-    ePixBoard.readConfig("yml/epixHR_ADCOnly.yml")
+    ePixBoard.readConfigDiff("yml/epixHR_ADCOnly.yml")
 
     #set HS dac waveform
     #ePixBoard.hrFPGA.SetWaveform('ramp.csv')
@@ -285,7 +253,7 @@ if (TEST_SCAN_SDCLK_SD_RST):
 
 if (TEST_S2D):
     #read config parameters for the fpga and asic
-    ePixBoard.readConfig("yml/epixHR_ADCOnly.yml")
+    ePixBoard.readConfigDiff("yml/epixHR_ADCOnly.yml")
 
     #set HS dac waveform
     #ePixBoard.hrFPGA.SetWaveform('ramp.csv')
@@ -0,0 +1,249 @@
+#-----------------------------------------------------------------------------
+# Title      : image processing benchmarks
+#-----------------------------------------------------------------------------
+# File       : benchmark_image_processing.py
+# Created    : 2026-10-19
+#-----------------------------------------------------------------------------
+# Description:
+# Measures frames/s and MB/s of the viewer and offline processing steps
+# (descrambling, event building, bit mask, dark subtraction, 8 bit rescale
+# and the .dat readers) for every camera type on synthetic data made by
+# ePixViewer.FrameGenerator. Results are stored as JSON and can be compared
+# with an earlier run to follow the trend of every benchmark.
+#
+# usage: python benchmark_image_processing.py --output bench.json
+#        python benchmark_image_processing.py --cameras ePixQuad ePix10ka --compare bench.json
+#
+#-----------------------------------------------------------------------------
+# This file is part of the ePix rogue. It is subject to
+# the license terms in the LICENSE.txt file found in the top-level directory
+# of this distribution and at:
+#    https://confluence.slac.stanford.edu/display/ppareg/LICENSE.html.
+# No part of the ePix rogue, including this file, may be
+# copied, modified, propagated, or distributed except according to the terms
+# contained in the LICENSE.txt file.
+#-----------------------------------------------------------------------------
+
+import os, sys, time
+import io
+import json
+import contextlib
+import platform
+import argparse
+import subprocess
+import tempfile
+import numpy as np
+import ePixViewer.Cameras as cameras
+import ePixViewer.FrameFile as frameFile
+import ePixViewer.FrameGenerator as frameGenerator
+import ePixViewer.QuadFooter as quadFooter
+
+# detector rates (Hz) the benchmarks are compared against. The Quad full speed
+# is the PGP3 10 Gbps link limit (about 1.1 kHz for 1.1 MB frames)
+DETECTOR_RATES = {
+    'ePix100a' : 120,
+    'ePix10ka' : 120,
+    'ePixQuad' : 1000,
+}
+
+# number of different acquisitions cycled through by the benchmarks
+NUM_ACQUISITIONS = 16
+
+
+##################################################
+# harness
+##################################################
+def measure(function, minTime = 0.5, minCalls = 3):
+    """calls function until minTime seconds and minCalls calls are done, returns the per call times.
+       The messages printed by the benchmarked functions are discarded"""
+    times = []
+    start = time.perf_counter()
+    with contextlib.redirect_stdout(io.StringIO()):
+        while (len(times) < minCalls) or (time.perf_counter() - start < minTime):
+            t0 = time.perf_counter()
+            function()
+            times.append(time.perf_counter() - t0)
+    return np.array(times)
+
+def cycle(items):
+    """function returning the next item of items at every call"""
+    state = {'i' : -1}
+    def nextItem():
+        state['i'] = (state['i'] + 1) % len(items)
+        return items[state['i']]
+    return nextItem
+
+class BenchmarkRun():
+    """collects the results of one run"""
+
+    def __init__(self, minTime, rates):
+        self.minTime = minTime
+        self.rates = rates
+        self.results = []
+
+    def run(self, cameraType, name, function, framesPerCall = 1, bytesPerCall = 0):
+        times = measure(function, self.minTime)
+        best = float(times.min())
+        median = float(np.median(times))
+        result = {
+            'camera'        : cameraType,
+            'benchmark'     : name,
+            'calls'         : len(times),
+            'bestSeconds'   : best,
+            'medianSeconds' : median,
+            'framesPerSec'  : framesPerCall / median,
+            'MBPerSec'      : bytesPerCall / median / 1e6,
+        }
+        rate = self.rates.get(cameraType)
+        if rate is not None:
+            result['detectorRate'] = rate
+            result['realTime'] = bool(result['framesPerSec'] >= rate)
+        self.results.append(result)
+        print('%-13s %-28s %12.1f frames/s %10.1f MB/s %s' % (cameraType, name, result['framesPerSec'], result['MBPerSec'],
+              '' if rate is None else ('ok' if result['realTime'] else 'below %d Hz' % rate)))
+        return result
+
+    def save(self, filename):
+        try:
+            commit = subprocess.check_output(['git', 'rev-parse', 'HEAD'], stderr = subprocess.DEVNULL).decode().strip()
+        except Exception:
+            commit = None
+        data = {
+            'time'    : time.strftime('%Y-%m-%dT%H:%M:%S'),
+            'host'    : platform.node(),
+            'machine' : platform.machine(),
+            'python'  : platform.python_version(),
+            'numpy'   : np.__version__,
+            'commit'  : commit,
+            'results' : self.results,
+        }
+        with open(filename, 'w') as f:
+            json.dump(data, f, indent = 2)
+
+def compare(results, filename):
+    """prints the speed ratio of every benchmark against an earlier JSON run"""
+    with open(filename) as f:
+        previous = json.load(f)
+    old = {(r['camera'], r['benchmark']) : r for r in previous['results']}
+    print('\nComparison with %s (%s, commit %s)' % (filename, previous.get('time'), previous.get('commit')))
+    for r in results:
+        o = old.get((r['camera'], r['benchmark']))
+        if o is not None:
+            print('%-13s %-28s %6.2fx' % (r['camera'], r['benchmark'], o['medianSeconds'] / r['medianSeconds']))
+
+
+##################################################
+# benchmarks
+##################################################
+def benchmarkCamera(bench, cameraType, datSize, tmpDir):
+    generator = frameGenerator.FrameGenerator(cameraType, pedestal = 1000, noise = 20, hitsPerFrame = 10, seed = 0)
+    scrambler = generator.scrambler
+    camera = scrambler.camera
+    packets = [p.copy() for [acqNum, image, p] in generator.frames(NUM_ACQUISITIONS)]
+    frameBytes = scrambler.numPackets * scrambler.packetSize
+
+    # event building, one call adds all the packets of one acquisition
+    def buildFrame(nextPackets = cycle(packets)):
+        for packet in nextPackets():
+            result = camera.buildImageFrame(currentRawData = None, newRawData = packet)
+        return result
+    bench.run(cameraType, 'buildImageFrame', buildFrame, 1, frameBytes)
+
+    # descrambling of complete events, as done by the viewer (bytearray of the payload)
+    if camera.isMultiPacket():
+        events = []
+        for p in packets:
+            camera.eventBuilder.clear()
+            for packet in p:
+                for [frameComplete, event] in camera.buildImageFrames(packet):
+                    if frameComplete:
+                        events.append(event.copy())
+        nextEvent = cycle(events)
+        bench.run(cameraType, 'descrambleImage', lambda: camera.descrambleImage(nextEvent()), 1, frameBytes)
+    else:
+        raw = [bytes(p[0]) for p in packets]
+        nextRaw = cycle(raw)
+        bench.run(cameraType, 'descrambleImage', lambda: camera.descrambleImage(bytearray(nextRaw())), 1, frameBytes)
+        nextRaw = cycle(raw)
+        bench.run(cameraType, 'descrambleImageRoi', lambda: camera.descrambleImageRoi(bytearray(nextRaw())), 1, frameBytes)
+
+    # image processing on descrambled images
+    images = [scrambler.descramble(p) for p in packets]
+    imageBytes = images[0].size * 2
+    imgTool = camera.imgTool
+    imgTool.imgHeight = camera.sensorHeight
+    imgTool.imgWidth = camera.sensorWidth
+    nextImage = cycle(images)
+    bench.run(cameraType, 'applyBitMask', lambda: imgTool.applyBitMask(nextImage(), mask = camera.bitMask), 1, imageBytes)
+    imgTool.numSavedDarkImg = 0
+    bench.run(cameraType, 'setDarkImg', lambda: imgTool.setDarkImg(nextImage()), 1, imageBytes)
+    while not imgTool.imgDark_isSet:
+        imgTool.setDarkImg(nextImage())
+    bench.run(cameraType, 'getDarkSubtractedImg', lambda: imgTool.getDarkSubtractedImg(nextImage()), 1, imageBytes)
+    darkSub = [imgTool.getDarkSubtractedImg(image) for image in images]
+    nextDarkSub = cycle(darkSub)
+    bench.run(cameraType, 'reScaleImgTo8bit', lambda: imgTool.reScaleImgTo8bit(nextDarkSub(), 200, -50), 1, imageBytes)
+
+    # .dat readers on a file of datSize bytes
+    filename = os.path.join(tmpDir, cameraType + '.dat')
+    numAcq = generator.writeDat(filename, fileSize = datSize)
+    fileSize = os.path.getsize(filename)
+
+    def readRecords():
+        # record loop of the read_image_from_file scripts
+        with open(filename, 'rb') as f:
+            while True:
+                header = np.fromfile(f, dtype='uint32', count=2)
+                if len(header) < 2:
+                    break
+                np.fromfile(f, dtype='uint32', count=int(header[0]/4)-1)
+    bench.run(cameraType, 'dat read records', readRecords, numAcq, fileSize)
+
+    def indexFile():
+        frameFile.FrameFileIndex(filename).close()
+    bench.run(cameraType, 'dat FrameFileIndex', indexFile, numAcq, fileSize)
+
+    def readAndDescramble():
+        fileIndex = frameFile.FrameFileIndex(filename)
+        for i in range(len(fileIndex)):
+            [frameComplete, readyForDisplay, data] = camera.buildImageFrame(currentRawData = None, newRawData = fileIndex.payload(i))
+            if frameComplete:
+                camera.descrambleImage(data if camera.isMultiPacket() else bytearray(data))
+        # the payload views must be released before the file is unmapped
+        data = None
+        fileIndex.close()
+    bench.run(cameraType, 'dat read + descramble', readAndDescramble, numAcq, fileSize)
+
+    if cameraType == 'ePixQuad':
+        bench.run(cameraType, 'dat readFooters', lambda: quadFooter.readFooters(filename), numAcq, fileSize)
+    os.remove(filename)
+
+
+##################################################
+# main
+##################################################
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--cameras", nargs = '+', default = list(cameras.Camera.availableCameras.keys()))
+    parser.add_argument("--output", type = str, default = None, help = "JSON file for the results")
+    parser.add_argument("--compare", type = str, default = None, help = "JSON file of an earlier run")
+    parser.add_argument("--minTime", type = float, default = 0.5, help = "seconds per benchmark")
+    parser.add_argument("--datSize", type = float, default = 50.0, help = ".dat file size in MB")
+    parser.add_argument("--rate", nargs = '*', default = [], help = "detector rates as camera=Hz")
+    args = parser.parse_args()
+
+    rates = dict(DETECTOR_RATES)
+    for item in args.rate:
+        [camera, rate] = item.split('=')
+        rates[camera] = float(rate)
+
+    bench = BenchmarkRun(args.minTime, rates)
+    with tempfile.TemporaryDirectory() as tmpDir:
+        for cameraType in args.cameras:
+            benchmarkCamera(bench, cameraType, args.datSize * 1e6, tmpDir)
+
+    if args.compare is not None:
+        compare(bench.results, args.compare)
+    if args.output is not None:
+        bench.save(args.output)
+        print('Results saved to', args.output)
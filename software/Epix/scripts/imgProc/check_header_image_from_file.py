@@ -21,21 +21,12 @@
 
 import os, sys, time
 import numpy as np
-import ePixViewer.Cameras as cameras
-import ePixViewer.imgProcessing as imgPr
-# 
-import matplotlib   
-matplotlib.use('QT4Agg')
-import matplotlib.pyplot as plt
-#matplotlib.pyplot.ion()
-MAX_NUMBER_OF_FRAMES_PER_BATCH  = 100000
-_10KAFRAMESIZEBYTES = 274988
+import ePixViewer.FrameFile as frameFile
 
 ##################################################
 # Global variables
 ##################################################
 cameraType = 'ePix10ka'
-bitMask = 0x3fff
 
 ##################################################
 # Dark images
@@ -45,44 +36,27 @@ if (len(sys.argv[1])>0):
 else:
     filename = '/u1/ddoering/10kaImages/darkImage_10ka_120Hz_afterClearMatrix.dat'
 
-f = open(filename, mode = 'rb')
-
-file_header = [0]
-frame_header = [0]
-numberOfFrames = 0
-while ((len(file_header)>0) and (numberOfFrames<MAX_NUMBER_OF_FRAMES_PER_BATCH)):
-    try:
-        # reads file header [the number of bytes to read, EVIO]
-        file_header = np.fromfile(f, dtype='uint32', count=2)
-        payloadSize = int(file_header[0]/4)-1 #-1 is need because size info includes the second word from the header
-        if (payloadSize != _10KAFRAMESIZEBYTES/4): #for 10ka
-            print('Size test')
-            print('Frame Number',numberOfFrames, 'size',  file_header)
-            print('')
-        newPayload = np.fromfile(f, dtype='uint32', count=payloadSize) #(frame size splited by four to read 32 bit 
-        # test sequence number
-        if (numberOfFrames != 0):
-            if(frame_header[2]+1 != newPayload[2]):
-                print('Sequence counter test')
-                print ('Frame Number',numberOfFrames, 'size',  file_header)
-                print('Previous sequence counter: ', frame_header[2], 'Current sequence counter: ', newPayload[2])
-                print('')
-        
-        frame_header = newPayload[0:3]
-        
-#        if (numberOfFrames == 0):
-#            allFrames = [newPayload.copy()]
-#        else:
-#            newFrame  = [newPayload.copy()]
-#            allFrames = np.append(allFrames, newFrame, axis = 0)
-        numberOfFrames = numberOfFrames + 1 
-        #print ("Payload" , numberOfFrames, ":",  (newPayload[0:15]))
-        previousSize = file_header
-    except Exception: 
-        #e = sys.exc_info()[0]
-        #print ("Message\n", e)
-        #print ('size', file_header, 'previous size', previousSize)
-        print("numberOfFrames read: " ,numberOfFrames)
-
-
-
+# indexes the file headers only, payloads stay in the memory map
+fileIndex = frameFile.FrameFileIndex(filename)
+counter = frameFile.FrameIntegrityCounter(cameraType = cameraType)
+
+# size test
+sizes = fileIndex.sizes
+for frameNumber in np.flatnonzero(sizes != counter.expectedSize):
+    print('Size test')
+    print('Frame Number', frameNumber, 'size', sizes[frameNumber])
+    print('')
+
+# sequence counter test (frames with correct size only)
+sizeOk = np.flatnonzero(sizes == counter.expectedSize)
+seqs = fileIndex.headerWords(counter.seqWord)[sizeOk]
+for i in np.flatnonzero(seqs[1:] != seqs[:-1] + np.uint32(1)):
+    print('Sequence counter test')
+    print('Frame Number', sizeOk[i+1], 'size', sizes[sizeOk[i+1]])
+    print('Previous sequence counter: ', seqs[i], 'Current sequence counter: ', seqs[i+1])
+    print('')
+
+counter.processArrays(sizes, fileIndex.headerWords(counter.seqWord))
+print(counter.summary())
+print("numberOfFrames read: ", len(fileIndex))
+fileIndex.close()
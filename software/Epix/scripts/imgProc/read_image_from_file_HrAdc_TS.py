@@ -210,15 +210,9 @@ centralValue = 0
 if PLOT_SET_HISTOGRAM :
     nbins = 100
     EnergyTh = -50
-    n = np.zeros(nbins)
-    for i in range(0, imgDesc.shape[0]):
-    #    n, bins, patches = plt.hist(darkSub[5,:,:], bins=256, range=(0.0, 256.0), fc='k', ec='k')
-    #    [x,y] = np.where(darkSub[i,:,32:63]>EnergyTh)
-    #   h, b = np.histogram(darkSub[i,x,y], np.arange(-nbins/2,nbins/2+1))
-    #    h, b = np.histogram(np.average(darkSub[i,:,5]), np.arange(-nbins/2,nbins/2+1))
-        dataSet = darkSub[i,:,5]
-        h, b = np.histogram(np.average(dataSet), np.arange(centralValue-nbins/2,centralValue+nbins/2+1))
-        n = n + h
+    # one average per frame, all the frames histogrammed at once
+    dataSet = np.average(darkSub[:,:,5], axis=1)
+    n, b = np.histogram(dataSet, np.arange(centralValue-nbins/2,centralValue+nbins/2+1))
 
     plt.bar(b[1:nbins+1],n, width = 0.55)
     plt.title('Histogram')
@@ -233,17 +227,9 @@ if PLOT_SET_HISTOGRAM :
     centralValue_odd  = np.average(imgDesc[0,np.arange(1,32,2),standAloneADCPlot])
     nbins = 100
     EnergyTh = -50
-    n_even = np.zeros(nbins)
-    n_odd  = np.zeros(nbins)
-    for i in range(0, imgDesc.shape[0]):
-    #    n, bins, patches = plt.hist(darkSub[5,:,:], bins=256, range=(0.0, 256.0), fc='k', ec='k')
-    #    [x,y] = np.where(darkSub[i,:,32:63]>EnergyTh)
-    #   h, b = np.histogram(darkSub[i,x,y], np.arange(-nbins/2,nbins/2+1))
-    #    h, b = np.histogram(np.average(darkSub[i,:,5]), np.arange(-nbins/2,nbins/2+1))
-        h, b = np.histogram(np.average(imgDesc[i,np.arange(0,32,2),standAloneADCPlot]), np.arange(centralValue_even-nbins/2,centralValue_even+nbins/2+1))
-        n_even = n_even + h
-        h, b = np.histogram(np.average(imgDesc[i,np.arange(1,32,2),standAloneADCPlot]), np.arange(centralValue_odd-nbins/2,centralValue_odd+nbins/2+1))
-        n_odd = n_odd + h
+    # even and odd row averages of every frame, histogrammed at once
+    n_even, b = np.histogram(np.average(imgDesc[:,0:32:2,standAloneADCPlot], axis=1), np.arange(centralValue_even-nbins/2,centralValue_even+nbins/2+1))
+    n_odd,  b = np.histogram(np.average(imgDesc[:,1:32:2,standAloneADCPlot], axis=1), np.arange(centralValue_odd-nbins/2,centralValue_odd+nbins/2+1))
 
     np.savez("adc_" + str(standAloneADCPlot), imgDesc[:,:,standAloneADCPlot])
 
@@ -40,6 +40,9 @@ bitMask = 0x7fff
 PLOT_IMAGE = False
 PLOT_IMAGE_DARKSUB = False
 SAVEHDF5              = True
+COMMON_MODE           = None  # None, 'median' or 'mean' of every ADC bank row
+COMMON_MODE_THRESHOLD = None  # pixels above are not used for the common mode
+COMMON_MODE_BATCH     = 100
 ##################################################
 # Dark images
 ##################################################
@@ -120,6 +123,12 @@ print(darkImg.shape)
 
 darkSub = imgDesc - darkImg
 
+if COMMON_MODE is not None:
+    # corrected in place, in batches to keep the sort buffers small
+    for i in range(0, darkSub.shape[0], COMMON_MODE_BATCH):
+        batch = darkSub[i:i+COMMON_MODE_BATCH]
+        imgPr.subtractCommonMode(batch, currentCam.bankWidth(), threshold = COMMON_MODE_THRESHOLD, method = COMMON_MODE, out = batch)
+
 if PLOT_IMAGE_DARKSUB :
     for i in range(0, 1):
         plt.imshow(darkSub[i,:,0:31], interpolation='nearest')
@@ -23,6 +23,7 @@ import os, sys, time
 import numpy as np
 import ePixViewer.Cameras as cameras
 import ePixViewer.imgProcessing as imgPr
+import ePixViewer.Histogram as histogram
 # 
 import matplotlib   
 matplotlib.use('QT4Agg')
@@ -39,6 +40,11 @@ bitMask = 0x3fff
 PLOT_IMAGE = False
 PLOT_IMAGE_DARKSUB = False
 SAVEHDF5              = True
+COMMON_MODE           = None  # None, 'median' or 'mean' of every ADC bank row
+COMMON_MODE_THRESHOLD = None  # pixels above are not used for the common mode
+COMMON_MODE_BATCH     = 100
+PLOT_SET_HISTOGRAM    = False
+HISTOGRAM_BATCH       = 100
 ##################################################
 # Dark images
 ##################################################
@@ -115,6 +121,12 @@ print(darkImg.shape)
 
 darkSub = imgDesc - darkImg
 
+if COMMON_MODE is not None:
+    # corrected in place, in batches to keep the sort buffers small
+    for i in range(0, darkSub.shape[0], COMMON_MODE_BATCH):
+        batch = darkSub[i:i+COMMON_MODE_BATCH]
+        imgPr.subtractCommonMode(batch, currentCam.bankWidth(), threshold = COMMON_MODE_THRESHOLD, method = COMMON_MODE, out = batch)
+
 if PLOT_IMAGE_DARKSUB :
     for i in range(0, 1):
         plt.imshow(darkSub[i,:,0:31], interpolation='nearest')
@@ -130,16 +142,19 @@ if(SAVEHDF5):
     f_h5[index_h5] = imgDesc.astype('uint16')
 f_h5.close()
 
-# the histogram of the data
-#nbins = 1024
-#EnergyTh = -50
-#n = np.zeros(nbins)
-#for i in range(0, imgDesc.shape[0]):
-#    n, bins, patches = plt.hist(darkSub[5,:,:], bins=256, range=(0.0, 256.0), fc='k', ec='k')
-#    [x,y] = np.where(darkSub[i,:,32:63]>EnergyTh)
-#    h, b = np.histogram(darkSub[i,x,y], np.arange(-nbins/2,nbins/2+1))
-#    n = n + h
-
-#plt.bar(b[1:nbins+1],n, width = 0.55)
-#plt.show()
+# the histogram of the data, global and per ASIC
+if PLOT_SET_HISTOGRAM :
+    nbins = 1024
+    hist = histogram.HistogramAccumulator(-nbins/2, nbins/2, asicGrid = currentCam.asicGrid())
+    # batches keep the integer ADU copy small
+    for i in range(0, darkSub.shape[0], HISTOGRAM_BATCH):
+        hist.fill(darkSub[i:i+HISTOGRAM_BATCH])
+    hist.save(os.path.splitext(filename)[0]+"_histogram.npz")
+
+    plt.step(hist.binValues(), hist.hist, where='mid', color='k')
+    for asic in range(hist.asicHist.shape[0]):
+        plt.step(hist.binValues(), hist.asicHist[asic], where='mid', linewidth=0.5)
+    plt.yscale('log')
+    plt.title('Histogram of :'+filename)
+    plt.show()
 
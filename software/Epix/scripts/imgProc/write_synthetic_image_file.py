@@ -0,0 +1,45 @@
+#-----------------------------------------------------------------------------
+# Title      : write synthetic images to file script
+#-----------------------------------------------------------------------------
+# File       : write_synthetic_image_file.py
+# Created    : 2026-10-19
+#-----------------------------------------------------------------------------
+# Description:
+# Writes a rogue .dat file of synthetic images (pedestal, noise and random
+# hits) scrambled in the raw packet format of any supported camera, to test
+# and benchmark the descramblers and offline scripts without recorded data.
+#
+# usage: python write_synthetic_image_file.py ePixQuad /tmp/quad.dat --size 1000
+#
+#-----------------------------------------------------------------------------
+# This file is part of the ePix rogue. It is subject to 
+# the license terms in the LICENSE.txt file found in the top-level directory 
+# of this distribution and at: 
+#    https://confluence.slac.stanford.edu/display/ppareg/LICENSE.html. 
+# No part of the ePix rogue, including this file, may be 
+# copied, modified, propagated, or distributed except according to the terms 
+# contained in the LICENSE.txt file.
+#-----------------------------------------------------------------------------
+
+import time
+import argparse
+import ePixViewer.Cameras as cameras
+import ePixViewer.FrameGenerator as frameGenerator
+
+parser = argparse.ArgumentParser()
+parser.add_argument("cameraType", type = str, choices = list(cameras.Camera.availableCameras.keys()))
+parser.add_argument("filename", type = str)
+parser.add_argument("--frames", type = int, default = None, help = "number of acquisitions")
+parser.add_argument("--size", type = float, default = 100.0, help = "file size in MB, used when --frames is not given")
+parser.add_argument("--pedestal", type = float, default = 1000.0)
+parser.add_argument("--noise", type = float, default = 10.0)
+parser.add_argument("--hits", type = float, default = 0.0, help = "mean number of hits per image")
+parser.add_argument("--hitAmplitude", type = float, default = 500.0)
+parser.add_argument("--seed", type = int, default = None)
+args = parser.parse_args()
+
+generator = frameGenerator.FrameGenerator(args.cameraType, pedestal = args.pedestal, noise = args.noise,
+                                          hitsPerFrame = args.hits, hitAmplitude = args.hitAmplitude, seed = args.seed)
+start = time.time()
+numFrames = generator.writeDat(args.filename, numFrames = args.frames, fileSize = args.size * 1e6)
+print('%d acquisitions written to %s in %.1f s' % (numFrames, args.filename, time.time() - start))